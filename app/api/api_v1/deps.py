@@ -1,6 +1,6 @@
 from typing import Generator
 
-from ...db.mongodb import db
+from ...db.mongodb import get_database
 
 
 def get_db() -> Generator:
@@ -13,7 +13,7 @@ def get_db() -> Generator:
     and closing of the database session.
 
     Yields:
-        The database instance used by the application.
+        The database instance used by the application, on the MongoDB client of the current worker process.
 
     Note:
     In this case, no specific action is taken to close the database connection,
@@ -21,6 +21,6 @@ def get_db() -> Generator:
     that requires explicit session handling, this would be the place to close the session.
     """
     try:
-        yield db
+        yield get_database()
     finally:
         pass  # Aquí podrías cerrar la sesión si estuvieras usando un ODM/ORM que lo requiera
\ No newline at end of file
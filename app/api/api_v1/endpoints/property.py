@@ -1,27 +1,49 @@
 import logging
-from typing import Any
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, UploadFile, File
-from pymongo import MongoClient
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Header, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 
 from app.api.api_v1.deps import get_db
-from app.core.exceptions import handle_db_error
+from app.core.exceptions import PreconditionFailed, handle_db_error
+from app.core.responses import FastJSONResponse, ImageFileResponse, etag_matches, etag_version, version_etag
+from app.repositories.cached_property import CachedPropertyRepository, property_cache
 from app.repositories.property import PropertyRepository
 from app.repositories.property_image import PropertyImageRepository
-from app.schemas import PropertyCreate, PropertyInDB, PropertyImageInDB
+from app.repositories.property_trace import PropertyTraceRepository
+from app.schemas import (
+    PropertyCreate, PropertyInDB, PropertyDetail, PropertyImageInDB, PropertyImageBatchResult,
+    PropertyImageUploadRequest, PropertyImageUploadTicket, PropertyImageRegister, PropertyFilter, PropertyNearby,
+    PropertyPage, PropertySearchPage, PropertySync, PropertySyncResult, BulkPriceUpdate, BulkPriceUpdateResult,
+    PropertyTraceCreate, PropertyTraceInDB, SalesRollup
+)
+from app.services.property_events import format_event, stream_events
 from app.services.property_service import PropertyService
+from app.services.property_trace_service import PropertyTraceService
+from app.utils.export import EXPORT_FORMATS, export_filename
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+# Comma separated list of the relations that can be embedded in a property.
+EXPAND_REGEX = "^(owner|images|traces)(,(owner|images|traces))*$"
+
+# Comma separated list of the event types a client can subscribe to.
+EVENT_TYPES_REGEX = "^(property_created|price_changed)(,(property_created|price_changed))*$"
+
+# Bounding box as min_lng,min_lat,max_lng,max_lat.
+BBOX_REGEX = r"^-?\d+(\.\d+)?(,-?\d+(\.\d+)?){3}$"
+
 
 # Dependencia para obtener la instancia de la base de datos
-def get_property_repository(db: MongoClient = Depends(get_db)) -> PropertyRepository:
-    return PropertyRepository(db)
+def get_property_repository(db: AsyncIOMotorClient = Depends(get_db)) -> PropertyRepository:
+    return CachedPropertyRepository(db)
 
 
-def get_property_image_repository(db: MongoClient = Depends(get_db)) -> PropertyImageRepository:
+def get_property_image_repository(db: AsyncIOMotorClient = Depends(get_db)) -> PropertyImageRepository:
     return PropertyImageRepository(db)
 
 
@@ -32,6 +54,87 @@ def get_property_service(
     return PropertyService(property_repo, property_image_repo)
 
 
+def get_property_trace_repository(db: AsyncIOMotorClient = Depends(get_db)) -> PropertyTraceRepository:
+    return PropertyTraceRepository(db)
+
+
+def get_property_trace_service(
+    property_trace_repo: PropertyTraceRepository = Depends(get_property_trace_repository),
+    property_repo: PropertyRepository = Depends(get_property_repository)
+) -> PropertyTraceService:
+    return PropertyTraceService(property_trace_repo, property_repo)
+
+
+def parse_expand(expand: Optional[str]) -> List[str]:
+    # Duplicates are dropped keeping the requested order
+    return list(dict.fromkeys(expand.split(","))) if expand else []
+
+
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    return tuple(float(value) for value in bbox.split(",")) if bbox else None
+
+
+@router.get("/", response_model=PropertyPage, response_model_exclude_unset=True)
+async def list_properties(
+        *,
+        filters: PropertyFilter = Depends(),
+        sort: str = Query("id", regex="^-?(id|price|year)$"),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        expand: Optional[str] = Query(None, regex=EXPAND_REGEX),
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Lists real estate properties with filters and keyset pagination.
+
+    Results are ordered by `sort` (`id`, `price` or `year`, prefixed with '-' for descending order). Each page
+    returns a `next_cursor` that must be sent back to get the following page; pages are resolved from the
+    position of the cursor instead of skipping documents, so deep pages are as fast as the first one.
+
+    With `expand`, the owner, images and/or sale history of every property of the page are joined by the database
+    in the same query.
+
+    Args:
+        filters (PropertyFilter): Price range, year range, owner and internal code filters.
+        sort (str): Sort specification.
+        limit (int): Maximum number of properties per page.
+        cursor (str): Cursor returned by the previous page.
+        expand (str): Comma separated relations to embed: 'owner', 'images', 'traces'.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        PropertyPage: The properties of the page and the cursor of the next one.
+
+    Example:
+        GET /?min_price=1000&max_price=5000&sort=-price&limit=20
+        GET /?min_price=1000&max_price=5000&sort=-price&limit=20&cursor=eyJzIjoi...
+        GET /?id_owner=JOED1&expand=owner,images
+
+    """
+    logger.info("Listing properties with filters %s sorted by %s", filters, sort)
+    try:
+        page = await property_service.list_properties(filters, sort, limit, cursor, parse_expand(expand))
+        return FastJSONResponse(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error listing properties: %s", e)
+        handle_db_error(e)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats() -> Any:
+    """
+    Returns the counters of the in-process property cache (size, hits, misses, coalesced loads, evictions,
+    expirations and invalidations) of the worker that serves the request, to size it.
+
+    Example:
+        GET /cache/stats
+
+    """
+    return property_cache.stats()
+
+
 @router.post("/create-property/", response_model=PropertyInDB)
 async def create_property_building(
         *,
@@ -63,13 +166,17 @@ async def create_property_building(
             }
 
     """
-    logger.info(f"Creating a new property with data {property_data}")
+    logger.info("Creating a new property with code %s", property_data.code_internal)
     try:
-        property_created = property_service.create_property(property_data)
-        logger.info(f"Property created successfully with id {str(property_created['id'])}")
-        return property_created
+        property_created = await property_service.create_property(property_data)
+        logger.info("Property created successfully with id %s", property_created.id)
+        return FastJSONResponse(property_created)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=409, detail=f"A property with code_internal {property_data.code_internal} already exists"
+        )
     except Exception as e:
-        logger.error(f"Error creating property: {e}")
+        logger.error("Error creating property: %s", e)
         handle_db_error(e)
 
 
@@ -78,6 +185,7 @@ async def change_price(
         *,
         property_id: str,
         price_in: float,
+        if_match: Optional[str] = Header(None),
         property_service: PropertyService = Depends(get_property_service)
 ) -> Any:
     """
@@ -86,9 +194,13 @@ async def change_price(
     This endpoint allows you to change the price of a specific property, identified by its ID.
     by its ID. If the property is not found, it returns a 404 error.
 
+    With `If-Match` (the `ETag` of a previous read), the price is only changed if the property was not modified
+    since; otherwise the answer is 412 and the client must read it again. The response carries the new `ETag`.
+
     Args:
         property_id (str): The ID of the property to update.
         price_in (float): The new price of the property.
+        if_match (str): ETag the property must still have ('*' for any).
         property_service (PropertyService): property service for interaction with the database.
 
 
@@ -97,24 +209,111 @@ async def change_price(
 
     Example:
         PUT /change-price/12345
+        If-Match: "12345-3"
         body: {
             "price": 35000
         }
 
     """
-    logger.info(f"Updating price for property {property_id}")
+    logger.info("Updating price for property %s", property_id)
+    expected_version = None
+    if if_match and if_match.strip() != "*":
+        expected_version = etag_version(if_match, property_id)
+        if expected_version is None:
+            raise HTTPException(status_code=412, detail="The property does not match If-Match")
     try:
-        property_updated = property_service.update_property_price(property_id, price_in)
-        logger.info(f"Price updated successfully for property {property_id}")
-        return property_updated
+        property_updated = await property_service.update_property_price(property_id, price_in, expected_version)
+        logger.info("Price updated successfully for property %s", property_id)
+        return FastJSONResponse(
+            property_updated, headers={"ETag": version_etag(property_updated.id, property_updated.version)}
+        )
+    except PreconditionFailed as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except Exception as e:
-        logger.error(f"Error updating property price: {e}")
+        logger.error("Error updating property price: %s", e)
+        handle_db_error(e)
+
+
+@router.put("/bulk-change-price/", response_model=BulkPriceUpdateResult)
+async def bulk_change_price(
+        *,
+        price_update: BulkPriceUpdate,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Updates the price of many properties in one request.
+
+    The update is given either as explicit `items` (property ID and new price), applied with batched bulk writes,
+    or as a `filter` plus an `adjustment` (percentage or absolute), applied by the database with a single
+    server-side update. Explicit items get a per-item status ('updated', 'unchanged', 'not_found', 'invalid_id').
+
+    Args:
+        price_update (BulkPriceUpdate): Items, or filter and adjustment.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        BulkPriceUpdateResult: Matched, modified and not found totals, and per-item results.
+
+    Example:
+        PUT /bulk-change-price/
+        body: {"items": [{"property_id": "12345", "price": 35000}, {"property_id": "67890", "price": 42000}]}
+
+        PUT /bulk-change-price/
+        body: {"filter": {"min_year": 2000, "id_owner": "JOED1"}, "adjustment": {"type": "percentage", "value": 3.5}}
+
+    """
+    logger.info("Updating prices in bulk")
+    try:
+        result = await property_service.bulk_update_prices(price_update)
+        logger.info("Bulk price update finished: %s matched, %s modified", result.matched, result.modified)
+        return result
+    except Exception as e:
+        logger.error("Error updating prices in bulk: %s", e)
+        handle_db_error(e)
+
+
+@router.post("/sync/", response_model=PropertySyncResult)
+async def sync_properties(
+        *,
+        sync: PropertySync,
+        dry_run: bool = False,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Synchronizes properties from the CRM: creates the ones whose internal code is new and updates the ones whose
+    data changed since the last synchronization, in batched bulk writes. Unchanged properties are not written.
+
+    Args:
+        sync (PropertySync): Properties to synchronize, identified by `code_internal`.
+        dry_run (bool): Only compute the summary, without writing.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        PropertySyncResult: Number of inserted, updated, unchanged and duplicated properties.
+
+    Example:
+        POST /sync/
+        body: {"items": [{"name": "p1", "address": "carrera 1", "price": 1000, "code_internal": "001", "year": 2000,
+                          "id_owner": "JOED1"}]}
+
+    """
+    logger.info("Synchronizing %s properties (dry run: %s)", len(sync.items), dry_run)
+    try:
+        result = await property_service.sync_properties(sync, dry_run)
+        logger.info(
+            "Synchronization finished: %s inserted, %s updated, %s unchanged", result.inserted, result.updated,
+            result.unchanged
+        )
+        return result
+    except Exception as e:
+        logger.error("Error synchronizing properties: %s", e)
         handle_db_error(e)
 
 
 @router.post("/properties/{property_id}/upload-image/", response_model=PropertyImageInDB)
 async def upload_image_to_property(
         property_id: str,
+        background_tasks: BackgroundTasks,
         image: UploadFile = File(...),
         property_service: PropertyService = Depends(get_property_service)
 ) -> Any:
@@ -125,8 +324,13 @@ async def upload_image_to_property(
     saved in the file system and its path is registered in the database. If the
     property does not exist, it returns a 404 error.
 
+    The resized versions of the image (thumbnail, medium, WebP) are generated in the background once the
+    response is sent: the image is returned with `derivatives_status` 'pending', which changes to 'ready'
+    (with the derivatives listed) or 'failed' when the worker pool finishes.
+
     Args:
         property_id (str): The ID of the property to which the image will be added.
+        background_tasks (BackgroundTasks): Tasks executed after the response is sent.
         image (UploadFile): The image to upload.
         property_service (PropertyService): Property service for the interaction with the database.
 
@@ -138,11 +342,554 @@ async def upload_image_to_property(
         body: (multipart/form-data with the image file)
 
     """
-    logger.info(f"Uploading image to property {property_id}")
+    logger.info("Uploading image to property %s", property_id)
+    try:
+        property_img = await property_service.upload_image_to_property(property_id, image)
+        background_tasks.add_task(property_service.generate_image_derivatives, property_img)
+        logger.info("Image uploaded successfully for property %s", property_id)
+        return property_img
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error uploading image to property %s: %s", property_id, e)
+        handle_db_error(e)
+
+
+@router.post("/properties/{property_id}/upload-images/", response_model=PropertyImageBatchResult)
+async def upload_images_to_property(
+        property_id: str,
+        background_tasks: BackgroundTasks,
+        images: List[UploadFile] = File(...),
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Adds several images to an existing property in one request.
+
+    The property is checked once, the files are written to storage concurrently and all the image records are
+    inserted with a single query. Every file is validated on its own: an invalid file is reported as 'rejected'
+    with its error and does not stop the others. If the property does not exist, it returns a 404 error.
+
+    As with single uploads, the derivatives of the new images are generated in the background.
+
+    Args:
+        property_id (str): The ID of the property to which the images will be added.
+        background_tasks (BackgroundTasks): Tasks executed after the response is sent.
+        images (List[UploadFile]): The images to upload (at most `MAX_BATCH_IMAGES`).
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        PropertyImageBatchResult: Number of uploaded and rejected files and the outcome of each one, in order.
+
+    Example:
+        POST /properties/12345/upload-images/
+        body: (multipart/form-data with several `images` files)
+
+    """
+    logger.info("Uploading %s images to property %s", len(images), property_id)
     try:
-        property_img = property_service.upload_image_to_property(property_id, image)
-        logger.info(f"Image uploaded successfully for property {property_id}")
+        result = await property_service.upload_images_to_property(property_id, images)
+        for item in result.items:
+            if item.image is not None and item.image.derivatives_status == "pending":
+                background_tasks.add_task(property_service.generate_image_derivatives, item.image)
+        logger.info(
+            "Images uploaded for property %s: %s uploaded, %s rejected", property_id, result.uploaded, result.rejected
+        )
+        return FastJSONResponse(result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error uploading images to property %s: %s", property_id, e)
+        handle_db_error(e)
+
+
+@router.post("/properties/{property_id}/image-uploads/", response_model=PropertyImageUploadTicket)
+async def create_image_upload(
+        property_id: str,
+        upload: PropertyImageUploadRequest,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Gives a presigned URL to upload an image of an existing property directly to the storage.
+
+    Only available with the S3 image storage (400 otherwise). The client sends the bytes to `url` with the given
+    method and headers, which include the SHA-256 checksum of the file, and then registers the image with
+    `POST /properties/{property_id}/image-uploads/complete/` with the `key` of the ticket. If the property does not
+    exist, it returns a 404 error.
+
+    Args:
+        property_id (str): The ID of the property the image is for.
+        upload (PropertyImageUploadRequest): Name, SHA-256 hex digest and size of the file.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        PropertyImageUploadTicket: Key, URL, method, headers and expiration of the upload.
+
+    Example:
+        POST /properties/12345/image-uploads/
+        body: {"filename": "front.jpg", "content_hash": "9f86d0...", "size": 204800}
+
+    """
+    logger.info("Creating a direct image upload for property %s", property_id)
+    try:
+        return await property_service.create_image_upload(property_id, upload)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error creating an image upload for property %s: %s", property_id, e)
+        handle_db_error(e)
+
+
+@router.post("/properties/{property_id}/image-uploads/complete/", response_model=PropertyImageInDB)
+async def register_image_upload(
+        property_id: str,
+        upload: PropertyImageRegister,
+        background_tasks: BackgroundTasks,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Registers an image uploaded directly to the storage as an image of an existing property.
+
+    The uploaded object is checked (size, checksum and format) and copied to its content key before it is
+    registered; an invalid object is rejected with a 400 (413 when too large). The uploaded object is removed
+    either way. As with the other uploads, the derivatives are generated in the
+    background. If the property does not exist, it returns a 404 error.
+
+    Args:
+        property_id (str): The ID of the property the image is for.
+        upload (PropertyImageRegister): Name and SHA-256 hex digest of the uploaded file.
+        background_tasks (BackgroundTasks): Tasks executed after the response is sent.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        PropertyImageInDB: Object representing the image associated to the property.
+
+    Example:
+        POST /properties/12345/image-uploads/complete/
+        body: {"key": "tmp/4f1c...e2.jpg", "filename": "front.jpg", "content_hash": "9f86d0..."}
+
+    """
+    logger.info("Registering a direct image upload for property %s", property_id)
+    try:
+        property_img = await property_service.register_image_upload(property_id, upload)
+        background_tasks.add_task(property_service.generate_image_derivatives, property_img)
         return property_img
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error registering an image upload for property %s: %s", property_id, e)
+        handle_db_error(e)
+
+
+@router.get("/properties/{property_id}/images/", response_model=List[PropertyImageInDB])
+async def list_property_images(
+        property_id: str,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Lists the images of an existing property, including the status and paths of their derivatives.
+
+    Args:
+        property_id (str): The ID of the property.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        List[PropertyImageInDB]: The images of the property.
+
+    Example:
+        GET /properties/12345/images/
+
+    """
+    logger.info("Listing images of property %s", property_id)
+    try:
+        return await property_service.list_property_images(property_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error listing images of property %s: %s", property_id, e)
+        handle_db_error(e)
+
+
+@router.api_route(
+    "/properties/{property_id}/images/{image_id}", methods=["GET", "HEAD"], response_class=ImageFileResponse,
+    responses={200: {"content": {"image/*": {}}}, 206: {}, 304: {}, 404: {}, 416: {}}
+)
+async def get_property_image(
+        request: Request,
+        property_id: str,
+        image_id: str,
+        variant: Optional[str] = None,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Serves the file of an image of a property, or of one of its derivatives.
+
+    Files are content-addressed and never change, so they are served with a strong ETag derived from the content
+    hash and a long-lived immutable `Cache-Control`. `If-None-Match` is answered with 304, single byte ranges
+    with 206, and the body is sent with zero-copy `sendfile` when the server supports it. With the S3 image
+    storage the response is a redirect (307) to a presigned URL of the object, so the bytes do not go through the API.
+
+    Args:
+        request (Request): The request, for its conditional and range headers.
+        property_id (str): The ID of the property.
+        image_id (str): The ID of the image.
+        variant (str): Name of a derivative (e.g. 'thumbnail'); the original file when omitted.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        ImageFileResponse: The image file.
+
+    Example:
+        GET /properties/12345/images/67890?variant=thumbnail
+
+    """
+    try:
+        file_path, etag = await property_service.get_property_image_file(property_id, image_id, variant)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error getting image %s of property %s: %s", image_id, property_id, e)
+        handle_db_error(e)
+    download_url = property_service.storage.download_url(file_path)
+    if download_url:
+        return RedirectResponse(download_url, status_code=307)
+    return ImageFileResponse(file_path, etag, request.headers, request.method)
+
+
+@router.delete("/properties/{property_id}/images/{image_id}", response_model=PropertyImageInDB)
+async def delete_property_image(
+        property_id: str,
+        image_id: str,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Deletes an image of a property.
+
+    Image files are shared by every image with the same content, so only the record is deleted here: the file
+    (and its derivatives) is removed from the store by `python -m app.scripts.sweep_images` once no image references
+    it.
+
+    Args:
+        property_id (str): The ID of the property.
+        image_id (str): The ID of the image.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        PropertyImageInDB: The deleted image.
+
+    Example:
+        DELETE /properties/12345/images/67890
+
+    """
+    logger.info("Deleting image %s of property %s", image_id, property_id)
+    try:
+        return await property_service.delete_property_image(property_id, image_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error deleting image %s of property %s: %s", image_id, property_id, e)
+        handle_db_error(e)
+
+
+@router.post("/create-trace/", response_model=PropertyTraceInDB)
+async def create_property_trace(
+        *,
+        trace_data: PropertyTraceCreate,
+        background_tasks: BackgroundTasks,
+        property_trace_service: PropertyTraceService = Depends(get_property_trace_service)
+) -> Any:
+    """
+    Registers a sale (trace) of an existing property.
+
+    The sales statistics groups the sale belongs to (its year, the owner of the property and its price band) are
+    recomputed in the background once the response is sent. If the property does not exist, it returns a 404 error.
+
+    Args:
+        trace_data (PropertyTraceCreate): Date, name, value and tax of the sale, and the ID of the property.
+        background_tasks (BackgroundTasks): Tasks executed after the response is sent.
+        property_trace_service (PropertyTraceService): Trace service for the interaction with the database.
+
+    Returns:
+        PropertyTraceInDB: The registered sale.
+
+    Example:
+        POST /create-trace/
+            {
+              "date_sale": "2023-05-10",
+              "name": "venta_1",
+              "value": 250000,
+              "tax": 5000,
+              "id_property": "12345"
+            }
+
+    """
+    logger.info("Registering a sale of property %s", trace_data.id_property)
+    try:
+        trace = await property_trace_service.create_trace(trace_data)
+        background_tasks.add_task(property_trace_service.refresh_sales_statistics, trace)
+        return trace
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error registering a sale of property %s: %s", trace_data.id_property, e)
+        handle_db_error(e)
+
+
+@router.get("/statistics/sales", response_model=List[SalesRollup])
+async def get_sales_statistics(
+        group_by: str = Query("year", regex="^(year|owner|price_band)$"),
+        property_trace_service: PropertyTraceService = Depends(get_property_trace_service)
+) -> Any:
+    """
+    Returns the sales statistics (count, average and median sale value, sales volume and total tax) grouped by
+    sale year, owner or price band.
+
+    The statistics are materialized by the database and kept up to date as sales are registered, so this endpoint
+    reads one small document per group instead of aggregating the sale history.
+
+    Args:
+        group_by (str): 'year', 'owner' or 'price_band'.
+        property_trace_service (PropertyTraceService): Trace service for the interaction with the database.
+
+    Returns:
+        List[SalesRollup]: The statistics of each group.
+
+    Example:
+        GET /statistics/sales?group_by=price_band
+
+    """
+    try:
+        return await property_trace_service.get_sales_statistics(group_by)
+    except Exception as e:
+        logger.error("Error getting the sales statistics by %s: %s", group_by, e)
+        handle_db_error(e)
+
+
+@router.get("/search", response_model=PropertySearchPage)
+async def search_properties(
+        *,
+        q: str = Query(..., min_length=1, max_length=200),
+        filters: PropertyFilter = Depends(),
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Searches properties by the words of their name and address, most relevant first.
+
+    The search uses the text index on name and address: properties matching any of the words are returned, those
+    matching more of them first, and a match in the name weighs more than one in the address. Words match
+    regardless of case, accents and, for the configured language, plural or gender endings.
+    "Quoted phrases" must appear as such and -words exclude results. The structured filters of the listing can be
+    combined with the search. Each page returns a `next_cursor` to request the following one.
+
+    Args:
+        q (str): Searched text.
+        filters (PropertyFilter): Price range, year range, owner and internal code filters.
+        limit (int): Maximum number of properties per page.
+        cursor (str): Cursor returned by the previous page.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        PropertySearchPage: The properties of the page with their relevance, and the cursor of the next one.
+
+    Example:
+        GET /search?q=apartamento chapinero&max_price=500000
+        GET /search?q=casa campestre&cursor=eyJzIjoi...
+
+    """
+    logger.info("Searching properties for %r with filters %s", q, filters)
+    try:
+        page = await property_service.search_properties(q, filters, limit, cursor)
+        return FastJSONResponse(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error searching properties: %s", e)
+        handle_db_error(e)
+
+
+@router.get("/nearby", response_model=List[PropertyNearby])
+async def list_nearby_properties(
+        *,
+        filters: PropertyFilter = Depends(),
+        lng: Optional[float] = Query(None, ge=-180, le=180),
+        lat: Optional[float] = Query(None, ge=-90, le=90),
+        radius: Optional[float] = Query(None, gt=0),
+        bbox: Optional[str] = Query(None, regex=BBOX_REGEX),
+        limit: int = Query(50, ge=1, le=500),
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Lists the properties around a point and/or inside a bounding box (e.g. a map viewport), nearest first.
+
+    Properties are found through the `2dsphere` index on their location, combined with the price, year, owner and
+    internal code filters; properties without a location are never returned. Each result carries its distance in
+    meters to the point, or to the center of the bounding box when no point is given.
+
+    Args:
+        filters (PropertyFilter): Price range, year range, owner and internal code filters.
+        lng (float): Longitude of the point.
+        lat (float): Latitude of the point.
+        radius (float): Maximum distance to the point, in meters.
+        bbox (str): Bounding box as 'min_lng,min_lat,max_lng,max_lat'.
+        limit (int): Maximum number of properties to return.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        List[PropertyNearby]: The properties found with their distance.
+
+    Example:
+        GET /nearby?lng=-74.05&lat=4.67&radius=2000&max_price=500000
+        GET /nearby?bbox=-74.10,4.60,-74.00,4.70&min_year=2000&limit=100
+
+    """
+    logger.info("Listing properties near (%s, %s) radius %s bbox %s", lng, lat, radius, bbox)
+    try:
+        properties = await property_service.list_nearby_properties(
+            filters, lng, lat, radius, parse_bbox(bbox), limit
+        )
+        return FastJSONResponse(properties)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error listing nearby properties: %s", e)
+        handle_db_error(e)
+
+
+@router.get("/export", response_class=StreamingResponse, responses={200: {"content": {
+    "application/x-ndjson": {}, "text/csv": {}, "application/bson": {}, "application/gzip": {}
+}}})
+async def export_properties(
+        export_format: str = Query("ndjson", alias="format", regex="^(ndjson|csv|bson)$"),
+        traces: bool = False,
+        gzip: bool = False,
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Exports the whole property catalog as a file download.
+
+    The file is streamed from a database cursor and encoded on the fly (optionally gzip compressed), so memory
+    stays flat whatever the size of the catalog. With `traces`, the sales of each property are joined in.
+    The same export is available from the command line with `python -m app.scripts.export_properties`.
+
+    Args:
+        export_format (str): 'ndjson' (one JSON object per line), 'csv' or 'bson' (raw documents, as mongodump).
+        traces (bool): Whether to include the sales of each property.
+        gzip (bool): Whether to gzip the file.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        StreamingResponse: The export file.
+
+    Example:
+        GET /export?format=csv&traces=true&gzip=true
+
+    """
+    logger.info("Exporting properties as %s (traces: %s, gzip: %s)", export_format, traces, gzip)
+    media_type = "application/gzip" if gzip else EXPORT_FORMATS[export_format][0]
+    return StreamingResponse(
+        property_service.export_properties(export_format, traces, gzip), media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(export_format, gzip)}"'}
+    )
+
+
+@router.get("/events", response_class=StreamingResponse, responses={200: {"content": {"text/event-stream": {}}}})
+async def property_events(
+        request: Request,
+        types: Optional[str] = Query(None, regex=EVENT_TYPES_REGEX),
+        last_event_id: Optional[str] = None,
+        last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+        property_repo: PropertyRepository = Depends(get_property_repository)
+) -> Any:
+    """
+    Streams the creations and price changes of properties as server-sent events, instead of polling for them.
+
+    Each event carries an `id`; a client that reconnects sends the last one it received (browsers' `EventSource`
+    does it with the `Last-Event-ID` header, other clients can use the `last_event_id` parameter) and gets the
+    events it missed before the live ones. When that position can no longer be resumed, a 'reset' event is sent
+    first: the client must refetch the properties it holds. Idle connections get a keep-alive comment every
+    `PROPERTY_EVENTS_HEARTBEAT` seconds.
+
+    Args:
+        request (Request): The request, to stop streaming once the client disconnects.
+        types (str): Comma separated event types to receive: 'property_created', 'price_changed' (all by default).
+        last_event_id (str): ID of the last event received, to resume after it.
+        last_event_id_header (str): Same as `last_event_id`, sent by `EventSource` on reconnection.
+        property_repo (PropertyRepository): Property repository, to open the change stream.
+
+    Returns:
+        StreamingResponse: The `text/event-stream` feed.
+
+    Example:
+        GET /events?types=price_changed
+        Last-Event-ID: 8265...
+
+    """
+    wanted = set(types.split(",")) if types else None
+    resume_after = last_event_id_header or last_event_id
+    logger.info("Streaming property events after %s", resume_after)
+
+    async def feed():
+        async for event in stream_events(property_repo, resume_after):
+            if event is not None and wanted and event.type != "reset" and event.type not in wanted:
+                continue
+            yield format_event(event)
+            if await request.is_disconnected():
+                break
+
+    return StreamingResponse(
+        feed(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{property_id}", response_model=PropertyDetail, response_model_exclude_unset=True)
+async def get_property(
+        property_id: str,
+        expand: Optional[str] = Query(None, regex=EXPAND_REGEX),
+        if_none_match: Optional[str] = Header(None),
+        property_service: PropertyService = Depends(get_property_service)
+) -> Any:
+    """
+    Gets a real estate property by its ID.
+
+    With `expand`, the owner, the images and/or the most recent sales of the property are embedded in the response.
+    They are joined by the database in a single aggregation, so the whole view costs one round trip.
+
+    Without `expand`, the response carries an `ETag` derived from the version of the property; a request whose
+    `If-None-Match` matches it is answered with 304 and no body, without serializing the property. Expanded views
+    have no ETag, since the related documents change independently of the property version.
+
+    Args:
+        property_id (str): The ID of the property.
+        expand (str): Comma separated relations to embed: 'owner', 'images', 'traces'.
+        if_none_match (str): ETags the client already holds.
+        property_service (PropertyService): Property service for the interaction with the database.
+
+    Returns:
+        PropertyDetail: The property and the requested relations.
+
+    Example:
+        GET /12345?expand=owner,images,traces
+        GET /12345 with If-None-Match: "12345-3"
+
+    """
+    try:
+        expand = parse_expand(expand)
+        property_detail = await property_service.get_property(property_id, expand)
+        if expand:
+            return FastJSONResponse(property_detail)
+        etag = version_etag(property_detail.id, property_detail.version)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return FastJSONResponse(property_detail, headers={"ETag": etag})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error uploading image to property {property_id}: {e}")
+        logger.error("Error getting property %s: %s", property_id, e)
         handle_db_error(e)
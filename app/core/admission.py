@@ -0,0 +1,158 @@
+"""
+Admission control: caps the requests a worker works on at once and sheds the excess early.
+
+Requests are grouped in route classes (reads, writes, uploads), each one with its own limit of requests in flight,
+so a burst of uploads can not take the MongoDB connections the reads need. A request over the limit waits in a
+bounded queue, first come first served, for at most `ADMISSION_QUEUE_TIMEOUT` seconds; when the queue is full or
+the deadline passes it gets a 503 with `Retry-After` right away, instead of piling up on the connection pool until
+every request times out.
+
+Limits are per worker process. With the defaults, the limits of every class together stay under
+`MONGO_MAX_POOL_SIZE`, so admitted requests do not wait for a connection.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+
+# Methods that do not change data.
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """
+    Returns the route class of a request ('read', 'write' or 'upload'), or None if it is not admission controlled
+    (internal endpoints and long-lived streams).
+    """
+    if any(path == exempt or path.startswith(exempt.rstrip("/") + "/") for exempt in settings.ADMISSION_EXEMPT_PATHS):
+        return None
+    if method in READ_METHODS:
+        return "read"
+    return "upload" if "upload" in path else "write"
+
+
+class AdmissionLimiter:
+    """
+    Limit of concurrent requests with a bounded FIFO wait queue.
+
+    Args:
+        limit (int): Requests allowed in flight.
+        queue_size (int): Requests allowed to wait for a slot; the next ones are rejected at once.
+        timeout (float): Seconds a request waits for a slot before it is rejected.
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Takes a slot, waiting for one if needed.
+
+        Returns:
+            str: None once the slot is taken, or why the request is rejected: 'queue_full' or 'timeout'.
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # `release` hands its slot over to the waiter, so `in_flight` is not changed here
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            return "timeout"
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        return None
+
+    def release(self) -> None:
+        """
+        Frees a slot, handing it over to the oldest waiting request if there is one.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that admits each HTTP request through the limiter of its route class.
+
+    Rejected requests get a 503 with `Retry-After` and are counted in `http_admission_rejected_total`; the time
+    admitted requests waited is recorded in `http_admission_wait_seconds`. Route classes missing from
+    `ADMISSION_LIMITS` are not limited.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        limits (dict): Limit and queue size of each route class ({"read": {"limit": 64, "queue": 256}, ...}).
+        timeout (float): Seconds a request waits in the queue.
+        retry_after (int): Seconds sent in the `Retry-After` header of the rejections.
+    """
+
+    def __init__(
+        self, app: ASGIApp, limits: Optional[Dict[str, dict]] = None, timeout: Optional[float] = None,
+        retry_after: Optional[int] = None
+    ):
+        self.app = app
+        limits = settings.ADMISSION_LIMITS if limits is None else limits
+        timeout = settings.ADMISSION_QUEUE_TIMEOUT if timeout is None else timeout
+        self.retry_after = settings.ADMISSION_RETRY_AFTER if retry_after is None else retry_after
+        self.limiters = {
+            name: AdmissionLimiter(config["limit"], config.get("queue", 0), timeout) for name, config in limits.items()
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter_class = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        limiter = self.limiters.get(limiter_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        rejected = await limiter.acquire()
+        if rejected:
+            ADMISSION_REJECTED.inc(limiter_class, rejected)
+            response = JSONResponse(
+                {"detail": "The server is overloaded, retry later"}, status_code=503,
+                headers={"Retry-After": str(self.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - started, limiter_class)
+        ADMISSION_IN_FLIGHT.inc(limiter_class)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ADMISSION_IN_FLIGHT.dec(limiter_class)
+            limiter.release()
@@ -0,0 +1,213 @@
+"""
+Read-through cache with bounded LRU + TTL eviction and single-flight loading.
+
+`ReadThroughCache` keeps entries in a local `LRUCache` and, optionally, in a shared backend (e.g. Redis) so that
+several workers can reuse each other's reads. Concurrent misses for the same key are coalesced: only the first one
+runs the loader and the others await its result.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Type
+
+from pydantic import BaseModel
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    In-process cache bounded by size (least recently used entries are evicted first) and by age.
+
+    Args:
+        maxsize (int): Maximum number of entries.
+        ttl (float): Seconds an entry stays valid.
+        clock (Callable): Monotonic clock, replaceable in tests.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (value, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCacheBackend:
+    """
+    Cache backend shared between processes, on top of any client with the `redis.asyncio` interface
+    (`get`, `set(..., ex=)`, `delete`, `incr`). Values are pydantic models stored as JSON.
+
+    Keys carry a generation number stored under `<prefix>generation`: `clear` increments it, so every worker stops
+    seeing the entries written before, which then expire with their TTL.
+
+    Args:
+        client: Redis-like asynchronous client (or a local stand-in with the same methods).
+        model (Type[BaseModel]): Model of the cached values.
+        ttl (float): Seconds an entry stays valid.
+        prefix (str): Prefix of the keys.
+    """
+
+    def __init__(self, client, model: Type[BaseModel], ttl: float, prefix: str):
+        self.client = client
+        self.model = model
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def key(self, key: Hashable) -> str:
+        """
+        Returns the backend key of `key` in the current generation.
+        """
+        generation = await self.client.get(f"{self.prefix}generation")
+        return f"{self.prefix}{int(generation or 0)}:{key}"
+
+    async def get(self, backend_key: str) -> Any:
+        raw = await self.client.get(backend_key)
+        return _MISSING if raw is None else self.model.parse_raw(raw)
+
+    async def set(self, backend_key: str, value: Any) -> None:
+        payload = value.json(by_alias=True) if isinstance(value, BaseModel) else self.model(**value).json(by_alias=True)
+        await self.client.set(backend_key, payload, ex=max(1, int(self.ttl)))
+
+    async def delete(self, key: Hashable) -> None:
+        await self.client.delete(await self.key(key))
+
+    async def clear(self) -> None:
+        await self.client.incr(f"{self.prefix}generation")
+
+
+class ReadThroughCache:
+    """
+    Read-through cache with a local LRU + TTL tier, an optional shared tier and single-flight loading.
+
+    Args:
+        local (LRUCache): In-process tier.
+        shared (SharedCacheBackend): Optional tier shared between workers.
+    """
+
+    def __init__(self, local: LRUCache, shared: Optional[SharedCacheBackend] = None):
+        self.local = local
+        self.shared = shared
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the cached value of `key`, calling `loader` on a miss.
+
+        Concurrent misses for the same key share a single call to `loader`. Exceptions raised by the loader are
+        propagated to every waiter and nothing is cached.
+        """
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            # The backend key is resolved once, so a load that overlaps a `clear` is stored in the old generation
+            shared_key = await self.shared.key(key) if self.shared else None
+            value = await self.shared.get(shared_key) if self.shared else _MISSING
+            if value is not _MISSING:
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+                value = await loader()
+            # A write may have invalidated the key while it was loading: serve the value but do not cache it
+            if self._inflight.get(key) is future:
+                self.local.set(key, value)
+                if self.shared:
+                    await self.shared.set(shared_key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def invalidate(self, key: Hashable) -> None:
+        """
+        Removes `key` from every tier and detaches any in-flight load, so its result is not cached.
+        """
+        self.invalidations += 1
+        self.local.delete(key)
+        self._inflight.pop(key, None)
+        if self.shared:
+            await self.shared.delete(key)
+
+    async def clear(self) -> None:
+        """
+        Removes every entry of every tier. Used after writes that can not tell which keys they touched.
+        """
+        self.invalidations += 1
+        self.local.clear()
+        self._inflight.clear()
+        if self.shared:
+            await self.shared.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the cache, to size it.
+        """
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+            "ttl": self.local.ttl,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+        }
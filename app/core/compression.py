@@ -0,0 +1,162 @@
+"""
+Response compression negotiated with `Accept-Encoding`: brotli when the optional `brotli` package is installed and
+the client accepts it, gzip otherwise.
+
+Only text-like responses (JSON, NDJSON, CSV) of at least `COMPRESSION_MINIMUM_SIZE` bytes are compressed; small
+bodies are not worth the CPU, and images or already compressed downloads (`export?gzip=true`) are sent as they are.
+Streamed responses (exports) are compressed chunk by chunk, so they keep streaming.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# Media types worth compressing; event streams are left out, since they must not be buffered.
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain")
+
+_brotli = None
+
+
+def get_brotli():
+    """
+    Returns the `brotli` module, or None when the optional dependency is not installed.
+    """
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli  # Optional dependency, only needed to serve brotli
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return _brotli or None
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Returns the content coding to use for an `Accept-Encoding` header: 'br', 'gzip' or None.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    if accepted.get("br", wildcard) > 0 and get_brotli() is not None:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """
+    Incremental compressor of one response body.
+    """
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = get_brotli().Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 writes the gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            output = self._brotli.process(data)
+            return output + (self._brotli.finish() if final else self._brotli.flush())
+        output = self._zlib.compress(data)
+        return output + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses the responses of the clients that accept it.
+
+    Compressed responses get `Content-Encoding` and `Vary: Accept-Encoding`, and their strong ETag is turned into
+    a weak one (the compressed bytes are a different representation), which still validates `If-None-Match`.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        minimum_size (int): Smallest body, in bytes, that is compressed.
+        gzip_level (int): Compression level of gzip (1-9).
+        brotli_quality (int): Quality of brotli (0-11).
+    """
+
+    def __init__(
+        self, app: ASGIApp, minimum_size: Optional[int] = None, gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None
+    ):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = None
+        if scope["type"] == "http":
+            encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held until the first chunk of the body tells whether it is worth compressing
+                start = message
+                return
+            if compressor is not None:
+                more_body = message.get("more_body", False)
+                await send({
+                    "type": "http.response.body", "body": compressor.compress(message.get("body", b""), not more_body),
+                    "more_body": more_body,
+                })
+                return
+
+            start["headers"] = list(start.get("headers", []))
+            headers = MutableHeaders(raw=start["headers"])
+            compressible = headers.get("content-type", "").split(";")[0].strip() in COMPRESSIBLE_TYPES
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if (
+                message["type"] != "http.response.body" or not compressible or "content-encoding" in headers
+                or start["status"] < 200 or start["status"] in (204, 304)
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+            body = compressor.compress(body, not more_body)
+            headers["Content-Encoding"] = encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
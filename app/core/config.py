@@ -1,5 +1,8 @@
+import json
 import os
 from dotenv import load_dotenv
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -20,10 +23,67 @@ class Settings(BaseModel):
             DATABASE_URL (str): Connection URL to the main MongoDB database.
             DATABASE_TEST_URL (str): Connection URL to the MongoDB test database.
             DATABASE_PORT (int): Port for the database connection.
+            MONGO_MAX_POOL_SIZE (int): Maximum number of connections of the pool per server.
+            MONGO_MIN_POOL_SIZE (int): Connections kept open per server, opened at startup.
+            MONGO_MAX_IDLE_TIME_MS (int): Milliseconds an idle connection stays in the pool (no limit when unset).
+            MONGO_WAIT_QUEUE_TIMEOUT_MS (int): Milliseconds a request waits for a free connection before failing.
+            MONGO_SERVER_SELECTION_TIMEOUT_MS (int): Milliseconds to find an available server before failing.
+            MONGO_CONNECT_TIMEOUT_MS (int): Milliseconds to open a connection.
+            MONGO_SOCKET_TIMEOUT_MS (int): Milliseconds to wait for a reply on a connection (no limit when unset).
+            MONGO_READ_PREFERENCE (str): Read preference mode (e.g. 'primary', 'primaryPreferred', 'nearest').
+            MONGO_COMPRESSORS (str): Comma separated wire compressors to negotiate ('zstd', 'snappy', 'zlib').
+            WORKERS (int): Number of server worker processes in production (one per CPU core by default).
+            BIND (str): Address the production server listens on.
+            ADMISSION_LIMITS (dict): Requests in flight ('limit') and waiting ('queue') allowed per worker for each
+                route class: 'read', 'write' and 'upload'. A class left out is not limited.
+            ADMISSION_QUEUE_TIMEOUT (float): Seconds a request waits for a slot before it is rejected with a 503.
+            ADMISSION_RETRY_AFTER (int): Seconds clients are told to wait (`Retry-After`) before retrying a rejection.
+            ADMISSION_EXEMPT_PATHS (list): Path prefixes that bypass the admission control (internal endpoints and
+                long-lived streams).
+            COMPRESSION_MINIMUM_SIZE (int): Smallest response body, in bytes, compressed with gzip or brotli.
+            COMPRESSION_GZIP_LEVEL (int): Compression level of gzip responses (1-9).
+            COMPRESSION_BROTLI_QUALITY (int): Quality of brotli responses (0-11), when the `brotli` package is
+                installed.
             LOG_LEVEL (str): Log level for the application log output.
+            LOG_FORMAT (str): Format of the log output, 'json' (one object per line) or 'text'.
+            LOG_SAMPLE_RATE (float): Fraction of the requests whose INFO lines are logged (warnings and errors are
+                always logged).
             IMAGES_DIRECTORY (str): Directory for storing loaded images.
             MAX_FILE_SIZE_MG (int): Maximum file size allowed for uploads.
+            UPLOAD_CHUNK_SIZE (int): Size in bytes of the chunks used to stream uploads to disk.
+            MAX_BATCH_IMAGES (int): Maximum number of files in a batch image upload.
+            UPLOAD_CONCURRENCY (int): Files of a batch image upload written to storage at the same time.
+            IMAGE_STORAGE (str): Store of the image files: 'local' (IMAGES_DIRECTORY) or 's3' (requires boto3).
+            S3_BUCKET (str): Bucket of the S3 image store.
+            S3_ENDPOINT_URL (str): Endpoint of an S3-compatible service (e.g. MinIO); AWS when not set.
+            S3_PUBLIC_ENDPOINT_URL (str): Endpoint the clients reach the storage through, used to sign their URLs
+                when it differs from S3_ENDPOINT_URL.
+            S3_REGION (str): Region of the bucket.
+            S3_ACCESS_KEY_ID (str): Access key of the S3 store; the default boto3 credentials when not set.
+            S3_SECRET_ACCESS_KEY (str): Secret key of the S3 store.
+            S3_PRESIGN_EXPIRES (int): Seconds the presigned upload and download URLs are valid.
+            BULK_WRITE_BATCH_SIZE (int): Number of operations sent per bulk write.
+            EXPORT_BATCH_SIZE (int): Number of documents fetched per round trip by the catalog export.
             EXTENTIONS_FILE_LIST (list): List of file extensions allowed for uploads.
+            IMAGE_DERIVATIVES (list): Resized versions generated for each uploaded image (name, width, height, format).
+            IMAGE_WORKERS (int): Number of worker processes that generate image derivatives.
+            PROPERTY_CACHE_SIZE (int): Maximum number of properties kept in the in-process cache (0 disables it).
+            PROPERTY_CACHE_LOCAL_TTL (float): Seconds a property stays in the in-process cache, and so the longest time
+                a worker may serve a property changed through another worker.
+            PROPERTY_CACHE_TTL (float): Seconds a property stays in the shared cache.
+            CACHE_REDIS_URL (str): Optional Redis URL of a cache tier shared between workers.
+            PRICE_BANDS (list): Lower bounds of the price bands used by the sales statistics.
+            EXPAND_IMAGES_LIMIT (int): Maximum number of images embedded in an expanded property.
+            EXPAND_TRACES_LIMIT (int): Maximum number of sales embedded in an expanded property.
+            TEXT_SEARCH_LANGUAGE (str): Language of the text index on name and address (stemming and stop words),
+                'none' to index the words as they are.
+            PROPERTY_EVENTS_SOURCE (str): Source of the event feed: 'change_stream' (requires a replica set), 'memory'
+                (writes of the same worker process only) or 'auto' to use change streams when available.
+            PROPERTY_EVENTS_BUFFER_SIZE (int): Number of recent events each worker keeps to replay on reconnection
+                (memory source).
+            PROPERTY_EVENTS_QUEUE_SIZE (int): Events a slow client can fall behind before it is disconnected (memory
+                source).
+            PROPERTY_EVENTS_HEARTBEAT (float): Seconds between keep-alive comments on an idle event feed.
     """
 
     # Project
@@ -35,11 +95,88 @@ class Settings(BaseModel):
     DATABASE_TEST_URL: str = os.getenv("MONGODB_TEST_URI") if os.getenv("ENVIRONMENT") == "test" else os.getenv("MONGODB_URI")
     DATABASE_PORT = int(os.getenv("DATABASE_PORT", 27017))
 
+    # Connection pool
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", 10))
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = int(os.getenv("MONGO_MAX_IDLE_TIME_MS")) if os.getenv("MONGO_MAX_IDLE_TIME_MS") else None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS")) if os.getenv("MONGO_SOCKET_TIMEOUT_MS") else None
+    MONGO_READ_PREFERENCE: str = os.getenv("MONGO_READ_PREFERENCE", "primary")
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")
+
+    # Server
+    WORKERS: int = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    BIND: str = os.getenv("BIND", "0.0.0.0:8000")
+
+    # Admission control
+    ADMISSION_LIMITS: dict = json.loads(os.getenv("ADMISSION_LIMITS", json.dumps({
+        "read": {"limit": 64, "queue": 256},
+        "write": {"limit": 16, "queue": 64},
+        "upload": {"limit": 4, "queue": 16},
+    })))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 1.0))
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+    ADMISSION_EXEMPT_PATHS: list = json.loads(os.getenv("ADMISSION_EXEMPT_PATHS", json.dumps([
+        "/metrics", "/pool/stats", "/docs", "/redoc", "/openapi.json", "/api/v1/property/events",
+    ])))
+
+    # Compression
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
     # General
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "info")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
     IMAGES_DIRECTORY: str = os.getenv("IMAGES_DIRECTORY", "app/images/")
     MAX_FILE_SIZE_MG: int = 5
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", 256 * 1024))
+    MAX_BATCH_IMAGES: int = int(os.getenv("MAX_BATCH_IMAGES", 50))
+    UPLOAD_CONCURRENCY: int = int(os.getenv("UPLOAD_CONCURRENCY", 8))
+    IMAGE_STORAGE: str = os.getenv("IMAGE_STORAGE", "local")
+    S3_BUCKET: Optional[str] = os.getenv("S3_BUCKET")
+    S3_ENDPOINT_URL: Optional[str] = os.getenv("S3_ENDPOINT_URL")
+    S3_PUBLIC_ENDPOINT_URL: Optional[str] = os.getenv("S3_PUBLIC_ENDPOINT_URL")
+    S3_REGION: Optional[str] = os.getenv("S3_REGION")
+    S3_ACCESS_KEY_ID: Optional[str] = os.getenv("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY: Optional[str] = os.getenv("S3_SECRET_ACCESS_KEY")
+    S3_PRESIGN_EXPIRES: int = int(os.getenv("S3_PRESIGN_EXPIRES", 900))
     EXTENTIONS_FILE_LIST: list = ["jpg", "jpeg", "png", "gif"]
+    BULK_WRITE_BATCH_SIZE: int = int(os.getenv("BULK_WRITE_BATCH_SIZE", 1000))
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+    # Images
+    IMAGE_DERIVATIVES: list = json.loads(os.getenv("IMAGE_DERIVATIVES", json.dumps([
+        {"name": "thumbnail", "width": 320, "height": 320, "format": "JPEG"},
+        {"name": "medium", "width": 1280, "height": 1280, "format": "JPEG"},
+        {"name": "webp", "width": 1280, "height": 1280, "format": "WEBP"},
+    ])))
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", 2))
+
+    # Cache
+    PROPERTY_CACHE_SIZE: int = int(os.getenv("PROPERTY_CACHE_SIZE", 10000))
+    PROPERTY_CACHE_LOCAL_TTL: float = float(os.getenv("PROPERTY_CACHE_LOCAL_TTL", 2))
+    PROPERTY_CACHE_TTL: float = float(os.getenv("PROPERTY_CACHE_TTL", 30))
+    CACHE_REDIS_URL: Optional[str] = os.getenv("CACHE_REDIS_URL")
+
+    # Expanded views
+    EXPAND_IMAGES_LIMIT: int = int(os.getenv("EXPAND_IMAGES_LIMIT", 20))
+    EXPAND_TRACES_LIMIT: int = int(os.getenv("EXPAND_TRACES_LIMIT", 20))
+
+    # Search
+    TEXT_SEARCH_LANGUAGE: str = os.getenv("TEXT_SEARCH_LANGUAGE", "spanish")
+
+    # Event feed
+    PROPERTY_EVENTS_SOURCE: str = os.getenv("PROPERTY_EVENTS_SOURCE", "auto")
+    PROPERTY_EVENTS_BUFFER_SIZE: int = int(os.getenv("PROPERTY_EVENTS_BUFFER_SIZE", 1000))
+    PROPERTY_EVENTS_QUEUE_SIZE: int = int(os.getenv("PROPERTY_EVENTS_QUEUE_SIZE", 100))
+    PROPERTY_EVENTS_HEARTBEAT: float = float(os.getenv("PROPERTY_EVENTS_HEARTBEAT", 15))
+
+    # Statistics
+    PRICE_BANDS: list = json.loads(os.getenv("PRICE_BANDS", "[0, 100000, 250000, 500000, 1000000]"))
 
 
 # Instancia de la configuración
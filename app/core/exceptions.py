@@ -1,6 +1,12 @@
 from fastapi import HTTPException
 
 
+class PreconditionFailed(Exception):
+    """
+    Raised when a conditional write finds the document at another version than the one the client expected.
+    """
+
+
 def handle_db_error(error):
     """
     Maneja errores de base de datos y lanza una excepción HTTP.
@@ -1,26 +1,200 @@
+"""
+Logging of the application.
+
+Log calls never write to the console themselves: the root logger has a single `QueueHandler` that puts each
+record on an in-memory queue, and a `QueueListener` thread formats them as JSON lines and writes them to stderr.
+A request therefore only pays for appending a record to the queue, not for formatting it or for the I/O.
+
+- Records are formatted lazily: the `%` arguments are merged into the message by the listener, and only for the
+  records that pass the level and sampling filters. Log with `logger.info("... %s", value)`, never with f-strings.
+- Every record logged while serving a request carries its request ID (`X-Request-ID` header, or a generated one),
+  set by `RequestContextMiddleware` and echoed in the response.
+- `LOG_SAMPLE_RATE` keeps the INFO (and DEBUG) lines of only that fraction of the requests. The decision is taken
+  once per request, so a request keeps all or none of its lines; warnings and errors are always kept.
+"""
+import atexit
 import logging
+import os
+import queue
+import random
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Attributes of every `LogRecord`; anything else on a record was passed through `extra` and is logged as a field.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_sampled_var: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line: time, level, logger, message, request ID, the fields passed
+    through `extra` and the traceback, if any.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Human readable format, for development (`LOG_FORMAT=text`).
+    """
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s',
+                         datefmt='%Y-%m-%d %H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        return super().format(record)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamps each record with the ID of the request being served and drops the INFO and DEBUG records of the requests
+    left out of the sample. Runs in the thread that logs, where the request context is available.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.INFO and not request_sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    `QueueHandler` that enqueues the record as is. The standard handler formats the message before enqueuing it,
+    which is the work this pipeline moves to the listener thread. The queue is in-process, so the record (and
+    its arguments) need not be made picklable.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_handler: Optional[LazyQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _start_listener():
+    """
+    Starts the thread that writes the queued records, with a fresh queue.
+    """
+    global _listener
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(TextFormatter() if settings.LOG_FORMAT == "text" else JSONFormatter())
+    _handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(_handler.queue, stream_handler)
+    _listener.start()
+
+
+def _restart_listener_after_fork():
+    # Threads do not survive fork(): a server worker forked after the logging setup would fill a queue nobody reads
+    if _listener is not None:
+        _start_listener()
+
+
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
 
 
 def setup_logging():
     """
     Configures the logging system for the application.
 
-    This function sets the basic settings for logging, including the severity level,
-    the message format and the date and time format. The settings defined here apply
-    to all logs created in the application.
+    Installs the queue handler on the root logger, with the level of `settings.LOG_LEVEL`, and starts the listener
+    thread that writes the records to stderr, as JSON lines (`LOG_FORMAT=json`, the default) or as text
+    (`LOG_FORMAT=text`). Calling it again has no effect.
+    """
+    global _handler
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL.upper())
+    if _handler is not None:
+        return
+    _handler = LazyQueueHandler(queue.SimpleQueue())
+    _handler.addFilter(RequestContextFilter())
+    root.addHandler(_handler)
+    _start_listener()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Writes the queued records and stops the listener thread.
+    """
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
 
-    The logging level is set to INFO, which means that all events of this and higher levels (WAR) will be logged.
-    this level and higher levels (WARNING, ERROR, CRITICAL) will be logged.
 
-    Log message format:
-    - Date and time of the event.
-    - Name of the logger that generated the log
-    - Severity level of the event
-    - Log message
+class RequestContextMiddleware:
     """
-    logging.basicConfig(level=logging.INFO,
-                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                        datefmt='%Y-%m-%d %H:%M:%S')
+    ASGI middleware that assigns an ID to every request (the incoming `X-Request-ID` header, or a new one), makes it
+    available to the log records of the request and returns it in the response headers. It also decides whether
+    the INFO lines of the request are logged (`LOG_SAMPLE_RATE`).
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = settings.LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        raw_request_id = request_id.encode("latin-1")
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER.encode(), raw_request_id)
+                ]
+            await send(message)
+
+        id_token = request_id_var.set(request_id)
+        sampled_token = request_sampled_var.set(self.sample_rate >= 1 or random.random() < self.sample_rate)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(id_token)
+            request_sampled_var.reset(sampled_token)
 
 
 logger = logging.getLogger(__name__)
@@ -0,0 +1,328 @@
+"""
+In-process metrics exposed in the Prometheus text format at `/metrics`.
+
+- HTTP: per-route latency histogram and per-route/status counter, recorded by `MetricsMiddleware`, and the in
+  flight, queue wait and rejection metrics of the admission control (`app/core/admission.py`).
+- MongoDB: per-command latency histogram and error counter (`MongoCommandListener`), and connection pool gauges
+  and checkout wait histogram (`MongoPoolListener`), registered on the client in `app/db/mongodb.py`.
+
+Metrics are kept per process: with several workers, each one is scraped (or aggregated) separately.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) of the latency buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Listener callbacks run in the driver threads, so updates are serialized with a lock
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonic counter, one series per combination of label values.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def _samples(self) -> List[str]:
+        values = self.items()
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    """
+    Value that goes up and down.
+    """
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets, with their sum and count.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: non-cumulative count of each bucket (plus +Inf), sum and count
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def totals(self, *labels: str) -> Tuple[int, float]:
+        """
+        Returns the number of observations of a series and their sum.
+        """
+        with self._lock:
+            series = self._series.get(labels)
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        lines = []
+        for labels, bucket_counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode()
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+))
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP responses by route and status code.", ("method", "route", "status")
+))
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "http_admission_in_flight", "Requests admitted and in progress by route class.", ("class",)
+))
+ADMISSION_QUEUE_WAIT = registry.register(Histogram(
+    "http_admission_wait_seconds", "Time admitted requests waited for a slot by route class.", ("class",)
+))
+ADMISSION_REJECTED = registry.register(Counter(
+    "http_admission_rejected_total", "Requests shed with a 503 by route class and reason.", ("class", "reason")
+))
+MONGO_COMMAND_DURATION = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by command.", ("command",)
+))
+MONGO_COMMAND_ERRORS = registry.register(Counter(
+    "mongodb_command_errors_total", "Failed MongoDB commands by command.", ("command",)
+))
+MONGO_POOL_CONNECTIONS = registry.register(Gauge(
+    "mongodb_pool_connections", "Open connections of the MongoDB pool by server.", ("address",)
+))
+MONGO_POOL_CHECKED_OUT = registry.register(Gauge(
+    "mongodb_pool_checked_out_connections", "Connections of the MongoDB pool in use by server.", ("address",)
+))
+MONGO_POOL_WAIT = registry.register(Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting for a connection of the MongoDB pool.", ("address",)
+))
+MONGO_POOL_CHECKOUT_ERRORS = registry.register(Counter(
+    "mongodb_pool_checkout_errors_total", "Failed connection checkouts by server and reason.", ("address", "reason")
+))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Records the duration of every MongoDB command and counts the failed ones.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, event.command_name)
+        MONGO_COMMAND_ERRORS.inc(event.command_name)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """
+    Tracks the open and checked out connections of each pool, and how long checkouts wait.
+
+    Checkouts start and finish on the same driver thread, so the start time is kept in a thread local.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        MONGO_POOL_CONNECTIONS.set(self._address(event), value=0)
+        MONGO_POOL_CHECKED_OUT.set(self._address(event), value=0)
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc(self._address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec(self._address(event))
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait(event)
+        MONGO_POOL_CHECKOUT_ERRORS.inc(self._address(event), str(event.reason))
+
+    def connection_checked_out(self, event):
+        self._observe_wait(event)
+        MONGO_POOL_CHECKED_OUT.inc(self._address(event))
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec(self._address(event))
+
+    def _observe_wait(self, event):
+        started: Optional[float] = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_POOL_WAIT.observe(time.perf_counter() - started, self._address(event))
+            self._local.started = None
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records the latency and status code of every HTTP request.
+
+    Requests are labelled with the path template of the matched route (e.g. `/api/v1/property/{property_id}`),
+    never with the raw path, so the number of series stays bounded. It is a plain ASGI middleware rather than a
+    `BaseHTTPMiddleware` to keep its overhead to a couple of dictionary lookups and two clock reads.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, scope["method"], route)
+            HTTP_REQUESTS.inc(scope["method"], route, str(status))
+
+    def _route(self, scope: Scope) -> str:
+        # The router stores the matched endpoint in the scope; its path template is looked up once and cached
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            app = scope.get("app")
+            route = next(
+                (r.path for r in getattr(app, "routes", []) if getattr(r, "endpoint", None) is endpoint), "unmatched"
+            )
+            self._routes[endpoint] = route
+        return route
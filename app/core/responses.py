@@ -0,0 +1,226 @@
+"""
+Custom response classes used by the API.
+"""
+import os
+import re
+import stat
+import typing
+from email.utils import formatdate
+from mimetypes import guess_type
+
+import orjson
+from bson import ObjectId
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+# Content-addressed files never change, so they can be cached for a year without revalidation
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def json_default(value: typing.Any) -> typing.Any:
+    """
+    Encodes the values orjson does not support natively: ObjectIds and Pydantic models.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.dict(by_alias=True, exclude_unset=True)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    It is the default response class of the application. Endpoints on hot paths return it directly with the
+    schema they already built, which skips the second validation against `response_model` and the
+    `jsonable_encoder` pass: models are dumped once (by alias, without unset fields) and ObjectIds are encoded
+    once, while dates and datetimes are encoded natively by orjson.
+    """
+
+    def render(self, content: typing.Any) -> bytes:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def etag_matches(header: typing.Optional[str], etag: str) -> bool:
+    """
+    Checks an `If-None-Match` header against an ETag using the weak comparison of RFC 7232.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def version_etag(resource_id: typing.Any, version: typing.Optional[int]) -> str:
+    """
+    Returns the strong ETag of a versioned document: it changes whenever a write bumps the version.
+    """
+    return f'"{resource_id}-{version or 0}"'
+
+
+def etag_version(header: str, resource_id: typing.Any) -> typing.Optional[int]:
+    """
+    Returns the version named by an `If-Match` header for a document, or None when no ETag of the header belongs
+    to the document. Weak ETags are accepted too: the compression middleware weakens the ETag of compressed
+    responses, and a version names the same document whatever the content coding it was served with.
+    """
+    prefix = f'"{resource_id}-'
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        candidate = candidate[2:] if candidate.startswith("W/") else candidate
+        if candidate.startswith(prefix) and candidate.endswith('"') and candidate[len(prefix):-1].isdigit():
+            return int(candidate[len(prefix):-1])
+    return None
+
+
+def parse_range(header: typing.Optional[str], size: int) -> typing.Optional[typing.Tuple[int, int]]:
+    """
+    Parses a single-range `Range` header.
+
+    Args:
+        header (str): Value of the `Range` header.
+        size (int): Size of the file.
+
+    Returns:
+        tuple: Start and end (inclusive) offsets, or None if the header is absent or not a single byte range
+        (multiple ranges are served as a full response, as RFC 7233 allows).
+
+    Raises:
+        ValueError: If the range can not be satisfied.
+    """
+    match = _RANGE_PATTERN.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+class ImageFileResponse(Response):
+    """
+    Serves a stored image with conditional and partial request support.
+
+    - `If-None-Match` matching `etag` is answered with 304 and no body.
+    - A single `Range` is answered with 206 (or 416 when unsatisfiable); `If-Range` is honoured.
+    - When the ASGI server supports the `http.response.zerocopy` extension, the body is sent with
+      `sendfile` from the kernel page cache; otherwise it is read in large chunks in the thread pool.
+    - HEAD requests get the headers only.
+
+    Args:
+        path (str): Path of the file.
+        etag (str): Strong ETag of the file (quoted).
+        request_headers (Headers): Headers of the request.
+        method (str): HTTP method of the request.
+        media_type (str): Content type, guessed from the extension when not provided.
+        cache_control (str): Value of the `Cache-Control` header.
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        etag: str,
+        request_headers: Headers,
+        method: str = "GET",
+        media_type: typing.Optional[str] = None,
+        cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    ) -> None:
+        self.path = path
+        self.etag = etag
+        self.request_headers = request_headers
+        self.send_header_only = method.upper() == "HEAD"
+        self.media_type = media_type or guess_type(path)[0] or "application/octet-stream"
+        self.background = None
+        self.status_code = 200
+        self.init_headers({"etag": etag, "cache-control": cache_control, "accept-ranges": "bytes"})
+        self.offset = 0
+        self.length = 0
+
+    def prepare(self, stat_result: os.stat_result) -> None:
+        """
+        Sets the status code and headers of the response for the file metadata and the request headers.
+        """
+        size = stat_result.st_size
+        self.headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        if etag_matches(self.request_headers.get("if-none-match"), self.etag):
+            self.status_code = 304
+            del self.headers["content-type"]
+            return
+
+        self.offset, self.length = 0, size
+        if_range = self.request_headers.get("if-range")
+        if if_range is None or if_range.strip() == self.etag:
+            try:
+                byte_range = parse_range(self.request_headers.get("range"), size)
+            except ValueError:
+                self.status_code = 416
+                self.length = 0
+                self.headers["content-range"] = f"bytes */{size}"
+                self.headers["content-length"] = "0"
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                self.status_code = 206
+                self.offset, self.length = start, end - start + 1
+                self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            stat_result = await run_in_threadpool(os.stat, self.path)
+        except FileNotFoundError:
+            raise RuntimeError(f"File at path {self.path} does not exist.")
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise RuntimeError(f"File at path {self.path} is not a file.")
+        self.prepare(stat_result)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        file = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": self.offset,
+                    "count": self.length,
+                    "more_body": False,
+                })
+                return
+            position, remaining = self.offset, self.length
+            while remaining:
+                chunk = await run_in_threadpool(os.pread, file.fileno(), min(self.chunk_size, remaining), position)
+                if not chunk:
+                    break
+                position += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining:
+                # The file was truncated while it was being sent
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await run_in_threadpool(file.close)
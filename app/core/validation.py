@@ -3,28 +3,92 @@ from fastapi import HTTPException
 
 from app.core.config import settings
 
+# Magic bytes that open a valid file of each allowed extension.
+IMAGE_SIGNATURES = {
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "gif": (b"GIF87a", b"GIF89a"),
+}
+
+
+def get_image_extension(image) -> str:
+    """
+    Returns the lower-cased extension of the file name of an uploaded image.
+    """
+    return image.filename.split(".")[-1].lower()
+
 
 def validate_image_upload(image):
     """
-    Validates an uploaded image based on its extension and size.
+    Validates the extension of an uploaded image.
 
-    This function checks if the file extension of the uploaded image is in the list of allowed file extensions,
-    and if the file size does not exceed the maximum limit set. If any of these validations fail, an HTTPException exception is thrown with a
-    HTTPException exception is thrown with an appropriate status code and detail message.
+    This function checks if the file extension of the uploaded image is in the list of allowed file extensions.
+    It does not read the file: the size limit and the format are checked while the upload is streamed to disk
+    (see `validate_image_chunk` and `app.utils.file_utils.save_image`).
 
     Args:
         image: An uploaded image object, which includes the image file and associated metadata.
 
     Raises:
-        HTTPException: thrown if the file extension is not allowed or if the file size exceeds the maximum limit.
+        HTTPException: thrown if the file extension is not allowed.
     """
     allowed_extensions = settings.EXTENTIONS_FILE_LIST
-    file_extension = image.filename.split(".")[-1].lower()
+    file_extension = get_image_extension(image)
     if file_extension not in allowed_extensions:
         raise HTTPException(status_code=400, detail=f"File extension '{file_extension}' is not allowed.")
 
+
+def validate_image_batch(images):
+    """
+    Validates the number of files of a batch image upload.
+
+    Args:
+        images: The uploaded image objects.
+
+    Raises:
+        HTTPException: thrown if no file is sent or if there are more than `MAX_BATCH_IMAGES`.
+    """
+    if not images:
+        raise HTTPException(status_code=400, detail="Provide at least one image.")
+    if len(images) > settings.MAX_BATCH_IMAGES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.MAX_BATCH_IMAGES} images can be uploaded at once."
+        )
+
+
+def validate_image_chunk(chunk: bytes, extension: str, received: int):
+    """
+    Validates a chunk of an image upload as it arrives.
+
+    The first chunk must start with the magic bytes of the declared extension, so a renamed file is
+    rejected before it is written to disk. Every chunk is checked against the maximum file size using
+    the number of bytes received so far, so the upload is never read whole to measure it.
+
+    Args:
+        chunk (bytes): The chunk just read from the upload.
+        extension (str): Declared extension of the image.
+        received (int): Number of bytes received before this chunk.
+
+    Raises:
+        HTTPException: thrown if the content does not match the extension or if the file size exceeds the maximum limit.
+    """
+    if received == 0 and not chunk.startswith(IMAGE_SIGNATURES.get(extension, ())):
+        raise HTTPException(status_code=400, detail=f"The file content is not a valid '{extension}' image.")
+
+    validate_image_size(received + len(chunk))
+
+
+def validate_image_size(size: int):
+    """
+    Validates the size of an image against the maximum file size.
+
+    Args:
+        size (int): Size of the image in bytes.
+
+    Raises:
+        HTTPException: thrown if the file size exceeds the maximum limit.
+    """
     max_file_size = settings.MAX_FILE_SIZE_MG * 1024 * 1024  # MAX_FILE_SIZE_MG=5 ->5MB
-    if len(image.file.read()) > max_file_size:
+    if size > max_file_size:
         raise HTTPException(status_code=413, detail="The image is too large.")
-
-    image.file.seek(0)
@@ -0,0 +1,40 @@
+"""
+Creates the MongoDB indexes required by the repositories.
+
+Run it once per environment (and after each deploy that adds indexes):
+
+    python -m app.db.indexes
+"""
+import asyncio
+import logging
+
+from app.db.mongodb import get_database
+from app.repositories.property import PropertyRepository
+from app.repositories.property_image import PropertyImageRepository
+from app.repositories.property_trace import PropertyTraceRepository
+
+logger = logging.getLogger(__name__)
+
+# Repositories that declare indexes through an `ensure_indexes` method.
+INDEXED_REPOSITORIES = [PropertyRepository, PropertyImageRepository, PropertyTraceRepository]
+
+
+async def ensure_indexes(database=None):
+    """
+    Creates the indexes of every indexed repository. Index creation is idempotent, so existing
+    indexes with the same definition are left untouched.
+
+    Args:
+        database: Database instance used by the repositories (the application database by default).
+    """
+    database = database if database is not None else get_database()
+    for repository_class in INDEXED_REPOSITORIES:
+        logger.info("Ensuring indexes for %s", repository_class.__name__)
+        await repository_class(database).ensure_indexes()
+
+
+if __name__ == "__main__":
+    from app.core.logger import setup_logging
+
+    setup_logging()
+    asyncio.run(ensure_indexes())
@@ -1,21 +1,114 @@
-from pymongo import MongoClient
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.core.metrics import (
+    MONGO_POOL_CHECKED_OUT, MONGO_POOL_CONNECTIONS, MONGO_POOL_WAIT, MongoCommandListener, MongoPoolListener
+)
+
+logger = logging.getLogger(__name__)
+
+
+def client_options() -> dict:
+    """
+    Returns the options of the MongoDB client (connection pool, timeouts, read preference and compression)
+    taken from the settings. Options left unset keep the driver defaults.
+    """
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "readPreference": settings.MONGO_READ_PREFERENCE,
+        "compressors": settings.MONGO_COMPRESSORS or None,
+        "appname": settings.PROJECT_NAME,
+    }
+    return {name: value for name, value in options.items() if value is not None}
 
-client = MongoClient(settings.DATABASE_URL, settings.DATABASE_PORT) # Establish the connection to the MongoDB server using configurations.
-db = client.realStateCompany  # Cambia 'realStateCompany' al nombre de tu base de datos
+
+def create_client() -> AsyncIOMotorClient:
+    """
+    Creates the MongoDB client. The listeners feed the command timings and connection pool metrics exposed at
+    `/metrics`.
+    """
+    return AsyncIOMotorClient(
+        settings.DATABASE_URL, settings.DATABASE_PORT,
+        event_listeners=[MongoCommandListener(), MongoPoolListener()], **client_options()
+    )
 
 
-def connect_to_mongo():
+_client: Optional[AsyncIOMotorClient] = None
+_client_pid: Optional[int] = None
+
+
+def get_client() -> AsyncIOMotorClient:
     """
-    Establishes the connection to the MongoDB database.
+    Returns the MongoDB client of the current process, creating it on first use.
 
-    This method can be used to handle initial connection logic
-    with MongoDB, such as setting up specific connection parameters or performing initial operations
-    performing initial operations required right after the connection is established.
+    A client must not be shared across `fork()`: its connections, monitor threads and locks belong to the process
+    that created it. The client is therefore created lazily and tied to the process ID, so each server worker gets
+    its own client after being forked, even when the application was imported by the parent process beforehand.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = create_client()
+        _client_pid = os.getpid()
+    return _client
 
-    Note: Currently, this method does not implement any specific logic.
+
+def get_database():
+    """
+    Returns the application database on the client of the current process.
+    """
+    return get_client().realStateCompany  # Cambia 'realStateCompany' al nombre de tu base de datos
+
+
+async def connect_to_mongo():
+    """
+    Verifies the connection to the MongoDB database and warms up the connection pool.
+
+    A `ping` checks that a server can be selected within `MONGO_SERVER_SELECTION_TIMEOUT_MS`; if not, the error is
+    raised so the application does not start serving requests it can not answer. Then `MONGO_MIN_POOL_SIZE`
+    concurrent pings open the minimum connections of the pool, so the first requests do not pay for the
+    connection handshakes.
+    """
+    client = get_client()
+    try:
+        await client.admin.command("ping")
+    except Exception:
+        logger.exception("MongoDB is not reachable at %s", settings.DATABASE_URL)
+        raise
+    warmup = max(settings.MONGO_MIN_POOL_SIZE - 1, 0)
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(warmup)))
+    logger.info("MongoDB connection verified, pool warmed up with %s connections", warmup + 1)
+
+
+def pool_stats() -> dict:
+    """
+    Returns the configuration and the current state of the connection pool of each server: open and checked
+    out connections, number of checkouts and their average wait for a connection.
     """
-    pass
+    servers = {}
+    for (address,), opened in MONGO_POOL_CONNECTIONS.items():
+        checkouts, wait_seconds = MONGO_POOL_WAIT.totals(address)
+        servers[address] = {
+            "open": opened,
+            "checked_out": MONGO_POOL_CHECKED_OUT.value(address),
+            "checkouts": checkouts,
+            "average_checkout_wait_ms": wait_seconds / checkouts * 1000 if checkouts else 0.0,
+        }
+    return {
+        "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGO_MIN_POOL_SIZE,
+        "wait_queue_timeout_ms": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "servers": servers,
+    }
 
 
 def close_mongo_connection():
@@ -26,4 +119,7 @@ def close_mongo_connection():
     to free resources when the application stops or no longer needs to maintain the connection to the database.
     the connection to the database.
     """
-    client.close()
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = _client_pid = None
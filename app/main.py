@@ -1,36 +1,92 @@
 """
 This file is the main entry point for the FastAPI application.
 It configures the application, including routes, startup and shutdown events, and logging settings.
+
+Development server (single process, auto reload):
+
+    uvicorn app.main:app --reload
+
+Production server (one uvicorn worker per core, see `gunicorn.conf.py`):
+
+    gunicorn -c gunicorn.conf.py app.main:app
 """
 from fastapi import FastAPI
+from starlette.responses import Response
 
 from app.api.api_v1.endpoints import property
+from app.core.admission import AdmissionControlMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.core.logger import setup_logging
-from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.core.logger import RequestContextMiddleware, setup_logging
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.core.responses import FastJSONResponse
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, pool_stats
+from app.services.image_derivatives import shutdown_process_pool
 
-app = FastAPI(title=settings.PROJECT_NAME)  # Create a FastAPI instance for the application.
 
-app.include_router(property.router, prefix="/api/v1/property", tags=["property"])   # All routes related to 'property' will be available under the prefix '/api/v1/property'.
+async def metrics():
+    """
+    Exposes the request latency, status code, MongoDB command and connection pool metrics of this worker in the
+    Prometheus text format.
+    :return:
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE)
 
-setup_logging()     # Setup of logging module
 
+async def get_pool_stats():
+    """
+    Returns the configuration and current state of the MongoDB connection pool of this worker, to size it.
+    :return:
+    """
+    return pool_stats()
 
-@app.on_event("startup")
-def startup_db_client():
+
+async def startup_db_client():
     """
     Startup event that is triggered when the FastAPI application starts.
-    Establishes the connection to the MongoDB database.
+    Verifies the connection to the MongoDB database and warms up the connection pool.
     :return:
     """
-    connect_to_mongo()
+    await connect_to_mongo()
 
 
-@app.on_event("shutdown")
 def shutdown_db_client():
     """
     Shutdown event that is triggered when the FastAPI application is shutting down.
-    Closes the connection to the MongoDB database.
+    Closes the connection to the MongoDB database and stops the image worker processes.
     :return:
     """
     close_mongo_connection()
+    shutdown_process_pool()
+
+
+def create_app() -> FastAPI:
+    """
+    Application factory: builds and configures a FastAPI application.
+
+    Nothing here touches MongoDB; the client is created on first use by the process that serves the requests, so
+    the factory is safe to call before the server forks its workers (`gunicorn -c gunicorn.conf.py`).
+    :return:
+    """
+    setup_logging()     # Setup of logging module
+
+    application = FastAPI(title=settings.PROJECT_NAME, default_response_class=FastJSONResponse)  # Create a FastAPI instance for the application.
+
+    application.add_middleware(CompressionMiddleware)   # Compresses large JSON, NDJSON and CSV responses (gzip, or brotli when installed).
+
+    application.add_middleware(AdmissionControlMiddleware)  # Caps the requests in flight per route class and sheds the excess with a 503.
+
+    application.add_middleware(MetricsMiddleware)   # Records the latency and status code of every request for `/metrics`.
+
+    application.add_middleware(RequestContextMiddleware)    # Request ID and log sampling of every request.
+
+    application.include_router(property.router, prefix="/api/v1/property", tags=["property"])   # All routes related to 'property' will be available under the prefix '/api/v1/property'.
+
+    application.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+    application.add_api_route("/pool/stats", get_pool_stats, methods=["GET"], include_in_schema=False)
+    application.add_event_handler("startup", startup_db_client)
+    application.add_event_handler("shutdown", shutdown_db_client)
+    return application
+
+
+app = create_app()  # Application served by both uvicorn (development) and gunicorn (production)
@@ -0,0 +1,30 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, validator
+
+
+class GeoPoint(BaseModel):
+    """
+    GeoJSON point, as stored in MongoDB and indexed with a `2dsphere` index.
+
+    Attributes:
+        type (str): Always 'Point'.
+        coordinates (List[float]): Longitude and latitude, in that order (GeoJSON order).
+    """
+    type: Literal["Point"] = "Point"
+    coordinates: List[float]
+
+    @validator("coordinates")
+    def valid_coordinates(cls, coordinates):
+        if len(coordinates) != 2:
+            raise ValueError("coordinates must be [longitude, latitude]")
+        longitude, latitude = coordinates
+        if not -180 <= longitude <= 180:
+            raise ValueError("longitude must be between -180 and 180")
+        if not -90 <= latitude <= 90:
+            raise ValueError("latitude must be between -90 and 90")
+        return coordinates
+
+    @classmethod
+    def from_lon_lat(cls, longitude: float, latitude: float) -> "GeoPoint":
+        return cls(coordinates=[longitude, latitude])
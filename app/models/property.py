@@ -1,5 +1,8 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 from bson import ObjectId
+from app.models.geo_point import GeoPoint
 from app.models.py_object_id import PyObjectId
 
 
@@ -19,6 +22,7 @@ class Property(BaseModel):
         code_internal (str): Internal code assigned to the property.
         year (int): Year of construction of the property.
         id_owner (PyObjectId): Property owner identifier.
+        location (GeoPoint): Optional GeoJSON point of the property.
     """
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     name: str
@@ -27,6 +31,7 @@ class Property(BaseModel):
     code_internal: str
     year: int
     id_owner: PyObjectId
+    location: Optional[GeoPoint] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 from bson import ObjectId
 from app.models.py_object_id import PyObjectId
@@ -8,6 +10,9 @@ class PropertyImage(BaseModel):
     id_property: PyObjectId
     file: str
     enable: bool
+    content_hash: Optional[str]
+    derivatives: List[dict] = []
+    derivatives_status: str = "pending"
 
     class Config:
         allow_population_by_field_name = True
@@ -20,6 +20,9 @@ class PyObjectId(ObjectId):
 
     @classmethod
     def validate(cls, v):
+        if isinstance(v, ObjectId):
+            # Ya es un ObjectId válido: se convierte a cadena una sola vez
+            return str(v)
         if not ObjectId.is_valid(v):
             raise ValueError("ObjectId no válido")
         # Devuelve el ObjectId como una cadena
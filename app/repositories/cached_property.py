@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.cache import LRUCache, ReadThroughCache, SharedCacheBackend
+from app.core.config import settings
+from app.models.geo_point import GeoPoint
+from app.repositories.property import PropertyRepository
+from app.schemas.property import (
+    BulkPriceUpdateResult, PriceAdjustment, PriceChange, PropertyCreate, PropertyFilter, PropertyInDB,
+    PropertySyncResult
+)
+
+
+def build_property_cache() -> ReadThroughCache:
+    """
+    Builds the property cache from the settings. The shared tier is only enabled when `CACHE_REDIS_URL` is set.
+
+    A write only invalidates the local tier of the worker that handled it, so the other workers may keep serving the
+    previous price (and `ETag`) of a property for up to `PROPERTY_CACHE_LOCAL_TTL` seconds. That short TTL bounds the
+    coherence window of the local tier, while the shared tier, invalidated for every worker, keeps entries for
+    `PROPERTY_CACHE_TTL` seconds.
+    """
+    shared = None
+    if settings.CACHE_REDIS_URL:
+        from redis import asyncio as redis_asyncio  # Only needed for the shared tier
+
+        shared = SharedCacheBackend(
+            redis_asyncio.from_url(settings.CACHE_REDIS_URL), PropertyInDB, settings.PROPERTY_CACHE_TTL, "property:"
+        )
+    return ReadThroughCache(LRUCache(settings.PROPERTY_CACHE_SIZE, settings.PROPERTY_CACHE_LOCAL_TTL), shared)
+
+
+# Shared by every request of the process
+property_cache = build_property_cache()
+
+
+class CachedPropertyRepository(PropertyRepository):
+    """
+    Property repository with a read-through cache in front of `get`.
+
+    Reads by ID are served from `cache` and concurrent misses for the same property are coalesced into one query.
+    Every write by ID invalidates the entry of the property it touches, and writes by filter, which can not tell
+    which properties they touched, empty the cache. Creations need no invalidation since a new ID can not be
+    cached yet, and listings always go to the database.
+
+    Attributes:
+        cache (ReadThroughCache): Cache of properties by ID.
+    """
+    def __init__(self, client: AsyncIOMotorClient, cache: Optional[ReadThroughCache] = None):
+        super().__init__(client)
+        self.cache = property_cache if cache is None else cache
+
+    async def get(self, property_id: str) -> PropertyInDB:
+        load = super().get
+        return await self.cache.get_or_load(str(property_id), lambda: load(property_id))
+
+    async def update(
+        self, property_id: str, property_update: PropertyCreate, expected_version: Optional[int] = None
+    ) -> PropertyInDB:
+        try:
+            return await super().update(property_id, property_update, expected_version)
+        finally:
+            await self.cache.invalidate(str(property_id))
+
+    async def bulk_update_prices(self, changes: List[PriceChange], batch_size: int = 1000) -> BulkPriceUpdateResult:
+        try:
+            return await super().bulk_update_prices(changes, batch_size)
+        finally:
+            for change in changes:
+                await self.cache.invalidate(change.property_id)
+
+    async def adjust_prices(self, filters: PropertyFilter, adjustment: PriceAdjustment) -> BulkPriceUpdateResult:
+        try:
+            return await super().adjust_prices(filters, adjustment)
+        finally:
+            await self.cache.clear()
+
+    async def sync(
+        self, properties: List[PropertyCreate], batch_size: int = 1000, dry_run: bool = False
+    ) -> PropertySyncResult:
+        summary = None
+        try:
+            summary = await super().sync(properties, batch_size, dry_run)
+            return summary
+        finally:
+            # Updated properties are known by internal code, not by ID, so the whole cache is emptied
+            if not dry_run and (summary is None or summary.updated):
+                await self.cache.clear()
+
+    async def set_locations(self, locations: Dict[str, GeoPoint], key: str = "code_internal") -> Tuple[int, int]:
+        try:
+            return await super().set_locations(locations, key)
+        finally:
+            if key == "_id":
+                for property_id in locations:
+                    await self.cache.invalidate(property_id)
+            else:
+                await self.cache.clear()
@@ -1,9 +1,49 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
 from bson import ObjectId
-from pymongo import MongoClient
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, TEXT, IndexModel, UpdateOne
 from pymongo.collection import ReturnDocument
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+from app.core.exceptions import PreconditionFailed
+from app.models.geo_point import GeoPoint
+from app.schemas.property import (
+    BulkPriceUpdateResult, PriceAdjustment, PriceChange, PriceChangeResult, PropertyCreate, PropertyDetail,
+    PropertyFilter, PropertyInDB, PropertyNearby, PropertySearchHit, PropertySyncResult
+)
 
-from app.schemas.property import PropertyCreate, PropertyInDB
-from app.models.py_object_id import PyObjectId
+
+async def replace_indexes(collection, indexes: List[IndexModel], legacy_indexes: List[IndexModel]) -> None:
+    """
+    Creates `indexes` on a collection, dropping first the `legacy_indexes` it still has and restoring them if the
+    new indexes can not be built.
+    """
+    existing = await collection.index_information()
+    dropped = [index for index in legacy_indexes if index.document["name"] in existing]
+    for index in dropped:
+        await collection.drop_index(index.document["name"])
+    try:
+        await collection.create_indexes(indexes)
+    except OperationFailure:
+        if dropped:
+            await collection.create_indexes(dropped)
+        raise
+
+
+def utc_now() -> datetime:
+    """
+    Returns the current UTC time as stored by MongoDB (naive, millisecond precision).
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
 
 
 class PropertyRepository:
@@ -11,11 +51,15 @@ class PropertyRepository:
     Repository to handle database operations for real estate properties.
 
     This class provides methods to create, get and update real estate properties in a MongoDB database.
-    It uses the Pydantic schema for data validation and serialization, and handles the conversion of MongoDB ObjectId
-    to PyObjectId for use in Pydantic.
+    It uses the Pydantic schema for data validation and serialization; documents read back are trusted (they were
+    validated on write) and built with `PropertyInDB.from_document`, converting the MongoDB ObjectId once.
+
+    Every write bumps the `version` of the properties it changes and sets their `updated_at` in the same update,
+    so the version identifies the content of a property (ETags, optimistic concurrency). Properties stored before
+    versioning have no `version`, which counts as 0.
 
     Attributes:
-        Collection (MongoClient): MongoDB client for interacting with the database.
+        Collection (AsyncIOMotorCollection): Motor collection for non-blocking interaction with the database.
 
     Methods:
         create(property: PropertyCreate) -> PropertyInDB:
@@ -24,13 +68,75 @@ class PropertyRepository:
         get(property_id: str) -> PropertyInDB:
             Retrieves a property by its ID.
 
-        update(property_id: str, property_update: PropertyCreate) -> PropertyInDB:
-            Updates an existing property.
+        update(property_id: str, property_update: PropertyCreate, expected_version: int) -> PropertyInDB:
+            Updates an existing property, optionally only if it still has the expected version.
+
+        get_expanded(property_id: str, expand: List[str]) -> PropertyDetail:
+            Retrieves a property together with its owner, images and/or sale history in one query.
+
+        list(filters: PropertyFilter, sort: str, limit: int, after: dict, expand: List[str]) -> List[PropertyInDB]:
+            Lists properties matching the filters using keyset pagination.
+
+        bulk_update_prices(changes: List[PriceChange], batch_size: int) -> BulkPriceUpdateResult:
+            Sets the price of many properties with batched bulk writes.
+
+        adjust_prices(filters: PropertyFilter, adjustment: PriceAdjustment) -> BulkPriceUpdateResult:
+            Adjusts the price of every property matching the filters with a server-side update.
+
+        export_cursor(include_traces: bool, batch_size: int, raw: bool):
+            Opens a cursor over the whole catalog for exports.
+
+        nearby(filters: PropertyFilter, point: GeoPoint, max_distance: float, bbox: tuple, limit: int)
+                -> List[PropertyNearby]:
+            Lists the properties around a point, within a radius and/or a bounding box, nearest first.
+
+        search(text: str, filters: PropertyFilter, limit: int, after: dict) -> List[PropertySearchHit]:
+            Searches properties by name and address, most relevant first.
+
+        sync(properties: List[PropertyCreate], batch_size: int, dry_run: bool) -> PropertySyncResult:
+            Upserts properties by internal code, writing only the new and changed ones.
+
+        set_locations(locations: Dict[str, GeoPoint], key: str) -> Tuple[int, int]:
+            Sets the location of many properties with one bulk write.
+
+        watch(resume_token: str, max_await_time_ms: int):
+            Opens a change stream over the creations and price changes of the properties.
     """
-    def __init__(self, client: MongoClient):
+    # Sortable fields exposed by the API and the document field they map to.
+    SORT_FIELDS = {"id": "_id", "price": "price", "year": "year"}
+
+    # Every sortable field has a compound index with `_id` as tiebreaker, so keyset pages are resolved
+    # with an index range scan regardless of how deep the page is.
+    INDEXES = [
+        IndexModel([("price", ASCENDING), ("_id", ASCENDING)], name="price_id"),
+        IndexModel([("year", ASCENDING), ("_id", ASCENDING)], name="year_id"),
+        IndexModel([("id_owner", ASCENDING), ("_id", ASCENDING)], name="id_owner_id"),
+        # The internal code identifies a property in the CRM synchronization
+        IndexModel([("code_internal", ASCENDING)], name="code_internal_unique", unique=True),
+        # Only properties with a location are indexed (2dsphere indexes skip documents without the field)
+        IndexModel([("location", GEOSPHERE)], name="location_2dsphere"),
+        # Matches on the name weigh more than matches on the address
+        IndexModel(
+            [("name", TEXT), ("address", TEXT)], name="name_address_text", weights={"name": 3, "address": 1},
+            default_language=settings.TEXT_SEARCH_LANGUAGE
+        ),
+    ]
+
+    # Indexes replaced by a newer definition on the same keys, dropped by `ensure_indexes`.
+    LEGACY_INDEXES = [
+        IndexModel([("code_internal", ASCENDING)], name="code_internal"),
+    ]
+
+    # Related documents that can be embedded in a property with `expand`.
+    EXPAND_FIELDS = ("owner", "images", "traces")
+
+    def __init__(self, client: AsyncIOMotorClient):
         self.collection = client.realStateCompany.Properties
+        self.owners = client.realStateCompany.Owners
+        self.images = client.realStateCompany.Property_images
+        self.traces = client.realStateCompany.Property_traces
 
-    def create(self, property: PropertyCreate) -> PropertyInDB:
+    async def create(self, property: PropertyCreate) -> PropertyInDB:
         """
         Creates a new property in the database.
 
@@ -40,12 +146,13 @@ class PropertyRepository:
         Returns:
             PropertyInDB: The property created with its generated ID.
         """
-        property_data = property.dict(by_alias=True)
-        result = self.collection.insert_one(property_data)
-        property_data['_id'] = PyObjectId(result.inserted_id)
-        return PropertyInDB(**property_data)
+        # Unset optional fields (location) are not stored, rather than stored as null
+        property_data = {**property.dict(by_alias=True, exclude_none=True), "version": 1, "updated_at": utc_now()}
+        result = await self.collection.insert_one(property_data)
+        property_data['_id'] = result.inserted_id
+        return PropertyInDB.from_document(property_data)
 
-    def get(self, property_id: str) -> PropertyInDB:
+    async def get(self, property_id: str) -> PropertyInDB:
         """
         Retrieves a property by its ID.
 
@@ -58,42 +165,504 @@ class PropertyRepository:
         Raises:
             ValueError: If no property with the provided ID is found.
         """
-        property_db = self.collection.find_one({"_id": ObjectId(property_id)})
+        property_db = await self.collection.find_one({"_id": ObjectId(property_id)})
         if property_db:
-            # Convertimos el _id de ObjectId a PyObjectId
-            property_db["id"] = PyObjectId(property_db["_id"])
-            del property_db["_id"]  # Eliminar _id ya que no se necesita más
-            return PropertyInDB(**property_db)
+            return PropertyInDB.from_document(property_db)
         else:
             raise ValueError(f"No property found with ID: {property_id}")
 
-    def update(self, property_id: str, property_update: PropertyCreate) -> PropertyInDB:
+    async def update(
+        self, property_id: str, property_update: PropertyCreate, expected_version: Optional[int] = None
+    ) -> PropertyInDB:
         """
-        Updates an existing property.
+        Updates an existing property, bumping its version.
+
+        With `expected_version`, the version is part of the update filter, so the check and the write are atomic:
+        the update only applies if nobody changed the property since that version was read.
 
         Args:
             property_id (str): ID of the property to update.
             property_update (PropertyCreate): Updated property data.
+            expected_version (int): Version the property must still have.
 
         Returns:
             PropertyInDB: The updated property.
 
         Raises:
             ValueError: If no property with the provided ID is found.
+            PreconditionFailed: If the property no longer has `expected_version`.
         """
         update_data = property_update.dict(exclude_unset=True)
-        result = self.collection.find_one_and_update(
-            {"_id": ObjectId(property_id)},
-            {"$set": update_data},
+        query = {"_id": ObjectId(property_id)}
+        if expected_version is not None:
+            # Properties stored before versioning have no version, which counts as 0
+            query["version"] = expected_version if expected_version else {"$in": [0, None]}
+        result = await self.collection.find_one_and_update(
+            query,
+            {"$set": {**update_data, "updated_at": utc_now()}, "$inc": {"version": 1}},
             return_document=ReturnDocument.AFTER
         )
         if result:
-            result["id"] = PyObjectId(result["_id"])
-            del result["_id"]  # Eliminar _id ya que no se necesita más
-            return PropertyInDB(**result)
+            return PropertyInDB.from_document(result)
+        elif expected_version is not None and await self.collection.count_documents({"_id": query["_id"]}, limit=1):
+            raise PreconditionFailed(f"Property {property_id} is no longer at version {expected_version}")
         else:
             raise ValueError(f"No property found with ID: {property_id}")
 
+    async def get_expanded(self, property_id: str, expand: List[str]) -> PropertyDetail:
+        """
+        Retrieves a property together with the related documents listed in `expand`, joined by the server in a
+        single aggregation instead of one query per relation.
+
+        Args:
+            property_id (str): ID of the property to retrieve.
+            expand (List[str]): Related documents to embed (see EXPAND_FIELDS).
+
+        Returns:
+            PropertyDetail: The property with its related documents.
+
+        Raises:
+            ValueError: If no property with the provided ID is found.
+        """
+        pipeline = [{"$match": {"_id": ObjectId(property_id)}}, {"$limit": 1}] + self.expand_pipeline(expand)
+        documents = await self.collection.aggregate(pipeline).to_list(length=1)
+        if not documents:
+            raise ValueError(f"No property found with ID: {property_id}")
+        return self._to_detail(documents[0], expand)
+
+    def expand_pipeline(self, expand: List[str]) -> list:
+        """
+        Builds the `$lookup` stages that embed the related documents of each property. Images and traces are
+        bounded (`EXPAND_IMAGES_LIMIT`, `EXPAND_TRACES_LIMIT`) and resolved through the `id_property` indexes.
+
+        Args:
+            expand (List[str]): Related documents to embed.
+
+        Returns:
+            list: The aggregation stages.
+
+        Raises:
+            ValueError: If a relation is not expandable.
+        """
+        unknown = set(expand) - set(self.EXPAND_FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported expand field: {', '.join(sorted(unknown))}")
+
+        stages = []
+        if "owner" in expand:
+            # `id_owner` is free text; only the values that are ObjectIds can reference an owner document.
+            owner_id = {"$convert": {"input": "$id_owner", "to": "objectId", "onError": None, "onNull": None}}
+            stages += [
+                {"$lookup": {
+                    "from": self.owners.name,
+                    "let": {"owner_id": owner_id},
+                    "pipeline": [{"$match": {"$expr": {"$eq": ["$_id", "$$owner_id"]}}}, {"$limit": 1}],
+                    "as": "owner",
+                }},
+                {"$set": {"owner": {"$arrayElemAt": ["$owner", 0]}}},
+            ]
+        if "images" in expand:
+            stages.append({"$lookup": {
+                "from": self.images.name,
+                "let": {"property_id": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$id_property", "$$property_id"]}}},
+                    {"$sort": {"_id": ASCENDING}},
+                    {"$limit": settings.EXPAND_IMAGES_LIMIT},
+                ],
+                "as": "images",
+            }})
+        if "traces" in expand:
+            stages.append({"$lookup": {
+                "from": self.traces.name,
+                "let": {"property_id": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$id_property", "$$property_id"]}}},
+                    {"$sort": {"date_sale": DESCENDING}},
+                    {"$limit": settings.EXPAND_TRACES_LIMIT},
+                    {"$set": {"id_property": {"$toString": "$id_property"}}},
+                ],
+                "as": "traces",
+            }})
+        return stages
+
+    @staticmethod
+    def _to_detail(document: dict, expand: List[str]) -> PropertyDetail:
+        # A missing owner is returned as null rather than omitted, since it was requested
+        if "owner" in expand:
+            document.setdefault("owner", None)
+        return PropertyDetail(**document)
+
+    async def list(
+        self, filters: PropertyFilter, sort: str = "id", limit: int = 50, after: Optional[dict] = None,
+        expand: Optional[List[str]] = None
+    ) -> List[PropertyInDB]:
+        """
+        Lists properties matching the filters, ordered by `sort` and paginated by keyset.
+
+        Instead of skipping documents, the page starts right after the position given by `after`
+        (the sort key and `_id` of the last element of the previous page), so the cost of a page does not
+        depend on its depth.
+
+        Args:
+            filters (PropertyFilter): Structured filters to apply.
+            sort (str): Sort specification, one of SORT_FIELDS optionally prefixed with '-' for descending order.
+            limit (int): Maximum number of properties to return.
+            after (dict): Sort key values of the last element of the previous page.
+            expand (List[str]): Related documents to embed in each property (see EXPAND_FIELDS).
+
+        Returns:
+            List[PropertyInDB]: The properties of the page, as PropertyDetail when expanded.
+        """
+        field, direction = self.parse_sort(sort)
+        query = self._page_query(filters, field, direction, after)
+        sort_spec = [("_id", direction)] if field == "_id" else [(field, direction), ("_id", direction)]
+        if expand:
+            # The related documents are joined after the page is cut, so each page costs one round trip
+            # whatever its size, instead of one query per property and relation.
+            pipeline = [{"$match": query}, {"$sort": dict(sort_spec)}, {"$limit": limit}]
+            pipeline += self.expand_pipeline(expand)
+            documents = await self.collection.aggregate(pipeline).to_list(length=limit)
+            return [self._to_detail(document, expand) for document in documents]
+
+        documents = await self.collection.find(query).sort(sort_spec).limit(limit).to_list(length=limit)
+        return [PropertyInDB.from_document(document) for document in documents]
+
+    def _page_query(self, filters: PropertyFilter, field: str, direction: int, after: Optional[dict]) -> dict:
+        query = filters.to_query()
+        if after:
+            operator = "$gt" if direction == ASCENDING else "$lt"
+            last_id = ObjectId(after["_id"])
+            if field == "_id":
+                keyset = {"_id": {operator: last_id}}
+            else:
+                keyset = {"$or": [
+                    {field: {operator: after[field]}},
+                    {field: after[field], "_id": {operator: last_id}},
+                ]}
+            query = {"$and": [query, keyset]} if query else keyset
+        return query
+
+    async def bulk_update_prices(self, changes: List[PriceChange], batch_size: int = 1000) -> BulkPriceUpdateResult:
+        """
+        Sets the price of many properties.
+
+        Each batch costs one query, to know which properties exist and which already have the requested price, plus
+        one unordered `bulk_write` with the actual changes, instead of a read and a write per property.
+
+        Args:
+            changes (List[PriceChange]): New price of each property.
+            batch_size (int): Number of changes sent to the server per round trip.
+
+        Returns:
+            BulkPriceUpdateResult: Totals and the outcome of each change.
+        """
+        summary = BulkPriceUpdateResult()
+        for start in range(0, len(changes), batch_size):
+            batch = changes[start:start + batch_size]
+            ids = [ObjectId(change.property_id) if ObjectId.is_valid(change.property_id) else None for change in batch]
+            current = {
+                document["_id"]: document.get("price")
+                async for document in self.collection.find(
+                    {"_id": {"$in": [object_id for object_id in ids if object_id]}}, {"price": 1}
+                )
+            }
+            operations = []
+            for change, object_id in zip(batch, ids):
+                if object_id is None:
+                    status = "invalid_id"
+                elif object_id not in current:
+                    status = "not_found"
+                elif current[object_id] == change.price:
+                    status = "unchanged"
+                else:
+                    status = "updated"
+                    operations.append(UpdateOne(
+                        {"_id": object_id},
+                        {"$set": {"price": change.price, "updated_at": utc_now()}, "$inc": {"version": 1}}
+                    ))
+                summary.items.append(PriceChangeResult(property_id=change.property_id, status=status))
+            if operations:
+                result = await self.collection.bulk_write(operations, ordered=False)
+                summary.modified += result.modified_count
+            summary.matched += len(current)
+        summary.not_found = sum(1 for item in summary.items if item.status in ("not_found", "invalid_id"))
+        return summary
+
+    async def adjust_prices(self, filters: PropertyFilter, adjustment: PriceAdjustment) -> BulkPriceUpdateResult:
+        """
+        Adjusts the price of every property matching the filters.
+
+        The new price is computed by the server with an update pipeline, so no document is transferred. Absolute
+        decreases skip the properties whose price would not stay positive. Only the properties whose (rounded)
+        price actually changes get a new version.
 
+        Args:
+            filters (PropertyFilter): Properties to adjust.
+            adjustment (PriceAdjustment): Percentage or absolute adjustment.
+
+        Returns:
+            BulkPriceUpdateResult: Number of matched and modified properties.
+        """
+        query = filters.to_query()
+        if adjustment.type == "percentage":
+            new_price = {"$multiply": ["$price", 1 + adjustment.value / 100]}
+        else:
+            new_price = {"$add": ["$price", adjustment.value]}
+            if adjustment.value < 0:
+                query = {"$and": [query, {"price": {"$gt": -adjustment.value}}]}
+        new_price = {"$round": [new_price, 2]}
+        changed = {"$ne": ["$price", new_price]}
+        result = await self.collection.update_many(query, [{"$set": {
+            "price": new_price,
+            "version": {"$cond": [changed, {"$add": [{"$ifNull": ["$version", 0]}, 1]}, "$version"]},
+            "updated_at": {"$cond": [changed, utc_now(), "$updated_at"]},
+        }}])
+        return BulkPriceUpdateResult(matched=result.matched_count, modified=result.modified_count)
+
+    def export_cursor(self, include_traces: bool = False, batch_size: int = 1000, raw: bool = False):
+        """
+        Opens a cursor over every property, projected to the exported fields and, optionally, with its sales
+        joined. Documents are fetched `batch_size` at a time, so only one batch is held in memory.
+
+        Args:
+            include_traces (bool): Whether to join the sales of each property (most recent first).
+            batch_size (int): Number of documents per round trip.
+            raw (bool): Whether to return `RawBSONDocument`s, which keep the bytes received from the server
+                instead of decoding them into dicts.
 
+        Returns:
+            AsyncIOMotorCursor: The cursor (an aggregation cursor when the sales are joined).
+        """
+        collection = self.collection
+        if raw:
+            collection = collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+        projection = {field: 1 for field in PropertyCreate.__fields__}
+        if not include_traces:
+            return collection.find({}, projection, batch_size=batch_size)
+        return collection.aggregate([
+            {"$project": projection},
+            {"$lookup": {
+                "from": self.traces.name,
+                "let": {"property_id": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$id_property", "$$property_id"]}}},
+                    {"$sort": {"date_sale": DESCENDING}},
+                    {"$project": {"_id": 0, "date_sale": 1, "name": 1, "value": 1, "tax": 1}},
+                ],
+                "as": "traces",
+            }},
+        ], batchSize=batch_size)
+
+    async def nearby(
+        self, filters: PropertyFilter, point: GeoPoint, max_distance: Optional[float] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None, limit: int = 50
+    ) -> List[PropertyNearby]:
+        """
+        Lists the properties around a point, nearest first, with their distance to it.
+
+        A single `$geoNear` stage walks the `2dsphere` index outwards from the point, applying the filters, the
+        radius and the bounding box as it goes, and stops after `limit` matches; only nearby documents are read.
+
+        Args:
+            filters (PropertyFilter): Price range, year range, owner and internal code filters.
+            point (GeoPoint): Point the distances are measured from.
+            max_distance (float): Maximum distance in meters, unbounded when None.
+            bbox (tuple): Minimum longitude, minimum latitude, maximum longitude and maximum latitude of the area
+                to search (e.g. a map viewport).
+            limit (int): Maximum number of properties to return.
+
+        Returns:
+            List[PropertyNearby]: The properties found, nearest first.
+        """
+        query = filters.to_query()
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            query["location"] = {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [[
+                [min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]
+            ]]}}}
+        geo_near = {
+            "near": point.dict(),
+            "key": "location",
+            "distanceField": "distance",
+            "spherical": True,
+            "query": query,
+        }
+        if max_distance is not None:
+            geo_near["maxDistance"] = max_distance
+        documents = await self.collection.aggregate([{"$geoNear": geo_near}, {"$limit": limit}]).to_list(length=limit)
+        return [PropertyNearby.from_document(document) for document in documents]
+
+    async def search(
+        self, text: str, filters: PropertyFilter, limit: int = 50, after: Optional[dict] = None
+    ) -> List[PropertySearchHit]:
+        """
+        Searches properties whose name or address contain any of the words of `text`, most relevant first.
+
+        The words are looked up in the text index (case and diacritic insensitive, with the stemming of
+        `TEXT_SEARCH_LANGUAGE`); quoted phrases and '-excluded' words follow the MongoDB `$text` syntax. Pages are
+        cut by keyset on the relevance and `_id` of the last result of the previous page (`after`).
+
+        Args:
+            text (str): Searched text.
+            filters (PropertyFilter): Price range, year range, owner and internal code filters.
+            limit (int): Maximum number of properties to return.
+            after (dict): Relevance (`score`) and `_id` of the last result of the previous page.
+
+        Returns:
+            List[PropertySearchHit]: The properties found with their relevance.
+        """
+        pipeline = [
+            {"$match": {"$text": {"$search": text}, **filters.to_query()}},
+            {"$set": {"score": {"$meta": "textScore"}}},
+        ]
+        if after:
+            last_id = ObjectId(after["_id"])
+            pipeline.append({"$match": {"$or": [
+                {"score": {"$lt": after["score"]}}, {"score": after["score"], "_id": {"$gt": last_id}}
+            ]}})
+        pipeline += [{"$sort": {"score": DESCENDING, "_id": ASCENDING}}, {"$limit": limit}]
+        documents = await self.collection.aggregate(pipeline).to_list(length=limit)
+        return [PropertySearchHit.from_document(document) for document in documents]
+
+    async def sync(
+        self, properties: List[PropertyCreate], batch_size: int = 1000, dry_run: bool = False
+    ) -> PropertySyncResult:
+        """
+        Upserts properties by their internal code, writing only the ones that are new or changed.
+
+        Each stored property keeps the hash of the data it was last synchronized with (`content_hash`). Per batch,
+        one query reads the hashes of the codes of the batch and one unordered `bulk_write` upserts the properties
+        whose hash differs; unchanged properties cost no write. When the same code appears more than once, the last
+        item wins.
+
+        Args:
+            properties (List[PropertyCreate]): Properties to synchronize.
+            batch_size (int): Number of properties per round trip.
+            dry_run (bool): Only compute the summary, without writing.
+
+        Returns:
+            PropertySyncResult: Number of inserted, updated, unchanged and duplicated properties.
+        """
+        by_code = {}
+        for property in properties:
+            by_code.pop(property.code_internal, None)   # Keep the position of the last occurrence
+            by_code[property.code_internal] = property
+        summary = PropertySyncResult(duplicates=len(properties) - len(by_code))
 
+        items = list(by_code.values())
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            stored = {
+                document["code_internal"]: document.get("content_hash")
+                async for document in self.collection.find(
+                    {"code_internal": {"$in": [property.code_internal for property in batch]}},
+                    {"code_internal": 1, "content_hash": 1}
+                )
+            }
+            operations = []
+            for property in batch:
+                data = property.dict(exclude_unset=True)
+                digest = self.content_hash(data)
+                if property.code_internal not in stored:
+                    summary.inserted += 1
+                elif stored[property.code_internal] == digest:
+                    summary.unchanged += 1
+                    continue
+                else:
+                    summary.updated += 1
+                operations.append(UpdateOne(
+                    {"code_internal": property.code_internal},
+                    {"$set": {**data, "content_hash": digest, "updated_at": utc_now()}, "$inc": {"version": 1}},
+                    upsert=True
+                ))
+            if operations and not dry_run:
+                await self.collection.bulk_write(operations, ordered=False)
+        return summary
+
+    @staticmethod
+    def content_hash(data: dict) -> str:
+        """
+        Returns the SHA-256 of the canonical JSON (sorted keys) of the data of a property.
+        """
+        return hashlib.sha256(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+    async def set_locations(self, locations: Dict[str, GeoPoint], key: str = "code_internal") -> Tuple[int, int]:
+        """
+        Sets the location of many properties with one unordered bulk write.
+
+        Args:
+            locations (Dict[str, GeoPoint]): Location of each property, by the value of `key`.
+            key (str): Field identifying the properties, '_id' or 'code_internal'.
+
+        Returns:
+            tuple: Number of matched and modified properties.
+        """
+        operations = [
+            UpdateOne(
+                {key: ObjectId(value) if key == "_id" else value},
+                {"$set": {"location": location.dict(), "updated_at": utc_now()}, "$inc": {"version": 1}}
+            )
+            for value, location in locations.items()
+        ]
+        if not operations:
+            return 0, 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.matched_count, result.modified_count
+
+    def watch(self, resume_token: Optional[str] = None, max_await_time_ms: Optional[int] = None):
+        """
+        Opens a change stream over the creations and price changes of the properties.
+
+        Only inserts (creations and upserts of the CRM synchronization) and updates whose changed fields include the
+        price are returned, filtered by the server. Change streams need a replica set or a sharded cluster.
+
+        Args:
+            resume_token (str): `_data` of the resume token of the last change seen, to resume right after it.
+            max_await_time_ms (int): Milliseconds the server waits for a change before `try_next` returns None.
+
+        Returns:
+            AsyncIOMotorChangeStream: The change stream; nothing is sent to the server until it is iterated.
+        """
+        pipeline = [{"$match": {"$or": [
+            {"operationType": "insert"},
+            {"operationType": "update", "updateDescription.updatedFields.price": {"$exists": True}},
+        ]}}]
+        return self.collection.watch(
+            pipeline, resume_after={"_data": resume_token} if resume_token else None,
+            max_await_time_ms=max_await_time_ms
+        )
+
+    async def ensure_indexes(self) -> None:
+        """
+        Creates the indexes required by the queries of this repository and drops the ones they replace.
+
+        MongoDB does not allow two indexes on the same keys with different options, so the replaced indexes are
+        dropped before the new ones are built. If the build fails they are created again, leaving the collection
+        as it was.
+
+        Raises:
+            OperationFailure: If the unique index on `code_internal` can not be built because several properties
+                share a code; those duplicates must be merged first.
+        """
+        await replace_indexes(self.collection, self.INDEXES, self.LEGACY_INDEXES)
+
+    @classmethod
+    def parse_sort(cls, sort: str):
+        """
+        Parses a sort specification into the document field and direction.
+
+        Args:
+            sort (str): Sort specification (e.g. 'price' or '-price').
+
+        Returns:
+            tuple: Document field and pymongo direction.
+
+        Raises:
+            ValueError: If the field is not sortable.
+        """
+        direction = DESCENDING if sort.startswith("-") else ASCENDING
+        key = sort.lstrip("-")
+        if key not in cls.SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {key}")
+        return cls.SORT_FIELDS[key], direction
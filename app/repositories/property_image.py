@@ -1,21 +1,167 @@
-from pymongo import MongoClient
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, IndexModel
+
 from app.models.property_image import PropertyImage
-from app.schemas.property_image import PropertyImageCreate, PropertyImageInDB
+from app.schemas.property_image import ImageDerivative, PropertyImageCreate, PropertyImageInDB
 from app.models.py_object_id import PyObjectId
 
 
 class PropertyImageRepository:
-    def __init__(self, client: MongoClient):
+    INDEXES = [
+        IndexModel([("id_property", ASCENDING)], name="id_property"),
+        IndexModel([("content_hash", ASCENDING)], name="content_hash"),
+    ]
+
+    def __init__(self, client: AsyncIOMotorClient):
         self.collection = client.realStateCompany.Property_images
 
-    def add_property_image(self, property_id: str, image_path: str, enable: bool) -> PropertyImageInDB:
+    async def add_property_image(
+        self, property_id: str, image_path: str, enable: bool, content_hash: Optional[str] = None,
+        derivatives: Optional[List[ImageDerivative]] = None, derivatives_status: str = "pending"
+    ) -> PropertyImageInDB:
 
         property_image_data = {
             "id_property": PyObjectId(property_id),
             "file": image_path,
-            "enable": enable
+            "enable": enable,
+            "content_hash": content_hash,
+            "derivatives": [derivative.dict() for derivative in derivatives or []],
+            "derivatives_status": derivatives_status,
         }
-        result = self.collection.insert_one(property_image_data)
+        result = await self.collection.insert_one(property_image_data)
         property_image_data['_id'] = PyObjectId(result.inserted_id)
         return PropertyImageInDB(**property_image_data)
 
+    async def add_property_images(self, images: List[PropertyImageCreate]) -> List[PropertyImageInDB]:
+        """
+        Inserts the records of many images with a single `insert_many`.
+
+        Args:
+            images (List[PropertyImageCreate]): Images to insert.
+
+        Returns:
+            List[PropertyImageInDB]: The inserted images with their generated IDs, in the same order.
+        """
+        if not images:
+            return []
+        documents = [{**image.dict(), "id_property": PyObjectId(image.id_property)} for image in images]
+        result = await self.collection.insert_many(documents)
+        return [
+            PropertyImageInDB(**document, _id=inserted_id)
+            for document, inserted_id in zip(documents, result.inserted_ids)
+        ]
+
+    async def get(self, property_id: str, image_id: str) -> Optional[PropertyImageInDB]:
+        """
+        Retrieves an image of a property.
+
+        Args:
+            property_id (str): ID of the property.
+            image_id (str): ID of the image.
+
+        Returns:
+            PropertyImageInDB: The image, or None if it was not found.
+        """
+        document = await self.collection.find_one({"_id": ObjectId(image_id), "id_property": ObjectId(property_id)})
+        return PropertyImageInDB(**document) if document else None
+
+    async def list_by_property(self, property_id: str) -> List[PropertyImageInDB]:
+        """
+        Lists the images of a property.
+
+        Args:
+            property_id (str): ID of the property.
+
+        Returns:
+            List[PropertyImageInDB]: The images of the property.
+        """
+        documents = self.collection.find({"id_property": ObjectId(property_id)})
+        return [PropertyImageInDB(**document) async for document in documents]
+
+    async def set_derivatives(self, image_id: str, derivatives: List[ImageDerivative], status: str) -> None:
+        """
+        Stores the derivatives generated for an image and their status.
+
+        Args:
+            image_id (str): ID of the image.
+            derivatives (List[ImageDerivative]): Generated derivatives.
+            status (str): 'ready' or 'failed'.
+        """
+        await self.collection.update_one(
+            {"_id": ObjectId(image_id)},
+            {"$set": {"derivatives": [derivative.dict() for derivative in derivatives], "derivatives_status": status}}
+        )
+
+    async def find_by_content_hash(self, content_hash: str) -> Optional[PropertyImageInDB]:
+        """
+        Returns an image stored with the given content hash, preferring one whose derivatives are ready.
+
+        Args:
+            content_hash (str): SHA-256 hex digest of the image content.
+
+        Returns:
+            PropertyImageInDB: An image with that content, or None if there is none.
+        """
+        document = await self.collection.find_one(
+            {"content_hash": content_hash}, sort=[("derivatives_status", -1)]  # 'ready' sorts after 'pending'
+        )
+        return PropertyImageInDB(**document) if document else None
+
+    async def find_by_content_hashes(self, content_hashes: List[str]) -> Dict[str, PropertyImageInDB]:
+        """
+        Returns one stored image per content hash with a single query, preferring the ones whose derivatives are
+        ready.
+
+        Args:
+            content_hashes (List[str]): SHA-256 hex digests of the contents.
+
+        Returns:
+            Dict[str, PropertyImageInDB]: An image by content hash, for the contents already stored.
+        """
+        images = {}
+        if not content_hashes:
+            return images
+        documents = self.collection.find(
+            {"content_hash": {"$in": list(set(content_hashes))}}, sort=[("derivatives_status", -1)]
+        )
+        async for document in documents:
+            images.setdefault(document["content_hash"], PropertyImageInDB(**document))
+        return images
+
+    async def count_references(self, content_hash: str) -> int:
+        """
+        Counts the images that reference a stored content. The file of that content can only be removed from the
+        image store when no image references it.
+
+        Args:
+            content_hash (str): SHA-256 hex digest of the image content.
+
+        Returns:
+            int: Number of images with that content.
+        """
+        return await self.collection.count_documents({"content_hash": content_hash})
+
+    async def delete(self, property_id: str, image_id: str) -> Optional[PropertyImageInDB]:
+        """
+        Deletes an image of a property.
+
+        Args:
+            property_id (str): ID of the property.
+            image_id (str): ID of the image.
+
+        Returns:
+            PropertyImageInDB: The deleted image, or None if it was not found.
+        """
+        document = await self.collection.find_one_and_delete(
+            {"_id": ObjectId(image_id), "id_property": ObjectId(property_id)}
+        )
+        return PropertyImageInDB(**document) if document else None
+
+    async def ensure_indexes(self) -> None:
+        """
+        Creates the indexes required by the queries of this repository.
+        """
+        await self.collection.create_indexes(self.INDEXES)
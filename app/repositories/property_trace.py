@@ -1,13 +1,284 @@
-from pymongo import MongoClient
-from app.models.property_trace import PropertyTrace
-from app.schemas.property_trace import PropertyTraceCreate
+from datetime import datetime, time
+from typing import List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+
+from app.core.config import settings
+from app.repositories.property import replace_indexes
+from app.schemas.property_trace import PropertyTraceCreate, PropertyTraceInDB, SalesRollup
+from app.models.py_object_id import PyObjectId
 
 
 class PropertyTraceRepository:
-    def __init__(self, client: MongoClient):
+    """
+    Repository to handle database operations for the sale history (traces) of real estate properties.
+
+    Besides storing the traces, it maintains the sales statistics of the `Property_trace_rollups` collection:
+    one document per group of each dimension (`year`, `owner`, `price_band`) with the count, average and
+    median sale value, sales volume and total tax. A new sale updates the counters of its groups with `$inc` and
+    marks their median as stale; a rebuild computes the counters with an aggregation pipeline materialized with
+    `$merge` and the medians of every group in one sorted pass over the traces. Reading the statistics never scans
+    the traces.
+
+    Attributes:
+        collection (AsyncIOMotorCollection): Collection of the traces.
+        properties (AsyncIOMotorCollection): Collection of the properties, used to resolve the owner of a trace.
+        rollups (AsyncIOMotorCollection): Collection of the materialized statistics.
+
+    Methods:
+        create(property_trace: PropertyTraceCreate) -> PropertyTraceInDB:
+            Stores a new trace.
+
+        refresh_rollups(trace: PropertyTraceInDB):
+            Adds the trace to the statistics groups it belongs to.
+
+        rebuild_rollups(dimensions: List[str]):
+            Recomputes every statistics group from scratch.
+
+        get_rollups(dimension: str) -> List[SalesRollup]:
+            Returns the materialized statistics of a dimension.
+    """
+    ROLLUP_DIMENSIONS = ("year", "owner", "price_band")
+
+    INDEXES = [
+        IndexModel([("date_sale", ASCENDING)], name="date_sale"),
+        IndexModel([("id_property", ASCENDING), ("date_sale", DESCENDING)], name="id_property_date_sale"),
+        IndexModel([("value", ASCENDING)], name="value"),
+    ]
+
+    # Indexes superseded by `INDEXES`, dropped by `ensure_indexes`: the single-field `id_property` index is a prefix
+    # of the compound `id_property_date_sale` one, which serves the same queries.
+    LEGACY_INDEXES = [
+        IndexModel([("id_property", ASCENDING)], name="id_property"),
+    ]
+
+    ROLLUP_INDEXES = [
+        IndexModel([("dimension", ASCENDING), ("key", ASCENDING)], name="dimension_key"),
+    ]
+
+    def __init__(self, client: AsyncIOMotorClient):
         self.collection = client.realStateCompany.Property_traces
+        self.properties = client.realStateCompany.Properties
+        self.rollups = client.realStateCompany.Property_trace_rollups
+
+    async def create(self, property_trace: PropertyTraceCreate) -> PropertyTraceInDB:
+        """
+        Stores a new trace. The sale date is stored as a datetime (BSON has no date type) and the property
+        reference as an ObjectId, so traces can be range-filtered and joined with their property.
+
+        Args:
+            property_trace (PropertyTraceCreate): Data of the sale.
+
+        Returns:
+            PropertyTraceInDB: The trace created with its generated ID.
+        """
+        property_trace_data = property_trace.dict()
+        result = await self.collection.insert_one({
+            **property_trace_data,
+            "date_sale": datetime.combine(property_trace.date_sale, time.min),
+            "id_property": ObjectId(property_trace.id_property),
+        })
+        property_trace_data["_id"] = PyObjectId(result.inserted_id)
+        return PropertyTraceInDB(**property_trace_data)
+
+    async def refresh_rollups(self, trace: PropertyTraceInDB):
+        """
+        Adds a new trace to the statistics groups it belongs to (its sale year, the owner of its property and its
+        price band). The count and the sums of each group are incremented atomically with `$inc`. Its median is not
+        recomputed, which would read the traces of the whole group on every sale: it is marked as stale until the
+        next rebuild.
+
+        Args:
+            trace (PropertyTraceInDB): Trace that was just stored.
+        """
+        keys = {"year": trace.date_sale.year, "price_band": self.price_band_key(trace.value)}
+        property_data = await self.properties.find_one({"_id": ObjectId(trace.id_property)}, {"id_owner": 1})
+        if property_data is not None:
+            keys["owner"] = property_data.get("id_owner")
+
+        for dimension, key in keys.items():
+            await self.rollups.update_one(
+                {"_id": {"dimension": dimension, "key": key}},
+                {
+                    "$inc": {"count": 1, "total_value": trace.value, "total_tax": trace.tax},
+                    "$set": {"median_stale": True},
+                    "$setOnInsert": {"dimension": dimension, "key": key},
+                },
+                upsert=True,
+            )
+
+    async def rebuild_rollups(self, dimensions: Optional[List[str]] = None):
+        """
+        Recomputes every statistics group of the given dimensions, medians included, and removes the groups that
+        no longer have traces. The previous statistics stay readable while the rebuild runs. A sale registered
+        during the rebuild may be left out of the median of its group until the next one.
+
+        Args:
+            dimensions (List[str]): Dimensions to rebuild, all of them by default.
+        """
+        for dimension in dimensions or self.ROLLUP_DIMENSIONS:
+            generation = ObjectId()
+            await self._run_rollup(dimension, generation=generation)
+            await self._set_medians(dimension, generation)
+            await self.rollups.delete_many({"dimension": dimension, "generation": {"$ne": generation}})
+
+    async def get_rollups(self, dimension: str) -> List[SalesRollup]:
+        """
+        Returns the materialized statistics of a dimension ordered by group.
+
+        Args:
+            dimension (str): 'year', 'owner' or 'price_band'.
+
+        Returns:
+            List[SalesRollup]: The statistics of each group.
+        """
+        cursor = self.rollups.find({"dimension": dimension}, {"_id": 0, "generation": 0}).sort("key", ASCENDING)
+        return [
+            SalesRollup(**document, average_value=document["total_value"] / document["count"])
+            async for document in cursor
+        ]
+
+    async def ensure_indexes(self):
+        """
+        Creates the indexes of the trace and statistics collections. The single-field `id_property` index is
+        dropped first: `id_property_date_sale` serves the same queries.
+        """
+        await replace_indexes(self.collection, self.INDEXES, self.LEGACY_INDEXES)
+        await self.rollups.create_indexes(self.ROLLUP_INDEXES)
+
+    async def _run_rollup(self, dimension: str, match: Optional[dict] = None, generation: Optional[ObjectId] = None):
+        pipeline = self.rollup_pipeline(dimension, match, generation)
+        await self.collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+    async def _set_medians(self, dimension: str, generation: ObjectId):
+        """
+        Stores the median value of every group of a dimension written by a rollup run. The traces are streamed
+        once, sorted by group and value, and only the one or two middle values of each group are kept, at the
+        positions given by the count of the group.
+        """
+        groups = self.rollups.find({"dimension": dimension, "generation": generation}, {"key": 1, "count": 1})
+        counts = {group["key"]: group["count"] async for group in groups}
+        pipeline = self._keyed_stages(dimension) + [
+            {"$sort": {"rollup_key": ASCENDING, "value": ASCENDING}},
+            {"$project": {"_id": 0, "rollup_key": 1, "value": 1}},
+        ]
+        operations = []
+        key, position, middle = None, 0, []
+        async for trace in self.collection.aggregate(pipeline, allowDiskUse=True):
+            if position == 0 or trace["rollup_key"] != key:
+                key, position, middle = trace["rollup_key"], 0, []
+            count = counts.get(key, 0)
+            if (count - 1) // 2 <= position <= count // 2:
+                middle.append(trace["value"])
+                if position == count // 2:
+                    operations.append(UpdateOne(
+                        {"_id": {"dimension": dimension, "key": key}},
+                        {"$set": {"median_value": sum(middle) / len(middle), "median_stale": False}},
+                    ))
+            position += 1
+        if operations:
+            await self.rollups.bulk_write(operations, ordered=False)
+
+    def rollup_pipeline(self, dimension: str, match: Optional[dict] = None, generation: Optional[ObjectId] = None) -> list:
+        """
+        Builds the aggregation pipeline that computes the counters of a dimension and merges them into the
+        statistics collection, overwriting the counters of the groups it recomputes. Medians are stored afterwards,
+        so a group keeps its previous median until then.
+
+        Args:
+            dimension (str): 'year', 'owner' or 'price_band'.
+            match (dict): Filter restricting the traces (and therefore the groups) that are recomputed.
+            generation (ObjectId): Marker stored in every group written by this run.
+
+        Returns:
+            list: The aggregation pipeline.
+        """
+        if dimension not in self.ROLLUP_DIMENSIONS:
+            raise ValueError(f"Invalid statistics dimension '{dimension}'")
+        generation = generation or ObjectId()
+
+        return self._keyed_stages(dimension, match) + [
+            {"$group": {
+                "_id": "$rollup_key",
+                "count": {"$sum": 1},
+                "total_value": {"$sum": "$value"},
+                "total_tax": {"$sum": "$tax"},
+            }},
+            {"$project": {
+                "_id": {"dimension": {"$literal": dimension}, "key": "$_id"},
+                "dimension": {"$literal": dimension},
+                "key": "$_id",
+                "count": 1,
+                "total_value": 1,
+                "total_tax": 1,
+                "generation": {"$literal": generation},
+            }},
+            {"$merge": {
+                "into": self.rollups.name, "on": "_id", "whenMatched": "merge", "whenNotMatched": "insert"
+            }},
+        ]
+
+    def _keyed_stages(self, dimension: str, match: Optional[dict] = None) -> list:
+        """
+        Returns the pipeline stages that filter the traces and add the key of their group as `rollup_key`.
+        """
+        stages = [{"$match": match}] if match else []
+        if dimension == "owner":
+            stages += [
+                {"$lookup": {
+                    "from": self.properties.name, "localField": "id_property", "foreignField": "_id",
+                    "as": "property"
+                }},
+                {"$unwind": "$property"},
+            ]
+        return stages + [{"$addFields": {"rollup_key": self._rollup_key(dimension)}}]
+
+    @staticmethod
+    def price_band_key(value: float) -> float:
+        """
+        Returns the price band of a sale value: the lower bound of the highest band whose bound is not above it.
+        Values below the first bound belong to the first band.
+
+        Args:
+            value (float): Sale value.
+
+        Returns:
+            float: Lower bound of the band.
+        """
+        bounds = sorted(settings.PRICE_BANDS)
+        return max((bound for bound in bounds if bound <= value), default=bounds[0])
+
+    @staticmethod
+    def price_band_range(value: float) -> dict:
+        """
+        Returns the value range of the price band a sale value falls in. Bands are delimited by the lower bounds
+        of `settings.PRICE_BANDS`; values below the first bound belong to the first band.
+
+        Args:
+            value (float): Sale value.
+
+        Returns:
+            dict: Range filter (`$gte`/`$lt`) of the band, empty when there is a single band.
+        """
+        bounds = sorted(settings.PRICE_BANDS)
+        index = max((i for i, bound in enumerate(bounds) if bound <= value), default=0)
+        band_range = {"$gte": bounds[index]} if index > 0 else {}
+        if index + 1 < len(bounds):
+            band_range["$lt"] = bounds[index + 1]
+        return band_range
 
-    def create(self, property_trace: PropertyTraceCreate) -> PropertyTrace:
-        property_trace_id = self.collection.insert_one(property_trace.dict()).inserted_id
-        property_trace_db = self.collection.find_one({"_id": property_trace_id})
-        return PropertyTrace(**property_trace_db)
+    @staticmethod
+    def _rollup_key(dimension: str):
+        if dimension == "year":
+            return {"$year": "$date_sale"}
+        if dimension == "owner":
+            return "$property.id_owner"
+        bounds = sorted(settings.PRICE_BANDS)
+        # Lower bound of the highest band whose bound is not above the value.
+        return {"$reduce": {
+            "input": bounds,
+            "initialValue": bounds[0],
+            "in": {"$cond": [{"$gte": ["$value", "$$this"]}, "$$this", "$$value"]},
+        }}
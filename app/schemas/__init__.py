@@ -1,3 +1,11 @@
-from app.schemas.property import PropertyCreate, PropertyInDB, PropertyUpdate
-from app.schemas.property_image import PropertyImageCreate, PropertyImageInDB
-
+from app.schemas.owner import OwnerCreate, OwnerInDB
+from app.schemas.property import (
+    PropertyCreate, PropertyInDB, PropertyDetail, PropertyNearby, PropertyUpdate, PropertyFilter, PropertyPage,
+    PropertySearchHit, PropertySearchPage, PriceChange, PriceAdjustment, BulkPriceUpdate, PriceChangeResult,
+    BulkPriceUpdateResult, PropertySync, PropertySyncResult, PropertyEvent
+)
+from app.schemas.property_image import (
+    ImageDerivative, PropertyImageCreate, PropertyImageInDB, PropertyImageUploadResult, PropertyImageBatchResult,
+    PropertyImageUploadRequest, PropertyImageUploadTicket, PropertyImageRegister
+)
+from app.schemas.property_trace import PropertyTraceCreate, PropertyTraceInDB, SalesRollup
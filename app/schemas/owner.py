@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import date
 
+from app.models.py_object_id import PyObjectId
+
 
 class OwnerCreate(BaseModel):
     name: str
@@ -10,12 +12,12 @@ class OwnerCreate(BaseModel):
     birthday: date
 
 
-class OwnerInDB(BaseModel):
-    id: str
-    name: str
-    address: str
-    photo: Optional[str]
-    birthday: date
+class OwnerInDB(OwnerCreate):
+    id: PyObjectId = Field(alias="_id")
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+        allow_population_by_field_name = True
+        json_encoders = {
+            PyObjectId: str  # Asegura que los ObjectId se conviertan a cadena
+        }
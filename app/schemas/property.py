@@ -1,5 +1,12 @@
-from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field, root_validator, validator
+from app.models.geo_point import GeoPoint
 from app.models.py_object_id import PyObjectId  # Importamos la clase PyObjectId
+from app.schemas.owner import OwnerInDB
+from app.schemas.property_image import PropertyImageInDB
+from app.schemas.property_trace import PropertyTraceInDB
 
 
 class PropertyCreate(BaseModel):
@@ -16,6 +23,7 @@ class PropertyCreate(BaseModel):
         code_internal (str): Internal code assigned to the property.
         year (int): Year of construction of the property.
         id_owner (str): Identification of the owner of the property.
+        location (GeoPoint): Optional GeoJSON point of the property, used by the nearby search.
     """
     name: str
     address: str
@@ -23,6 +31,7 @@ class PropertyCreate(BaseModel):
     code_internal: str
     year: int
     id_owner: str
+    location: Optional[GeoPoint] = None
 
 
 class PropertyInDB(PropertyCreate):
@@ -35,8 +44,12 @@ class PropertyInDB(PropertyCreate):
 
     Attributes:
         id (PyObjectId): unique identifier of the property in the database.
+        version (int): Incremented by every write of the property (0 for properties never written since versioning).
+        updated_at (datetime): UTC time of the last write of the property.
     """
     id: PyObjectId = Field(alias="_id")
+    version: int = 0
+    updated_at: Optional[datetime] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -44,6 +57,24 @@ class PropertyInDB(PropertyCreate):
             PyObjectId: str  # Asegura que los ObjectId se conviertan a cadena
         }
 
+    @classmethod
+    def from_document(cls, document: dict) -> "PropertyInDB":
+        """
+        Builds the schema from a stored document without validating it again.
+
+        Properties are validated when they are written, so a document read back only needs its fields picked and
+        its ObjectId converted to string, once. This keeps the per-read cost of the hot paths (get, list) low.
+
+        Args:
+            document (dict): Document as stored in MongoDB (with `_id`).
+
+        Returns:
+            PropertyInDB: The property.
+        """
+        values = {name: document[field.alias] for name, field in cls.__fields__.items() if field.alias in document}
+        values["id"] = str(document["_id"])
+        return cls.construct(**values)
+
 
 class PropertyUpdate(BaseModel):
     """
@@ -56,3 +87,242 @@ class PropertyUpdate(BaseModel):
         price (float): New price of the property. Must be greater than 0.
     """
     price: float = Field(..., gt=0, description="El nuevo precio de la propiedad.")
+
+
+class PropertyFilter(BaseModel):
+    """
+    Schema with the structured filters available when listing real estate properties.
+
+    Every attribute is optional; only the ones provided are applied to the query.
+
+    Attributes:
+        min_price (float): Minimum price (inclusive).
+        max_price (float): Maximum price (inclusive).
+        min_year (int): Minimum year of construction (inclusive).
+        max_year (int): Maximum year of construction (inclusive).
+        id_owner (str): Identification of the owner of the property.
+        code_internal (str): Internal code assigned to the property.
+    """
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    id_owner: Optional[str] = None
+    code_internal: Optional[str] = None
+
+    def to_query(self) -> dict:
+        """
+        Builds the MongoDB query matching the filters that were provided.
+
+        Returns:
+            dict: MongoDB filter document.
+        """
+        query = {}
+        price = {}
+        if self.min_price is not None:
+            price["$gte"] = self.min_price
+        if self.max_price is not None:
+            price["$lte"] = self.max_price
+        if price:
+            query["price"] = price
+        year = {}
+        if self.min_year is not None:
+            year["$gte"] = self.min_year
+        if self.max_year is not None:
+            year["$lte"] = self.max_year
+        if year:
+            query["year"] = year
+        if self.id_owner is not None:
+            query["id_owner"] = self.id_owner
+        if self.code_internal is not None:
+            query["code_internal"] = self.code_internal
+        return query
+
+
+class PropertyDetail(PropertyInDB):
+    """
+    Schema for a real estate property together with its related documents.
+
+    The related documents are only present when they are requested through `expand`; images and traces are
+    bounded to the most recent ones.
+
+    Attributes:
+        owner (OwnerInDB): Owner of the property, None when it does not exist.
+        images (List[PropertyImageInDB]): Images of the property.
+        traces (List[PropertyTraceInDB]): Sale history of the property, most recent first.
+    """
+    owner: Optional[OwnerInDB]
+    images: Optional[List[PropertyImageInDB]]
+    traces: Optional[List[PropertyTraceInDB]]
+
+
+class PropertyNearby(PropertyInDB):
+    """
+    Schema for a real estate property found by a geospatial search.
+
+    Attributes:
+        distance (float): Distance in meters from the search point.
+    """
+    distance: float
+
+
+class PropertySearchHit(PropertyInDB):
+    """
+    Schema for a real estate property found by a text search.
+
+    Attributes:
+        score (float): Relevance of the property for the searched text (higher is more relevant).
+    """
+    score: float
+
+
+class PropertySearchPage(BaseModel):
+    """
+    Schema for a page of text search results, most relevant first.
+
+    Attributes:
+        items (List[PropertySearchHit]): Properties of the page with their relevance.
+        next_cursor (str): Opaque cursor to request the next page, None when there are no more results.
+    """
+    items: List[PropertySearchHit]
+    next_cursor: Optional[str] = None
+
+
+class PropertyPage(BaseModel):
+    """
+    Schema for a page of real estate properties.
+
+    Attributes:
+        items (List[PropertyDetail]): Properties of the page, with their related documents when expanded.
+        next_cursor (str): Opaque cursor to request the next page, None when there are no more results.
+    """
+    items: List[PropertyDetail]
+    next_cursor: Optional[str] = None
+
+
+class PriceChange(BaseModel):
+    """
+    Schema for the new price of one property in a bulk price update.
+
+    Attributes:
+        property_id (str): ID of the property.
+        price (float): New price of the property. Must be greater than 0.
+    """
+    property_id: str
+    price: float = Field(..., gt=0)
+
+
+class PriceAdjustment(BaseModel):
+    """
+    Schema for a price adjustment applied to every property matching a filter.
+
+    Attributes:
+        type (str): 'percentage' to scale prices (10 -> +10%) or 'absolute' to add an amount (-500 -> 500 less).
+        value (float): Percentage or amount of the adjustment.
+    """
+    type: Literal["percentage", "absolute"]
+    value: float
+
+    @validator("value")
+    def percentage_keeps_prices_positive(cls, value, values):
+        if values.get("type") == "percentage" and value <= -100:
+            raise ValueError("A percentage adjustment must be greater than -100")
+        return value
+
+
+class BulkPriceUpdate(BaseModel):
+    """
+    Schema for a bulk price update, given either as explicit items or as a filter plus an adjustment.
+
+    Attributes:
+        items (List[PriceChange]): New price of each property.
+        filter (PropertyFilter): Properties to adjust.
+        adjustment (PriceAdjustment): Adjustment applied to the properties matching `filter`.
+    """
+    items: Optional[List[PriceChange]] = None
+    filter: Optional[PropertyFilter] = None
+    adjustment: Optional[PriceAdjustment] = None
+
+    @root_validator(skip_on_failure=True)
+    def one_mode(cls, values):
+        # An empty filter ({}) adjusts every property, but it has to be sent explicitly
+        by_items = values.get("items") is not None
+        by_filter = values.get("filter") is not None or values.get("adjustment") is not None
+        if by_items == by_filter or (by_filter and (values.get("filter") is None or values.get("adjustment") is None)):
+            raise ValueError("Provide either 'items' or 'filter' with 'adjustment'")
+        return values
+
+
+class PriceChangeResult(BaseModel):
+    """
+    Schema for the outcome of one item of a bulk price update.
+
+    Attributes:
+        property_id (str): ID of the property.
+        status (str): 'updated', 'unchanged' (it already had that price), 'not_found' or 'invalid_id'.
+    """
+    property_id: str
+    status: Literal["updated", "unchanged", "not_found", "invalid_id"]
+
+
+class BulkPriceUpdateResult(BaseModel):
+    """
+    Schema for the outcome of a bulk price update.
+
+    Attributes:
+        matched (int): Properties found.
+        modified (int): Properties whose price changed.
+        not_found (int): Items whose property does not exist or whose ID is not valid.
+        items (List[PriceChangeResult]): Outcome of each item (only for updates given as items).
+    """
+    matched: int = 0
+    modified: int = 0
+    not_found: int = 0
+    items: List[PriceChangeResult] = []
+
+
+class PropertySync(BaseModel):
+    """
+    Schema for a batch of properties synchronized from the CRM.
+
+    Attributes:
+        items (List[PropertyCreate]): Properties, identified by their internal code.
+    """
+    items: List[PropertyCreate]
+
+
+class PropertySyncResult(BaseModel):
+    """
+    Schema for the outcome of a synchronization.
+
+    Attributes:
+        inserted (int): Properties created (internal code not seen before).
+        updated (int): Existing properties whose data changed.
+        unchanged (int): Existing properties whose data did not change; nothing is written for them.
+        duplicates (int): Items ignored because a later item had the same internal code.
+    """
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+
+
+class PropertyEvent(BaseModel):
+    """
+    Schema for a change of the catalog streamed to the clients of the event feed.
+
+    Attributes:
+        id (str): Position of the event in the feed; sent back as `Last-Event-ID` to resume after it.
+        type (str): 'property_created', 'price_changed' or 'reset' (the requested position is no longer available,
+            so the client has to refetch what it holds; the feed continues from `id`).
+        property_id (str): ID of the property.
+        price (float): Price of the property after the change.
+        property (PropertyInDB): The created property (only for 'property_created').
+        time (datetime): When the change happened.
+    """
+    id: str
+    type: Literal["property_created", "price_changed", "reset"]
+    property_id: Optional[str] = None
+    price: Optional[float] = None
+    property: Optional[PropertyInDB] = None
+    time: datetime
@@ -1,11 +1,34 @@
+from typing import Dict, List, Literal, Optional
+
 from pydantic import BaseModel, Field
 from app.models.py_object_id import PyObjectId  # Importamos la clase PyObjectId
 
 
+class ImageDerivative(BaseModel):
+    """
+    Schema for a resized version of a property image.
+
+    Attributes:
+        name (str): Name of the derivative spec that produced it (e.g. 'thumbnail').
+        file (str): Path of the derivative file.
+        width (int): Width in pixels.
+        height (int): Height in pixels.
+        format (str): Image format (e.g. 'JPEG', 'WEBP').
+    """
+    name: str
+    file: str
+    width: int
+    height: int
+    format: str
+
+
 class PropertyImageCreate(BaseModel):
     id_property: PyObjectId
     file: str
     enable: bool
+    content_hash: Optional[str] = None
+    derivatives: List[ImageDerivative] = []
+    derivatives_status: str = "pending"  # pending -> ready | failed
 
 
 class PropertyImageInDB(PropertyImageCreate):
@@ -16,3 +39,79 @@ class PropertyImageInDB(PropertyImageCreate):
         json_encoders = {
             PyObjectId: str  # Asegura que los ObjectId se conviertan a cadena
         }
+
+
+class PropertyImageUploadResult(BaseModel):
+    """
+    Schema for the outcome of one file of a batch image upload.
+
+    Attributes:
+        filename (str): Name of the uploaded file.
+        status (str): 'uploaded', or 'rejected' when the file is not a valid image (see `error`).
+        image (PropertyImageInDB): The image created for the file, when it was uploaded.
+        error (str): Why the file was rejected.
+    """
+    filename: str
+    status: Literal["uploaded", "rejected"]
+    image: Optional[PropertyImageInDB] = None
+    error: Optional[str] = None
+
+
+class PropertyImageBatchResult(BaseModel):
+    """
+    Schema for the outcome of a batch image upload.
+
+    Attributes:
+        uploaded (int): Files stored and registered as images of the property.
+        rejected (int): Files rejected.
+        items (List[PropertyImageUploadResult]): Outcome of each file, in the order they were sent.
+    """
+    uploaded: int = 0
+    rejected: int = 0
+    items: List[PropertyImageUploadResult] = []
+
+
+class PropertyImageUploadRequest(BaseModel):
+    """
+    Schema for a request to upload an image directly to the storage.
+
+    Attributes:
+        filename (str): Name of the file, for its extension.
+        content_hash (str): SHA-256 hex digest of the file.
+        size (int): Size of the file in bytes.
+    """
+    filename: str
+    content_hash: str = Field(..., regex="^[0-9a-f]{64}$")
+    size: int = Field(..., gt=0)
+
+
+class PropertyImageUploadTicket(BaseModel):
+    """
+    Schema for the instructions to upload an image directly to the storage.
+
+    Attributes:
+        key (str): Staging key the file is uploaded to, sent back to register the upload.
+        url (str): Presigned URL to send the file to.
+        method (str): HTTP method of the upload.
+        headers (Dict[str, str]): Headers the upload must be sent with (content type and checksum).
+        expires_in (int): Seconds the URL is valid.
+    """
+    key: str
+    url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = {}
+    expires_in: int
+
+
+class PropertyImageRegister(BaseModel):
+    """
+    Schema for the registration of an image uploaded directly to the storage.
+
+    Attributes:
+        key (str): Staging key of the upload ticket the file was uploaded with.
+        filename (str): Name of the file, for its extension.
+        content_hash (str): SHA-256 hex digest of the file.
+    """
+    key: str
+    filename: str
+    content_hash: str = Field(..., regex="^[0-9a-f]{64}$")
@@ -1,15 +1,54 @@
-from pydantic import BaseModel
-from typing import Optional
+from bson import ObjectId
+from pydantic import BaseModel, Field, validator
+from typing import Optional, Union
 from datetime import date
 
+from app.models.py_object_id import PyObjectId
+
 
 class PropertyTraceCreate(BaseModel):
     date_sale: date
     name: str
-    value: float
-    tax: float
+    value: float = Field(..., ge=0)
+    tax: float = Field(..., ge=0)
     id_property: str
 
+    @validator("id_property")
+    def id_property_is_object_id(cls, value):
+        if not ObjectId.is_valid(value):
+            raise ValueError("ObjectId no válido")
+        return value
+
 
 class PropertyTraceInDB(PropertyTraceCreate):
-    id: str
+    id: PyObjectId = Field(alias="_id")
+
+    class Config:
+        allow_population_by_field_name = True
+        json_encoders = {
+            PyObjectId: str  # Asegura que los ObjectId se conviertan a cadena
+        }
+
+
+class SalesRollup(BaseModel):
+    """
+    Schema for the sales statistics of one group of the sale history, as materialized in the rollup collection.
+
+    Attributes:
+        dimension (str): Grouping of the statistics: 'year', 'owner' or 'price_band'.
+        key: Group within the dimension (the year, the owner ID or the lower bound of the price band).
+        count (int): Number of sales.
+        total_value (float): Sales volume (sum of the sale values).
+        average_value (float): Average sale value.
+        median_value (float): Median sale value as of the last rebuild (missing until the first one).
+        median_stale (bool): Whether sales were registered in the group since its median was computed.
+        total_tax (float): Sum of the taxes of the sales.
+    """
+    dimension: str
+    key: Union[int, float, str, None]
+    count: int
+    total_value: float
+    average_value: float
+    median_value: Optional[float] = None
+    median_stale: bool = False
+    total_tax: float
@@ -0,0 +1,111 @@
+"""
+Sets the location of existing properties from a CSV file with their coordinates.
+
+The file needs a column identifying the property (`code_internal` by default, or `id` with `--key id`) and the
+`latitude` and `longitude` columns. Rows are applied in batches of `BULK_WRITE_BATCH_SIZE` with one bulk write each;
+rows with invalid coordinates or IDs are reported and skipped.
+
+    python -m app.scripts.backfill_locations locations.csv [--key code_internal|id] [--dry-run]
+
+API workers keep cached properties up to `PROPERTY_CACHE_TTL` seconds, so they may serve them without their new
+location until then.
+"""
+import argparse
+import asyncio
+import csv
+import logging
+
+from bson import ObjectId
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+from app.models.geo_point import GeoPoint
+from app.repositories.property import PropertyRepository
+
+logger = logging.getLogger(__name__)
+
+# Column of the CSV file and document field of each supported key.
+KEY_FIELDS = {"code_internal": "code_internal", "id": "_id"}
+
+
+def read_locations(rows, key: str = "code_internal"):
+    """
+    Parses the rows of the CSV file.
+
+    Args:
+        rows: Iterable of dictionaries (e.g. a `csv.DictReader`).
+        key (str): Column identifying the property, 'code_internal' or 'id'.
+
+    Yields:
+        tuple: Line number, value of the key and location (None when the row is invalid).
+    """
+    for line, row in enumerate(rows, start=2):
+        value = (row.get(key) or "").strip()
+        try:
+            if not value or (key == "id" and not ObjectId.is_valid(value)):
+                raise ValueError(f"invalid {key}")
+            location = GeoPoint.from_lon_lat(float(row["longitude"]), float(row["latitude"]))
+        except (KeyError, TypeError, ValueError, ValidationError) as e:
+            logger.warning("Line %s skipped: %s", line, e)
+            yield line, value, None
+        else:
+            yield line, value, location
+
+
+async def backfill_locations(
+    database, rows, key: str = "code_internal", dry_run: bool = False, batch_size: int = settings.BULK_WRITE_BATCH_SIZE
+) -> dict:
+    """
+    Sets the location of the properties listed in the rows.
+
+    Args:
+        database: Database instance used by the repositories.
+        rows: Iterable of dictionaries with the key, `latitude` and `longitude` columns.
+        key (str): Column identifying the property, 'code_internal' or 'id'.
+        dry_run (bool): Only validate the rows, without writing.
+        batch_size (int): Number of updates sent per bulk write.
+
+    Returns:
+        dict: Number of rows read, invalid rows, matched and modified properties.
+    """
+    repository = PropertyRepository(database)
+    stats = {"rows": 0, "invalid": 0, "matched": 0, "modified": 0}
+    batch = {}
+
+    async def flush():
+        if batch and not dry_run:
+            matched, modified = await repository.set_locations(batch, KEY_FIELDS[key])
+            stats["matched"] += matched
+            stats["modified"] += modified
+        batch.clear()
+
+    for _, value, location in read_locations(rows, key):
+        stats["rows"] += 1
+        if location is None:
+            stats["invalid"] += 1
+            continue
+        batch[value] = location
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV file with the key, latitude and longitude columns")
+    parser.add_argument("--key", choices=list(KEY_FIELDS), default="code_internal")
+    parser.add_argument("--dry-run", action="store_true", help="Only validate the file")
+    args = parser.parse_args()
+
+    with open(args.path, newline="", encoding="utf-8") as file:
+        stats = asyncio.run(backfill_locations(get_database(), csv.DictReader(file), args.key, args.dry_run))
+    logger.info("Location backfill finished: %s", stats)
+
+
+if __name__ == "__main__":
+    from app.core.logger import setup_logging
+
+    setup_logging()
+    main()
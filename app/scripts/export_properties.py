@@ -0,0 +1,71 @@
+"""
+Exports the whole property catalog to a file (or to stdout), for the data warehouse.
+
+The catalog is streamed from a database cursor and encoded on the fly, so memory stays flat whatever its size.
+
+    python -m app.scripts.export_properties [--format ndjson|csv|bson] [--traces] [--gzip] [--output FILE]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+from app.repositories.property import PropertyRepository
+from app.utils.export import EXPORT_FORMATS, stream_export
+
+logger = logging.getLogger(__name__)
+
+
+async def export_properties(
+    database, output, export_format: str = "ndjson", include_traces: bool = False, compress: bool = False,
+    batch_size: int = settings.EXPORT_BATCH_SIZE
+) -> int:
+    """
+    Writes the export to a binary file object.
+
+    Args:
+        database: Database instance used by the repositories.
+        output: Binary file object the export is written to.
+        export_format (str): 'ndjson', 'csv' or 'bson'.
+        include_traces (bool): Whether to include the sales of each property.
+        compress (bool): Whether to gzip the output.
+        batch_size (int): Number of documents fetched per round trip.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    cursor = PropertyRepository(database).export_cursor(include_traces, batch_size, raw=export_format == "bson")
+    written = 0
+    async for chunk in stream_export(cursor, export_format, include_traces, compress):
+        output.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson", dest="export_format")
+    parser.add_argument("--traces", action="store_true")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    parser.add_argument("--output", help="File to write, stdout by default")
+    args = parser.parse_args()
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        written = asyncio.run(export_properties(
+            get_database(), output, args.export_format, args.traces, args.gzip, args.batch_size
+        ))
+    finally:
+        if args.output:
+            output.close()
+    logger.info("Export finished: %s bytes written", written)
+
+
+if __name__ == "__main__":
+    from app.core.logger import setup_logging
+
+    setup_logging()
+    main()
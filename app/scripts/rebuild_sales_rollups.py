@@ -0,0 +1,46 @@
+"""
+Recomputes the materialized sales statistics (`Property_trace_rollups`) from the whole sale history.
+
+The counters are kept up to date as sales are registered through the API, but medians are only computed here: run
+this periodically to refresh the stale ones, after loading traces directly into the database, after changing
+`PRICE_BANDS`, or to recover from a failed incremental refresh.
+
+    python -m app.scripts.rebuild_sales_rollups [--dimension year|owner|price_band ...]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.db.mongodb import get_database
+from app.repositories.property_trace import PropertyTraceRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_sales_rollups(database, dimensions=None):
+    """
+    Rebuilds the statistics of the given dimensions.
+
+    Args:
+        database: Database instance used by the repositories.
+        dimensions (list): Dimensions to rebuild, all of them by default.
+    """
+    await PropertyTraceRepository(database).rebuild_rollups(dimensions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--dimension", action="append", choices=PropertyTraceRepository.ROLLUP_DIMENSIONS, dest="dimensions"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(rebuild_sales_rollups(get_database(), args.dimensions))
+    logger.info("Sales statistics rebuilt: %s", ", ".join(args.dimensions or PropertyTraceRepository.ROLLUP_DIMENSIONS))
+
+
+if __name__ == "__main__":
+    from app.core.logger import setup_logging
+
+    setup_logging()
+    main()
@@ -0,0 +1,104 @@
+"""
+Migrates the images stored in the flat images directory (`<uuid4>-<filename>`) to the content-addressed store.
+
+For every image record without `content_hash`, the file is hashed, moved to its sharded `ab/cd/<hash>.<ext>` path
+(together with its derivatives) and the record is updated. Identical files collapse into a single stored file.
+Image files (known image extensions only) left in the flat directory that no record references are reported as
+orphans, and removed with `--delete-orphans`.
+
+    python -m app.scripts.rehash_images [--dry-run] [--delete-orphans]
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+from app.repositories.property_image import PropertyImageRepository
+from app.services.image_derivatives import FORMAT_EXTENSIONS, derivative_path
+from app.utils.file_utils import content_path, hash_file, move_file, remove_file
+
+logger = logging.getLogger(__name__)
+
+# Extensions of the files that can be orphan images (uploads and derivatives); anything else is left alone.
+IMAGE_EXTENSIONS = set(settings.EXTENTIONS_FILE_LIST) | set(FORMAT_EXTENSIONS.values())
+
+
+async def rehash_images(database, directory: str, dry_run: bool = False, delete_orphans: bool = False) -> dict:
+    """
+    Moves the flat image files to the content-addressed store and updates their records.
+
+    Args:
+        database: Database instance used by the repositories.
+        directory (str): Images directory.
+        dry_run (bool): Only report what would be done.
+        delete_orphans (bool): Remove the flat files that no image record references.
+
+    Returns:
+        dict: Counters of migrated, deduplicated, missing and orphan files.
+    """
+    collection = PropertyImageRepository(database).collection
+    stats = {"migrated": 0, "deduplicated": 0, "missing": 0, "orphans": 0}
+    still_referenced = set()
+
+    async for document in collection.find({"content_hash": None}):
+        file_path = document["file"]
+        if not os.path.isfile(file_path):
+            logger.warning("Image %s points to a missing file %s", document["_id"], file_path)
+            stats["missing"] += 1
+            # Its derivatives may still exist and are still referenced by the record
+            still_referenced.update(os.path.abspath(d["file"]) for d in document.get("derivatives", []))
+            continue
+        content_hash = await asyncio.to_thread(hash_file, file_path)
+        extension = file_path.rsplit(".", 1)[-1].lower()
+        new_path = content_path(directory, content_hash, extension)
+        if os.path.exists(new_path):
+            stats["deduplicated"] += 1
+        stats["migrated"] += 1
+        if dry_run:
+            still_referenced.add(os.path.abspath(file_path))
+            still_referenced.update(os.path.abspath(d["file"]) for d in document.get("derivatives", []))
+            continue
+
+        derivatives = []
+        for derivative in document.get("derivatives", []):
+            new_derivative_path = derivative_path(new_path, derivative["name"], derivative["format"])
+            if os.path.isfile(derivative["file"]):
+                await asyncio.to_thread(move_file, derivative["file"], new_derivative_path)
+            derivatives.append({**derivative, "file": new_derivative_path})
+        await asyncio.to_thread(move_file, file_path, new_path)
+        await collection.update_one(
+            {"_id": document["_id"]},
+            {"$set": {"file": new_path, "content_hash": content_hash, "derivatives": derivatives}}
+        )
+
+    # Whatever remains directly in the flat directory is not referenced by any image
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if (
+                entry.is_file() and entry.name.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS
+                and os.path.abspath(entry.path) not in still_referenced
+            ):
+                stats["orphans"] += 1
+                if delete_orphans and not dry_run:
+                    remove_file(entry.path)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default=settings.IMAGES_DIRECTORY)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--delete-orphans", action="store_true")
+    args = parser.parse_args()
+
+    stats = asyncio.run(rehash_images(get_database(), args.directory, args.dry_run, args.delete_orphans))
+    logger.info("Rehash finished: %s", stats)
+
+
+if __name__ == "__main__":
+    from app.core.logger import setup_logging
+
+    setup_logging()
+    main()
@@ -0,0 +1,88 @@
+"""
+Removes from the image store the contents that no image references anymore.
+
+Deleting an image only deletes its record: its file may be shared with other images, and an upload of the same
+content may be registering it at that very moment (the file is stored before its record is inserted). This sweep
+removes the original and the derivatives of each content without references, but only when none of its files was
+modified during the last `--grace-period` seconds. Every upload refreshes the modification time of the file it
+stores before inserting its record, so the content of an upload in progress is never removed. The staged objects of
+direct uploads that were never registered are removed too, once they are older than the grace period.
+
+    python -m app.scripts.sweep_images [--grace-period 3600] [--dry-run]
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+
+from app.db.mongodb import get_database
+from app.repositories.property_image import PropertyImageRepository
+from app.services.image_storage import ImageStorage, get_image_storage, is_staged_upload, stored_content_hash
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_images(database, storage: ImageStorage, grace_period: float = 3600, dry_run: bool = False) -> dict:
+    """
+    Removes the stored contents without image references that were not modified during the grace period.
+
+    Args:
+        database: Database instance used by the repositories.
+        storage (ImageStorage): The image store.
+        grace_period (float): Seconds a content must stay unmodified before it can be removed.
+        dry_run (bool): Only report what would be removed.
+
+    Returns:
+        dict: Counters of the contents found, still referenced, recently modified and removed, and of the staged
+        uploads removed.
+    """
+    repository = PropertyImageRepository(database)
+    stats = {"contents": 0, "referenced": 0, "recent": 0, "removed": 0, "abandoned_uploads": 0}
+    files = await asyncio.to_thread(lambda: list(storage.list_files()))
+
+    # Keys are sorted, so the original and the derivatives of a content are consecutive
+    for content_hash, group in itertools.groupby(files, key=lambda file: stored_content_hash(file[0])):
+        cutoff = time.time() - grace_period
+        if content_hash is None:
+            for key, modified in group:
+                if is_staged_upload(key) and modified <= cutoff:
+                    stats["abandoned_uploads"] += 1
+                    if not dry_run:
+                        await storage.delete(key)
+            continue
+        group = list(group)
+        stats["contents"] += 1
+        if any(modified > cutoff for _, modified in group):
+            stats["recent"] += 1
+            continue
+        if await repository.count_references(content_hash):
+            stats["referenced"] += 1
+            continue
+        # An upload that started after the listing has refreshed the file before inserting its record
+        modified = await asyncio.to_thread(storage.modified_at, group[0][0])
+        if modified is not None and modified > cutoff:
+            stats["recent"] += 1
+            continue
+        stats["removed"] += 1
+        if not dry_run:
+            for key, _ in group:
+                await storage.delete(key)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grace-period", type=float, default=3600, help="Seconds a content must stay unmodified")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    stats = asyncio.run(sweep_images(get_database(), get_image_storage(), args.grace_period, args.dry_run))
+    logger.info("Image sweep finished: %s", stats)
+
+
+if __name__ == "__main__":
+    from app.core.logger import setup_logging
+
+    setup_logging()
+    main()
@@ -0,0 +1,98 @@
+"""
+Synchronizes the properties exported by the CRM: creates the new ones and updates the changed ones by internal code.
+
+The file holds one property per line (NDJSON) or a JSON array of properties, with the fields of `POST /create-property/`.
+It is read and applied in batches of `BULK_WRITE_BATCH_SIZE`; properties whose data did not change since the last
+synchronization are not written. Invalid records are reported and skipped.
+
+    python -m app.scripts.sync_properties crm-export.ndjson [--dry-run]
+
+API workers keep cached properties up to `PROPERTY_CACHE_TTL` seconds, so they may serve the previous data of an
+updated property until then.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+from app.repositories.property import PropertyRepository
+from app.schemas import PropertyCreate
+
+logger = logging.getLogger(__name__)
+
+
+def read_records(file):
+    """
+    Yields the records of a NDJSON file, or of a JSON array file.
+    """
+    head = file.read(1)
+    while head.isspace():
+        head = file.read(1)
+    if head == "[":
+        yield from json.loads(head + file.read())
+        return
+    for line in itertools.chain([head + file.readline()], file):
+        if line.strip():
+            yield json.loads(line)
+
+
+async def sync_properties(
+    database, records, dry_run: bool = False, batch_size: int = settings.BULK_WRITE_BATCH_SIZE
+) -> dict:
+    """
+    Synchronizes the records in batches.
+
+    Args:
+        database: Database instance used by the repositories.
+        records: Iterable of property dictionaries.
+        dry_run (bool): Only compute the summary, without writing.
+        batch_size (int): Number of properties per round trip.
+
+    Returns:
+        dict: Number of inserted, updated, unchanged, duplicated and invalid records.
+    """
+    repository = PropertyRepository(database)
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0, "invalid": 0}
+    batch = []
+
+    async def flush():
+        if batch:
+            summary = await repository.sync(batch, batch_size, dry_run)
+            for key, value in summary.dict().items():
+                stats[key] += value
+        batch.clear()
+
+    for number, record in enumerate(records, start=1):
+        try:
+            batch.append(PropertyCreate(**record))
+        except (TypeError, ValidationError) as e:
+            logger.warning("Record %s skipped: %s", number, e)
+            stats["invalid"] += 1
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="NDJSON (or JSON array) file exported by the CRM")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as file:
+        stats = asyncio.run(sync_properties(get_database(), read_records(file), args.dry_run))
+    logger.info("Synchronization finished: %s", stats)
+
+
+if __name__ == "__main__":
+    from app.core.logger import setup_logging
+
+    setup_logging()
+    main()
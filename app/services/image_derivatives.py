@@ -0,0 +1,104 @@
+"""
+Generation of resized versions (derivatives) of property images.
+
+The CPU-bound resizing runs in a pool of worker processes, so it neither blocks the event loop nor competes
+for the GIL with the request handlers. The pool is created lazily in the process that first uses it and is
+shut down with the application.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.schemas.property_image import ImageDerivative
+
+# File extension used for each output format.
+FORMAT_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool used to generate derivatives, creating it on first use.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """
+    Shuts down the process pool, if it was created.
+    """
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def derivative_path(source_path: str, name: str, image_format: str) -> str:
+    """
+    Returns the path of the derivative `name` of the image stored at `source_path`.
+    """
+    base, _ = os.path.splitext(source_path)
+    return f"{base}_{name}.{FORMAT_EXTENSIONS.get(image_format.upper(), image_format.lower())}"
+
+
+def build_derivatives(source_path: str, specs: List[dict]) -> List[dict]:
+    """
+    Builds every derivative of an image. Runs inside a worker process.
+
+    The image is decoded once, at the lowest resolution that still covers the largest requested size
+    (JPEG draft mode), and each derivative is resized from that copy keeping its aspect ratio.
+
+    Args:
+        source_path (str): Path of the original image.
+        specs (List[dict]): Derivative specs with name, width, height and format.
+
+    Returns:
+        List[dict]: Name, file, width, height and format of each generated derivative.
+    """
+    results = []
+    with Image.open(source_path) as original:
+        max_width = max(spec["width"] for spec in specs)
+        max_height = max(spec["height"] for spec in specs)
+        original.draft("RGB", (max_width, max_height))
+        image = ImageOps.exif_transpose(original)
+        for spec in specs:
+            image_format = spec["format"].upper()
+            derivative = image.copy()
+            derivative.thumbnail((spec["width"], spec["height"]), reducing_gap=2.0)
+            if image_format == "JPEG" and derivative.mode != "RGB":
+                derivative = derivative.convert("RGB")
+            file_path = derivative_path(source_path, spec["name"], image_format)
+            derivative.save(file_path, image_format, quality=spec.get("quality", 82), optimize=True)
+            results.append({
+                "name": spec["name"],
+                "file": file_path,
+                "width": derivative.width,
+                "height": derivative.height,
+                "format": image_format,
+            })
+    return results
+
+
+async def generate_derivatives(source_path: str, specs: Optional[List[dict]] = None) -> List[ImageDerivative]:
+    """
+    Generates the derivatives of an image in the process pool without blocking the event loop.
+
+    Args:
+        source_path (str): Path of the original image.
+        specs (List[dict]): Derivative specs, `settings.IMAGE_DERIVATIVES` by default.
+
+    Returns:
+        List[ImageDerivative]: The generated derivatives.
+    """
+    specs = settings.IMAGE_DERIVATIVES if specs is None else specs
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(get_process_pool(), build_derivatives, source_path, specs)
+    return [ImageDerivative(**result) for result in results]
@@ -0,0 +1,390 @@
+"""
+Storage of the property image files, behind one interface with two backends:
+
+- `LocalImageStorage` keeps the files in the content-addressed layout of `IMAGES_DIRECTORY` (the default).
+- `S3ImageStorage` keeps the same layout as object keys of an S3-compatible bucket (AWS S3, MinIO), so any number of
+  nodes can share it. It needs the optional `boto3` package. Besides the uploads received by the API, it hands out
+  presigned PUT URLs so that clients send the bytes straight to the bucket and the API only registers the finished
+  object, and the images are served by redirecting to presigned GET URLs.
+
+The backend is chosen with `IMAGE_STORAGE` ('local' or 's3'). Images are addressed by key: the file path for the
+local store, the object key for S3; it is the `file` stored on the image records.
+
+Files are never removed when an image is deleted, since another upload of the same content may be registering it at
+that moment. Every upload refreshes the modification time of the file it stores (or finds) before its record is
+inserted, and the contents no image references are removed later by `app.scripts.sweep_images` once they have not
+been modified for a grace period.
+"""
+import base64
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import re
+import tempfile
+from contextlib import asynccontextmanager, suppress
+from mimetypes import guess_type
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.validation import validate_image_chunk, validate_image_size
+from app.schemas.property_image import ImageDerivative, PropertyImageUploadTicket
+from app.services.image_derivatives import derivative_path
+from app.utils.file_utils import TMP_DIRECTORY, StoredFile, content_path, remove_file, save_image
+
+# Bytes read from the start of an object uploaded directly to check its format.
+SIGNATURE_SIZE = 16
+
+# Name of a stored file: the content hash, optionally followed by the name of a derivative, and an image extension.
+STORED_FILE_PATTERN = re.compile(r"^([0-9a-f]{64})(_[a-z0-9]+)?\.(jpg|jpeg|png|gif|webp)$")
+
+# Key of an object uploaded directly to the store, before it is verified and copied to its content key.
+STAGED_UPLOAD_PATTERN = re.compile(rf"^{TMP_DIRECTORY}/[0-9a-f]{{32}}\.(jpg|jpeg|png|gif|webp)$")
+
+
+class ImageStorage(ABC):
+    """
+    Interface of an image store. Direct uploads, derivatives next to the original and download URLs are optional.
+
+    Attributes:
+        supports_direct_uploads (bool): Whether clients can upload to the store without going through the API.
+    """
+    supports_direct_uploads = False
+
+    @abstractmethod
+    async def save(self, image) -> StoredFile:
+        """
+        Validates an uploaded image and stores it under its content key.
+
+        Raises:
+            HTTPException: 400/413 if the content is not a valid image or is too large, 500 if it can not be stored.
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """
+        Removes a file, if it exists.
+        """
+
+    @abstractmethod
+    def local_copy(self, key: str):
+        """
+        Returns an async context manager giving the path of a local copy of a file, valid inside the context.
+        """
+
+    async def store_derivatives(self, key: str, derivatives: List[ImageDerivative]) -> List[ImageDerivative]:
+        """
+        Stores the derivatives generated from the `local_copy` of `key` next to it. Called inside that context.
+        """
+        return derivatives
+
+    def download_url(self, key: str) -> Optional[str]:
+        """
+        Returns a URL the clients can download a file from, or None when the API serves the file itself.
+        """
+        return None
+
+    @abstractmethod
+    def list_files(self) -> Iterator[Tuple[str, float]]:
+        """
+        Yields the key and modification time (seconds since the epoch) of every stored file, in key order, so the
+        original and the derivatives of a content come together. Blocking; run it in a thread.
+        """
+
+    @abstractmethod
+    def modified_at(self, key: str) -> Optional[float]:
+        """
+        Returns the modification time of a file, or None if it does not exist. Blocking; run it in a thread.
+        """
+
+    async def create_upload(self, content_hash: str, extension: str) -> PropertyImageUploadTicket:
+        """
+        Returns where and how a client uploads the content `content_hash` directly to the store.
+        """
+        raise HTTPException(status_code=400, detail="The image storage does not support direct uploads.")
+
+    async def verify_upload(self, key: str, content_hash: str, extension: str) -> StoredFile:
+        """
+        Checks a content uploaded directly to the store under `key`, which must be a valid image matching its hash,
+        and stores it under its content key.
+        """
+        raise HTTPException(status_code=400, detail="The image storage does not support direct uploads.")
+
+
+class LocalImageStorage(ImageStorage):
+    """
+    Image store in a local directory, `IMAGES_DIRECTORY` by default.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+
+    @property
+    def directory(self) -> str:
+        return self._directory or settings.IMAGES_DIRECTORY
+
+    async def save(self, image) -> StoredFile:
+        return await save_image(image, self.directory)
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(remove_file, key)
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        yield key
+
+    def list_files(self) -> Iterator[Tuple[str, float]]:
+        tmp_directory = os.path.join(self.directory, TMP_DIRECTORY)
+        for root, directories, files in os.walk(self.directory):
+            directories[:] = sorted(d for d in directories if os.path.join(root, d) != tmp_directory)
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                with suppress(FileNotFoundError):
+                    yield path, os.stat(path).st_mtime
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return os.stat(key).st_mtime
+        except FileNotFoundError:
+            return None
+
+
+class S3ImageStorage(ImageStorage):
+    """
+    Image store in an S3-compatible bucket.
+
+    Objects use the keys of the local layout (`ab/cd/<sha256>.<ext>`), so the same content is stored once. Uploads
+    received by the API are validated and hashed while they are spooled to a temporary file, then sent to the
+    bucket unless the content is already there, in which case the object is only touched (copied onto itself) to
+    refresh its modification time.
+
+    Direct uploads go to a staging key of their own (`tmp/<uuid>.<ext>`): the client declares the SHA-256 of the
+    file, gets a presigned PUT URL for that key and sends the checksum header with it, so the bucket rejects bytes
+    that do not match. When the upload is registered, the staged object is checked (existence, size, checksum and
+    format) and copied to its content key, which clients never write to, so a bad upload can not replace or remove
+    content other images reference. The staged object is removed afterwards, valid or not.
+
+    Args:
+        bucket (str): Name of the bucket.
+        client: boto3 S3 client used for the requests to the bucket.
+        presign_client: boto3 S3 client used to sign the URLs given to clients, when they reach the storage through
+            another endpoint than the API (`S3_PUBLIC_ENDPOINT_URL`); `client` by default.
+        expires (int): Seconds the presigned URLs are valid.
+    """
+    supports_direct_uploads = True
+
+    def __init__(self, bucket: str, client=None, presign_client=None, expires: Optional[int] = None):
+        self.bucket = bucket
+        self.client = create_s3_client(settings.S3_ENDPOINT_URL) if client is None else client
+        if presign_client is None and client is None and settings.S3_PUBLIC_ENDPOINT_URL:
+            presign_client = create_s3_client(settings.S3_PUBLIC_ENDPOINT_URL)
+        self.presign_client = presign_client or self.client
+        self.expires = settings.S3_PRESIGN_EXPIRES if expires is None else expires
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key, ChecksumMode="ENABLED")
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def _upload(self, path: str, key: str) -> None:
+        self.client.upload_file(path, self.bucket, key, ExtraArgs={"ContentType": media_type(key)})
+
+    def _copy(self, source: str, key: str) -> None:
+        # S3 only copies an object onto itself when something changes, hence the replaced metadata
+        self.client.copy_object(
+            Bucket=self.bucket, Key=key, CopySource={"Bucket": self.bucket, "Key": source},
+            MetadataDirective="REPLACE", ContentType=media_type(key),
+        )
+
+    def _touch(self, key: str) -> None:
+        self._copy(key, key)
+
+    async def save(self, image) -> StoredFile:
+        with tempfile.TemporaryDirectory() as directory:
+            spooled = await save_image(image, directory)
+            key = os.path.relpath(spooled.path, directory).replace(os.sep, "/")
+            try:
+                if await run_in_threadpool(self._head, key) is None:
+                    await run_in_threadpool(self._upload, spooled.path, key)
+                else:
+                    await run_in_threadpool(self._touch, key)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error saving image: {e}")
+        return StoredFile(key, spooled.content_hash, spooled.size)
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, os.path.basename(key))
+            await run_in_threadpool(self.client.download_file, self.bucket, key, path)
+            yield path
+
+    async def store_derivatives(self, key: str, derivatives: List[ImageDerivative]) -> List[ImageDerivative]:
+        stored = []
+        for derivative in derivatives:
+            derivative_key = derivative_path(key, derivative.name, derivative.format)
+            await run_in_threadpool(self._upload, derivative.file, derivative_key)
+            stored.append(derivative.copy(update={"file": derivative_key}))
+        return stored
+
+    def download_url(self, key: str) -> Optional[str]:
+        return self.presign_client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.expires
+        )
+
+    async def create_upload(self, content_hash: str, extension: str) -> PropertyImageUploadTicket:
+        key = staged_upload_key(extension)
+        checksum = sha256_checksum(content_hash)
+        headers = {"Content-Type": media_type(key), "x-amz-checksum-sha256": checksum}
+        params = {
+            "Bucket": self.bucket, "Key": key, "ContentType": headers["Content-Type"], "ChecksumSHA256": checksum
+        }
+        url = self.presign_client.generate_presigned_url("put_object", Params=params, ExpiresIn=self.expires)
+        return PropertyImageUploadTicket(key=key, url=url, headers=headers, expires_in=self.expires)
+
+    async def verify_upload(self, key: str, content_hash: str, extension: str) -> StoredFile:
+        if not is_staged_upload(key):
+            raise HTTPException(status_code=400, detail="The key is not the key of a direct upload.")
+        head = await run_in_threadpool(self._head, key)
+        if head is None:
+            raise HTTPException(status_code=400, detail="The image has not been uploaded to the storage.")
+        size = head["ContentLength"]
+        try:
+            if size == 0:
+                raise HTTPException(status_code=400, detail="The image is empty.")
+            validate_image_size(size)
+            # The checksum is stored by the bucket when the upload sent it; otherwise the object is hashed here
+            checksum = head.get("ChecksumSHA256")
+            if checksum is None:
+                matches = await run_in_threadpool(self._hash_object, key) == content_hash
+            else:
+                matches = checksum == sha256_checksum(content_hash)
+            if not matches:
+                raise HTTPException(status_code=400, detail="The uploaded content does not match its hash.")
+            signature = await run_in_threadpool(self._read_range, key, SIGNATURE_SIZE)
+            validate_image_chunk(signature, extension, 0)
+        except HTTPException:
+            # The staged object belongs to this upload alone, so an invalid one is removed
+            await self.delete(key)
+            raise
+        stored_key = content_key(content_hash, extension)
+        if await run_in_threadpool(self._head, stored_key) is None:
+            await run_in_threadpool(self._copy, key, stored_key)
+        else:
+            # Content stored long ago must not be swept while its new record is inserted
+            await run_in_threadpool(self._touch, stored_key)
+        await self.delete(key)
+        return StoredFile(stored_key, content_hash, size)
+
+    def list_files(self) -> Iterator[Tuple[str, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for item in page.get("Contents", []):
+                yield item["Key"], item["LastModified"].timestamp()
+
+    def modified_at(self, key: str) -> Optional[float]:
+        head = self._head(key)
+        return head["LastModified"].timestamp() if head else None
+
+    def _hash_object(self, key: str) -> str:
+        digest = hashlib.sha256()
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        for chunk in body.iter_chunks(settings.UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def _read_range(self, key: str, size: int) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes=0-{size - 1}")["Body"].read()
+
+
+def stored_content_hash(key: str) -> Optional[str]:
+    """
+    Returns the content hash of a stored original or derivative, or None if the key is not a stored image.
+    """
+    match = STORED_FILE_PATTERN.match(os.path.basename(key))
+    return match.group(1) if match else None
+
+
+def is_staged_upload(key: str) -> bool:
+    """
+    Returns whether a key is the staging key of a direct upload.
+    """
+    return STAGED_UPLOAD_PATTERN.match(key) is not None
+
+
+def staged_upload_key(extension: str) -> str:
+    """
+    Returns a new staging key for a direct upload of a file with the given extension.
+    """
+    return f"{TMP_DIRECTORY}/{uuid4().hex}.{extension}"
+
+
+def content_key(content_hash: str, extension: str) -> str:
+    """
+    Returns the object key of a content, the path of the local layout relative to the store.
+    """
+    return content_path("", content_hash, extension).replace(os.sep, "/")
+
+
+def sha256_checksum(content_hash: str) -> str:
+    """
+    Returns a SHA-256 hex digest in the base64 form of the `x-amz-checksum-sha256` header.
+    """
+    return base64.b64encode(bytes.fromhex(content_hash)).decode()
+
+
+def media_type(key: str) -> str:
+    return guess_type(key)[0] or "application/octet-stream"
+
+
+def create_s3_client(endpoint_url: Optional[str] = None):
+    """
+    Creates a boto3 S3 client from the settings. Custom endpoints (MinIO) are addressed by path.
+    """
+    import boto3  # Optional dependency, only needed by the S3 storage
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        region_name=settings.S3_REGION,
+        aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        config=Config(signature_version="s3v4", s3={"addressing_style": "path" if endpoint_url else "auto"}),
+    )
+
+
+def build_image_storage() -> ImageStorage:
+    """
+    Builds the image store selected by `IMAGE_STORAGE`.
+    """
+    if settings.IMAGE_STORAGE == "s3":
+        return S3ImageStorage(settings.S3_BUCKET)
+    if settings.IMAGE_STORAGE != "local":
+        raise ValueError(f"Unknown image storage '{settings.IMAGE_STORAGE}'")
+    return LocalImageStorage()
+
+
+_storage: Optional[ImageStorage] = None
+_storage_pid: Optional[int] = None
+
+
+def get_image_storage() -> ImageStorage:
+    """
+    Returns the image store of the current process, creating it on first use (boto3 clients are not shared across
+    `fork()`, like the MongoDB client).
+    """
+    global _storage, _storage_pid
+    if _storage is None or _storage_pid != os.getpid():
+        _storage = build_image_storage()
+        _storage_pid = os.getpid()
+    return _storage
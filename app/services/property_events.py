@@ -0,0 +1,221 @@
+"""
+Feed of property creations and price changes, streamed to the clients as server-sent events.
+
+Events come from one of two sources, chosen by `PROPERTY_EVENTS_SOURCE`:
+
+- `change_stream`: a MongoDB change stream per connected client. It sees every write, whichever worker or script
+  made it, and its resume tokens are the event IDs, so a client that reconnects with `Last-Event-ID` catches up
+  with everything it missed while the oplog still holds it. Requires a replica set.
+- `memory`: the in-process `PropertyEventBroker`, fed by `PropertyService` after each creation and price change.
+  It keeps the last `PROPERTY_EVENTS_BUFFER_SIZE` events to replay on reconnection, but only sees the writes of
+  its own worker process, not those of other workers or of the scripts, nor the adjustments by filter.
+
+With `auto` (the default), change streams are used when the server supports them and the broker otherwise.
+A client whose position can not be resumed gets a 'reset' event and has to refetch the properties it holds.
+"""
+import asyncio
+import os
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import AsyncIterator, Deque, List, Optional, Set, Tuple
+
+import orjson
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+from app.core.responses import json_default
+from app.repositories.property import PropertyRepository
+from app.schemas.property import PropertyEvent, PropertyInDB
+
+# Error code returned by a standalone server when a change stream is opened.
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+class PropertyEventBroker:
+    """
+    In-process publish/subscribe of property events with a bounded replay buffer.
+
+    Event IDs are '<process token>-<sequence>', so an ID issued by another process (another worker, or this one
+    before a restart) is never mistaken for a position of this buffer. A subscriber that falls `queue_size` events
+    behind is disconnected; it catches up from the buffer when it reconnects.
+
+    Args:
+        buffer_size (int): Number of recent events kept to replay on reconnection.
+        queue_size (int): Maximum number of events waiting to be sent to one subscriber.
+    """
+
+    def __init__(self, buffer_size: int, queue_size: int):
+        self.token = uuid.uuid4().hex[:12]
+        self.sequence = 0
+        self.queue_size = queue_size
+        self._buffer: Deque[Tuple[int, PropertyEvent]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[asyncio.Queue] = set()
+        # None until the first subscription tells whether the server supports change streams
+        self.change_streams: Optional[bool] = {"change_stream": True, "memory": False}.get(
+            settings.PROPERTY_EVENTS_SOURCE
+        )
+
+    @property
+    def last_event_id(self) -> str:
+        return f"{self.token}-{self.sequence}"
+
+    def publish(
+        self, event_type: str, property_id: str, price: float, property: Optional[PropertyInDB] = None
+    ) -> None:
+        """
+        Publishes the creation ('property_created', with the `property`) or the price change ('price_changed') of
+        a property.
+        """
+        if self.change_streams:
+            return  # The change stream already sees the write
+        self.sequence += 1
+        event = PropertyEvent(
+            id=self.last_event_id, type=event_type, property_id=str(property_id), price=price, property=property,
+            time=datetime.now(timezone.utc)
+        )
+        self._buffer.append((self.sequence, event))
+        for queue in list(self._subscribers):
+            if queue.qsize() >= self.queue_size:
+                self._subscribers.discard(queue)
+                queue.put_nowait(None)
+            else:
+                queue.put_nowait(event)
+
+    def events_after(self, last_event_id: str) -> Optional[List[PropertyEvent]]:
+        """
+        Returns the buffered events after `last_event_id`, or None when that position is no longer (or was never)
+        in the buffer.
+        """
+        token, _, sequence = last_event_id.rpartition("-")
+        if token != self.token or not sequence.isdigit() or int(sequence) > self.sequence:
+            return None
+        sequence = int(sequence)
+        if sequence < self.sequence - len(self._buffer):
+            return None
+        return [event for event_sequence, event in self._buffer if event_sequence > sequence]
+
+    def reset_event(self, last_event_id: str) -> PropertyEvent:
+        return PropertyEvent(id=last_event_id, type="reset", time=datetime.now(timezone.utc))
+
+    async def subscribe(self, last_event_id: Optional[str], heartbeat: float) -> AsyncIterator[Optional[PropertyEvent]]:
+        """
+        Yields the events published from now on, preceded by the ones after `last_event_id`, and None every
+        `heartbeat` seconds without events. Ends when the subscriber falls too far behind.
+        """
+        queue = asyncio.Queue()
+        # Registered and replayed without awaiting in between, so no event is missed or sent twice
+        self._subscribers.add(queue)
+        try:
+            missed = [] if last_event_id is None else self.events_after(last_event_id)
+            if missed is None:
+                yield self.reset_event(self.last_event_id)
+            for event in missed or []:
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+
+def event_from_change(change: dict) -> PropertyEvent:
+    """
+    Builds the event of a change stream document (an insert or an update of the price).
+    """
+    event_id = change["_id"]["_data"]
+    time = change["clusterTime"].as_datetime() if "clusterTime" in change else datetime.now(timezone.utc)
+    if change["operationType"] == "insert":
+        property = PropertyInDB.from_document(change["fullDocument"])
+        return PropertyEvent(
+            id=event_id, type="property_created", property_id=str(property.id), price=property.price,
+            property=property, time=time
+        )
+    return PropertyEvent(
+        id=event_id, type="price_changed", property_id=str(change["documentKey"]["_id"]),
+        price=change["updateDescription"]["updatedFields"]["price"], time=time
+    )
+
+
+async def watch_events(
+    repository: PropertyRepository, last_event_id: Optional[str], heartbeat: float
+) -> AsyncIterator[Optional[PropertyEvent]]:
+    """
+    Yields the events of a change stream resumed after `last_event_id`, and None every `heartbeat` seconds without
+    changes. A position the oplog no longer holds (or an invalid one) is answered with a 'reset' event and the
+    stream starts from now.
+
+    Raises:
+        OperationFailure: With code `CHANGE_STREAMS_UNSUPPORTED` if the server is not a replica set.
+    """
+    max_await_time_ms = int(heartbeat * 1000)
+    stream = repository.watch(last_event_id, max_await_time_ms)
+    try:
+        try:
+            change = await stream.try_next()
+        except OperationFailure as e:
+            if not last_event_id or e.code == CHANGE_STREAMS_UNSUPPORTED:
+                raise
+            await stream.close()
+            stream = repository.watch(None, max_await_time_ms)
+            change = await stream.try_next()
+            yield PropertyEvent(id=stream.resume_token["_data"], type="reset", time=datetime.now(timezone.utc))
+        while True:
+            yield None if change is None else event_from_change(change)
+            change = await stream.try_next()
+    finally:
+        await stream.close()
+
+
+async def stream_events(
+    repository: PropertyRepository, last_event_id: Optional[str] = None, heartbeat: Optional[float] = None,
+    broker: Optional["PropertyEventBroker"] = None
+) -> AsyncIterator[Optional[PropertyEvent]]:
+    """
+    Yields the property events after `last_event_id` from the configured source, and None as heartbeat.
+    """
+    broker = broker or get_event_broker()
+    heartbeat = heartbeat or settings.PROPERTY_EVENTS_HEARTBEAT
+    if broker.change_streams is not False:
+        try:
+            async for event in watch_events(repository, last_event_id, heartbeat):
+                broker.change_streams = True
+                yield event
+            return
+        except OperationFailure as e:
+            if e.code != CHANGE_STREAMS_UNSUPPORTED or broker.change_streams:
+                raise
+            broker.change_streams = False
+    async for event in broker.subscribe(last_event_id, heartbeat):
+        yield event
+
+
+def format_event(event: Optional[PropertyEvent]) -> bytes:
+    """
+    Encodes an event in the server-sent events format, or a comment line as heartbeat when there is no event.
+    """
+    if event is None:
+        return b": keep-alive\n\n"
+    data = orjson.dumps(event.dict(by_alias=True, exclude_none=True), default=json_default)
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event.id.encode(), event.type.encode(), data)
+
+
+_broker: Optional[PropertyEventBroker] = None
+_broker_pid: Optional[int] = None
+
+
+def get_event_broker() -> PropertyEventBroker:
+    """
+    Returns the event broker of the current process, creating it on first use (and again in a forked worker).
+    """
+    global _broker, _broker_pid
+    if _broker is None or _broker_pid != os.getpid():
+        _broker = PropertyEventBroker(settings.PROPERTY_EVENTS_BUFFER_SIZE, settings.PROPERTY_EVENTS_QUEUE_SIZE)
+        _broker_pid = os.getpid()
+    return _broker
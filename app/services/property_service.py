@@ -1,12 +1,28 @@
-import os
-from uuid import uuid4
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException
 
 from app.core.config import settings
 from app.repositories.property import PropertyRepository
-from app.core.validation import validate_image_upload
+from app.core.validation import get_image_extension, validate_image_batch, validate_image_size, validate_image_upload
+from app.models.geo_point import GeoPoint
 from app.repositories.property_image import PropertyImageRepository
-from app.schemas import PropertyCreate, PropertyUpdate, PropertyInDB, PropertyImageInDB
-from app.utils.file_utils import save_image
+from app.schemas import (
+    PropertyCreate, PropertyUpdate, PropertyInDB, PropertyImageCreate, PropertyImageInDB, PropertyImageBatchResult,
+    PropertyImageUploadResult, PropertyImageUploadRequest, PropertyImageUploadTicket, PropertyImageRegister,
+    PropertyFilter, PropertyNearby, PropertyPage, PropertySearchPage, BulkPriceUpdate, BulkPriceUpdateResult,
+    PropertySync, PropertySyncResult
+)
+from app.services.image_derivatives import generate_derivatives
+from app.services.image_storage import ImageStorage, get_image_storage
+from app.services.property_events import PropertyEventBroker, get_event_broker
+from app.utils.export import stream_export
+from app.utils.file_utils import StoredFile
+from app.utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
 
 
 class PropertyService:
@@ -20,48 +36,298 @@ class PropertyService:
     Attributes:
     property_repo (PropertyRepository): repository for property related operations.
     property_image_repo (PropertyImageRepository): Repository for operations related to property images.
+    events (PropertyEventBroker): In-process event feed notified of creations and price changes.
+    storage (ImageStorage): Store of the image files (local directory or S3-compatible bucket).
 
     Methods:
     create_property(property_data: PropertyCreate) -> PropertyInDB:
         Creates a new real estate property based on the provided data.
 
-    update_property_price(property_id: str, new_price: float) -> PropertyInDB:
-        Updates the price of an existing property.
+    update_property_price(property_id: str, new_price: float, expected_version: int) -> PropertyInDB:
+        Updates the price of an existing property, optionally only if it is still at the expected version.
+
+    bulk_update_prices(price_update: BulkPriceUpdate) -> BulkPriceUpdateResult:
+        Updates the price of many properties, given as a list or as a filter plus an adjustment.
+
+    sync_properties(sync: PropertySync, dry_run: bool) -> PropertySyncResult:
+        Upserts properties from the CRM by internal code, writing only the new and changed ones.
 
     upload_image_to_property(property_id: str, image_file) -> PropertyImageInDB:
         Uploads and associates an image to an existing property.
 
+    upload_images_to_property(property_id: str, image_files: list) -> PropertyImageBatchResult:
+        Uploads many images to an existing property at once, reporting the outcome of each file.
+
+    create_image_upload(property_id: str, upload: PropertyImageUploadRequest) -> PropertyImageUploadTicket:
+        Gives a presigned URL to upload an image of an existing property directly to the storage.
+
+    register_image_upload(property_id: str, upload: PropertyImageRegister) -> PropertyImageInDB:
+        Associates an image uploaded directly to the storage to an existing property.
+
+    add_stored_image(property_id: str, stored: StoredFile) -> PropertyImageInDB:
+        Registers a stored file as an image of a property, reusing the derivatives of an identical image.
+
+    generate_image_derivatives(image: PropertyImageInDB) -> None:
+        Builds the resized versions of an uploaded image and stores them on its record.
+
+    list_property_images(property_id: str) -> List[PropertyImageInDB]:
+        Lists the images of an existing property.
+
+    get_property_image_file(property_id: str, image_id: str, variant: str) -> Tuple[str, str]:
+        Gets the path and ETag of the file of an image or of one of its derivatives.
+
+    delete_property_image(property_id: str, image_id: str) -> PropertyImageInDB:
+        Deletes an image of a property; its files are removed later by the sweep if no other image references them.
+
     get_property_or_404(property_id: str) -> PropertyInDB:
         Gets a property by its ID or throws an exception if it is not found.
+
+    get_property(property_id: str, expand: List[str]) -> PropertyDetail:
+        Gets a property, with its owner, images and/or sale history when requested.
+
+    list_properties(filters: PropertyFilter, sort: str, limit: int, cursor: str, expand: List[str]) -> PropertyPage:
+        Lists a page of properties matching the filters.
+
+    search_properties(text: str, filters: PropertyFilter, limit: int, cursor: str) -> PropertySearchPage:
+        Searches a page of properties by name and address, most relevant first.
+
+    list_nearby_properties(filters: PropertyFilter, longitude: float, latitude: float, radius: float, bbox: tuple,
+                           limit: int) -> List[PropertyNearby]:
+        Lists the properties around a point and/or inside a bounding box, nearest first.
+
+    export_properties(export_format: str, include_traces: bool, compress: bool) -> AsyncIterator[bytes]:
+        Streams the whole catalog as NDJSON, CSV or BSON.
     """
-    def __init__(self, property_repo: PropertyRepository, property_image_repo: PropertyImageRepository):
+    def __init__(
+        self, property_repo: PropertyRepository, property_image_repo: PropertyImageRepository,
+        events: Optional[PropertyEventBroker] = None, storage: Optional[ImageStorage] = None
+    ):
         self.property_repo = property_repo
         self.property_image_repo = property_image_repo
+        self.events = events if events is not None else get_event_broker()
+        self.storage = storage if storage is not None else get_image_storage()
 
-    def create_property(self, property_data: PropertyCreate) -> PropertyInDB:
-        return self.property_repo.create(property_data)
+    async def create_property(self, property_data: PropertyCreate) -> PropertyInDB:
+        property_created = await self.property_repo.create(property_data)
+        self.events.publish("property_created", property_created.id, property_created.price, property_created)
+        return property_created
 
-    def update_property_price(self, property_id: str, new_price: float) -> PropertyInDB:
+    async def update_property_price(
+        self, property_id: str, new_price: float, expected_version: Optional[int] = None
+    ) -> PropertyInDB:
         # Validations
-        property_in_db = self.get_property_or_404(property_id)
+        property_in_db = await self.get_property_or_404(property_id)
         property_data = PropertyUpdate(price=new_price)
-        return self.property_repo.update(property_id, property_data)
+        property_updated = await self.property_repo.update(property_id, property_data, expected_version)
+        if property_in_db.price != property_updated.price:
+            self.events.publish("price_changed", property_updated.id, property_updated.price)
+        return property_updated
+
+    async def bulk_update_prices(self, price_update: BulkPriceUpdate) -> BulkPriceUpdateResult:
+        if price_update.items is not None:
+            result = await self.property_repo.bulk_update_prices(price_update.items, settings.BULK_WRITE_BATCH_SIZE)
+            prices = {change.property_id: change.price for change in price_update.items}
+            for item in result.items:
+                if item.status == "updated":
+                    self.events.publish("price_changed", item.property_id, prices[item.property_id])
+            return result
+        # Adjustments by filter do not know the properties they touch; only change streams see them
+        return await self.property_repo.adjust_prices(price_update.filter, price_update.adjustment)
 
-    def upload_image_to_property(self, property_id: str, image_file) -> PropertyImageInDB:
+    async def sync_properties(self, sync: PropertySync, dry_run: bool = False) -> PropertySyncResult:
+        return await self.property_repo.sync(sync.items, settings.BULK_WRITE_BATCH_SIZE, dry_run)
+
+    async def upload_image_to_property(self, property_id: str, image_file) -> PropertyImageInDB:
         # Validations
         validate_image_upload(image_file)
-        property_in_db = self.get_property_or_404(property_id)
-        # Generate a unique file name to avoid conflicts and overwrites
-        file_name = f"{uuid4()}-{image_file.filename.replace(' ', '_')}"
-        file_path = os.path.join(settings.IMAGES_DIRECTORY, file_name)
+        await self.get_property_or_404(property_id)
+        # Files are named by their content hash, so the same bytes uploaded to several properties are stored once
+        stored = await self.storage.save(image_file)
+        return await self.add_stored_image(property_id, stored)
+
+    async def upload_images_to_property(self, property_id: str, image_files: list) -> PropertyImageBatchResult:
+        # Validations: the property is looked up once for the whole batch
+        validate_image_batch(image_files)
+        await self.get_property_or_404(property_id)
 
-        save_image(image_file, file_path)
+        # Files are copied to the store concurrently; an invalid file is reported without failing the others
+        semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
 
-        return self.property_image_repo.add_property_image(property_id, file_path, True)
+        async def store(image_file):
+            async with semaphore:
+                try:
+                    validate_image_upload(image_file)
+                    return await self.storage.save(image_file)
+                except HTTPException as e:
+                    return e
 
-    def get_property_or_404(self, property_id: str) -> PropertyInDB:
-        property_in_db = self.property_repo.get(property_id)
+        stored_files = await asyncio.gather(*(store(image_file) for image_file in image_files))
+
+        # One query finds the contents already stored, one insert registers every image
+        stored_ok = [stored for stored in stored_files if not isinstance(stored, HTTPException)]
+        existing = await self.property_image_repo.find_by_content_hashes([stored.content_hash for stored in stored_ok])
+        new_images = []
+        for stored in stored_ok:
+            reused = existing.get(stored.content_hash)
+            if reused and reused.derivatives_status == "ready":
+                new_images.append(PropertyImageCreate(
+                    id_property=property_id, file=stored.path, enable=True, content_hash=stored.content_hash,
+                    derivatives=reused.derivatives, derivatives_status="ready"
+                ))
+            else:
+                new_images.append(PropertyImageCreate(
+                    id_property=property_id, file=stored.path, enable=True, content_hash=stored.content_hash
+                ))
+        images = iter(await self.property_image_repo.add_property_images(new_images))
+
+        items = [
+            PropertyImageUploadResult(filename=image_file.filename, status="rejected", error=stored.detail)
+            if isinstance(stored, HTTPException) else
+            PropertyImageUploadResult(filename=image_file.filename, status="uploaded", image=next(images))
+            for image_file, stored in zip(image_files, stored_files)
+        ]
+        return PropertyImageBatchResult(
+            uploaded=len(stored_ok), rejected=len(items) - len(stored_ok), items=items
+        )
+
+    async def create_image_upload(
+        self, property_id: str, upload: PropertyImageUploadRequest
+    ) -> PropertyImageUploadTicket:
+        # Validations
+        validate_image_upload(upload)
+        validate_image_size(upload.size)
+        await self.get_property_or_404(property_id)
+        # The bytes go from the client to the storage; the API only signs the request
+        return await self.storage.create_upload(upload.content_hash, get_image_extension(upload))
+
+    async def register_image_upload(self, property_id: str, upload: PropertyImageRegister) -> PropertyImageInDB:
+        # Validations
+        validate_image_upload(upload)
+        await self.get_property_or_404(property_id)
+        stored = await self.storage.verify_upload(upload.key, upload.content_hash, get_image_extension(upload))
+        return await self.add_stored_image(property_id, stored)
+
+    async def add_stored_image(self, property_id: str, stored: StoredFile) -> PropertyImageInDB:
+        # Derivatives are shared by content too: reuse the ones of an identical image when they are ready
+        existing = await self.property_image_repo.find_by_content_hash(stored.content_hash)
+        if existing and existing.derivatives_status == "ready":
+            return await self.property_image_repo.add_property_image(
+                property_id, stored.path, True, stored.content_hash, existing.derivatives, "ready"
+            )
+        return await self.property_image_repo.add_property_image(property_id, stored.path, True, stored.content_hash)
+
+    async def generate_image_derivatives(self, image: PropertyImageInDB) -> None:
+        # Runs after the upload response is sent; the resizing itself happens in the worker process pool
+        if image.derivatives_status == "ready":
+            return
+        try:
+            async with self.storage.local_copy(image.file) as source_path:
+                derivatives = await generate_derivatives(source_path)
+                derivatives = await self.storage.store_derivatives(image.file, derivatives)
+        except Exception:
+            logger.exception("Error generating derivatives for image %s", image.id)
+            await self.property_image_repo.set_derivatives(image.id, [], "failed")
+            return
+        await self.property_image_repo.set_derivatives(image.id, derivatives, "ready")
+
+    async def list_property_images(self, property_id: str) -> List[PropertyImageInDB]:
+        await self.get_property_or_404(property_id)
+        return await self.property_image_repo.list_by_property(property_id)
+
+    async def get_property_image_file(
+        self, property_id: str, image_id: str, variant: Optional[str] = None
+    ) -> Tuple[str, str]:
+        image = await self.property_image_repo.get(property_id, image_id)
+        if not image or not image.enable:
+            raise ValueError("Image not found")
+        file_path = image.file
+        if variant:
+            derivative = next((d for d in image.derivatives if d.name == variant), None)
+            if derivative is None:
+                raise ValueError(f"Image variant '{variant}' not found")
+            file_path = derivative.file
+        # Content-addressed files are immutable, so their hash is a strong validator
+        tag = image.content_hash or str(image.id)
+        etag = f'"{tag}-{variant}"' if variant else f'"{tag}"'
+        return file_path, etag
+
+    async def delete_property_image(self, property_id: str, image_id: str) -> PropertyImageInDB:
+        image = await self.property_image_repo.delete(property_id, image_id)
+        if not image:
+            raise ValueError("Image not found")
+        # The files are not removed here: an upload of the same content may be registering them right now.
+        # `app.scripts.sweep_images` removes the contents left without references after a grace period.
+        return image
+
+    async def get_property_or_404(self, property_id: str) -> PropertyInDB:
+        property_in_db = await self.property_repo.get(property_id)
         if not property_in_db:
             # Manejar la excepción como prefieras
             raise ValueError("Property not found")
-        return property_in_db
\ No newline at end of file
+        return property_in_db
+
+    async def get_property(self, property_id: str, expand: Optional[List[str]] = None) -> PropertyInDB:
+        if expand:
+            return await self.property_repo.get_expanded(property_id, expand)
+        return await self.get_property_or_404(property_id)
+
+    async def list_properties(
+        self, filters: PropertyFilter, sort: str = "id", limit: int = 50, cursor: Optional[str] = None,
+        expand: Optional[List[str]] = None
+    ) -> PropertyPage:
+        field, _ = self.property_repo.parse_sort(sort)
+        after = decode_cursor(cursor, sort, [] if field == "_id" else [field]) if cursor else None
+        # One extra element is requested to know whether there is a next page without a count query
+        properties = await self.property_repo.list(filters, sort, limit + 1, after, expand=expand)
+        next_cursor = None
+        if len(properties) > limit:
+            properties = properties[:limit]
+            last = properties[-1]
+            values = {"_id": str(last.id)}
+            if field != "_id":
+                values[field] = getattr(last, field)
+            next_cursor = encode_cursor(sort, values)
+        # The items were already built by the repository, so the page is not validated again
+        return PropertyPage.construct(items=properties, next_cursor=next_cursor)
+
+    async def search_properties(
+        self, text: str, filters: PropertyFilter, limit: int = 50, cursor: Optional[str] = None
+    ) -> PropertySearchPage:
+        # Validations
+        if not text.strip():
+            raise ValueError("The search text can not be empty")
+        after = decode_cursor(cursor, "relevance", ["score"]) if cursor else None
+        # One extra element is requested to know whether there is a next page without a count query
+        hits = await self.property_repo.search(text, filters, limit + 1, after)
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            next_cursor = encode_cursor("relevance", {"_id": str(hits[-1].id), "score": hits[-1].score})
+        return PropertySearchPage.construct(items=hits, next_cursor=next_cursor)
+
+    async def list_nearby_properties(
+        self, filters: PropertyFilter, longitude: Optional[float] = None, latitude: Optional[float] = None,
+        radius: Optional[float] = None, bbox: Optional[Tuple[float, float, float, float]] = None, limit: int = 50
+    ) -> List[PropertyNearby]:
+        # Validations
+        if (longitude is None) != (latitude is None):
+            raise ValueError("Provide both longitude and latitude")
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            if min_lng >= max_lng or min_lat >= max_lat:
+                raise ValueError("The bounding box must be min_lng,min_lat,max_lng,max_lat with min < max")
+        if longitude is None:
+            if not bbox:
+                raise ValueError("Provide a point (lng, lat) or a bounding box (bbox)")
+            # A viewport without a point is ordered by the distance to its center
+            longitude, latitude = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        point = GeoPoint.from_lon_lat(longitude, latitude)
+        return await self.property_repo.nearby(filters, point, radius, bbox, limit)
+
+    def export_properties(
+        self, export_format: str = "ndjson", include_traces: bool = False, compress: bool = False
+    ) -> AsyncIterator[bytes]:
+        # BSON exports pass the raw documents through; the other formats need the decoded values anyway
+        raw = export_format == "bson"
+        cursor = self.property_repo.export_cursor(include_traces, settings.EXPORT_BATCH_SIZE, raw=raw)
+        return stream_export(cursor, export_format, include_traces, compress)
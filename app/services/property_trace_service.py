@@ -0,0 +1,46 @@
+import logging
+from typing import List
+
+from app.repositories.property import PropertyRepository
+from app.repositories.property_trace import PropertyTraceRepository
+from app.schemas import PropertyTraceCreate, PropertyTraceInDB, SalesRollup
+
+logger = logging.getLogger(__name__)
+
+
+class PropertyTraceService:
+    """
+    Service to manage the sale history (traces) of real estate properties and its statistics.
+
+    Attributes:
+    property_trace_repo (PropertyTraceRepository): Repository for trace related operations.
+    property_repo (PropertyRepository): Repository for property related operations.
+
+    Methods:
+    create_trace(trace_data: PropertyTraceCreate) -> PropertyTraceInDB:
+        Registers a sale of an existing property.
+
+    refresh_sales_statistics(trace: PropertyTraceInDB) -> None:
+        Updates the statistics groups affected by a new sale.
+
+    get_sales_statistics(group_by: str) -> List[SalesRollup]:
+        Gets the sales statistics grouped by year, owner or price band.
+    """
+    def __init__(self, property_trace_repo: PropertyTraceRepository, property_repo: PropertyRepository):
+        self.property_trace_repo = property_trace_repo
+        self.property_repo = property_repo
+
+    async def create_trace(self, trace_data: PropertyTraceCreate) -> PropertyTraceInDB:
+        # Validations
+        await self.property_repo.get(trace_data.id_property)
+        return await self.property_trace_repo.create(trace_data)
+
+    async def refresh_sales_statistics(self, trace: PropertyTraceInDB) -> None:
+        # Runs after the response is sent; a failure leaves the statistics stale until the next refresh or rebuild
+        try:
+            await self.property_trace_repo.refresh_rollups(trace)
+        except Exception:
+            logger.exception("Error refreshing the sales statistics for trace %s", trace.id)
+
+    async def get_sales_statistics(self, group_by: str) -> List[SalesRollup]:
+        return await self.property_trace_repo.get_rollups(group_by)
@@ -0,0 +1,110 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Callable, List
+
+import orjson
+
+from app.core.responses import json_default
+from app.schemas.property import PropertyCreate
+
+# Media type and file extension of each export format.
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "bson": ("application/bson", "bson"),
+}
+
+# Encoded rows are accumulated up to this size before being compressed and sent, so the stream is made of a few
+# large chunks instead of one tiny write per document.
+FLUSH_SIZE = 64 * 1024
+
+
+def export_fields(include_traces: bool = False) -> List[str]:
+    """
+    Returns the columns of an export: the property ID, the property fields and, optionally, its sales.
+    """
+    return ["_id", *PropertyCreate.__fields__] + (["traces"] if include_traces else [])
+
+
+def export_filename(export_format: str, compress: bool = False) -> str:
+    """
+    Returns the file name of an export, e.g. `properties.ndjson.gz`.
+    """
+    name = f"properties.{EXPORT_FORMATS[export_format][1]}"
+    return f"{name}.gz" if compress else name
+
+
+def row_encoder(export_format: str, fields: List[str]) -> Callable:
+    """
+    Returns the function that encodes one document into the bytes of a row of the given format.
+
+    - `ndjson`: one JSON object per line, ObjectIds as strings and dates in ISO 8601.
+    - `csv`: one line per property; the location (GeoJSON) and the sales, when joined, are JSON in their columns.
+    - `bson`: the raw bytes of the document as received from the server (`RawBSONDocument`), never decoded.
+    """
+    if export_format == "bson":
+        return lambda document: document.raw
+
+    if export_format == "ndjson":
+        def encode_ndjson(document) -> bytes:
+            row = {field: document.get(field) for field in fields}
+            return orjson.dumps(row, default=json_default, option=orjson.OPT_APPEND_NEWLINE)
+        return encode_ndjson
+
+    # The csv writer needs a text buffer; a single one is reused for every row.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def encode_csv(document) -> bytes:
+        row = [document.get(field) for field in fields]
+        if "traces" in fields:
+            row[-1] = row[-1] or []
+        writer.writerow(
+            "" if value is None else orjson.dumps(value, default=json_default).decode()
+            if isinstance(value, (dict, list)) else str(value) for value in row
+        )
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line.encode()
+    return encode_csv
+
+
+async def stream_export(
+    cursor, export_format: str = "ndjson", include_traces: bool = False, compress: bool = False
+) -> AsyncIterator[bytes]:
+    """
+    Encodes the documents of a cursor on the fly, optionally gzip compressed.
+
+    Only one cursor batch plus one flush buffer are held at a time, so memory stays flat regardless of the size
+    of the catalog.
+
+    Args:
+        cursor: Async cursor over the property documents (see `PropertyRepository.export_cursor`).
+        export_format (str): 'ndjson', 'csv' or 'bson'.
+        include_traces (bool): Whether the documents carry their joined sales.
+        compress (bool): Whether to gzip the stream.
+
+    Yields:
+        bytes: Chunks of the export file.
+    """
+    fields = export_fields(include_traces)
+    encode = row_encoder(export_format, fields)
+    # wbits=31 writes the gzip container, so the output is a regular .gz file
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = bytearray()
+    if export_format == "csv":
+        buffer += ",".join(fields).encode() + b"\r\n"
+
+    async for document in cursor:
+        buffer += encode(document)
+        if len(buffer) >= FLUSH_SIZE:
+            chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            if chunk:
+                yield chunk
+
+    chunk = compressor.compress(bytes(buffer)) + compressor.flush() if compressor else bytes(buffer)
+    if chunk:
+        yield chunk
@@ -1,29 +1,137 @@
+import hashlib
+import os
+from contextlib import suppress
+from typing import NamedTuple
+from uuid import uuid4
+
 from fastapi import HTTPException
-from shutil import copyfileobj
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.validation import get_image_extension, validate_image_chunk
+
+# Extensions stored under a single canonical name, so identical bytes map to a single file.
+EXTENSION_ALIASES = {"jpeg": "jpg"}
 
+# Directory (inside the images directory) where uploads are written before they are hashed.
+TMP_DIRECTORY = "tmp"
 
-def save_image(image, file_path):
+
+class StoredFile(NamedTuple):
+    """
+    Result of storing an upload in the content-addressed image store.
     """
-    Save an uploaded image file to a specified path on the server.
+    path: str
+    content_hash: str
+    size: int
+
+
+def content_path(directory: str, content_hash: str, extension: str) -> str:
+    """
+    Returns the path of a file in the content-addressed store.
+
+    Files are sharded in two directory levels taken from the hash (`ab/cd/abcd...`), which keeps every directory
+    small (at most 256 entries per level) no matter how many images are stored.
 
-    This function takes an uploaded image object and a file path as input.
-    The image is written to the file in the specified path. If an input/output
-    error occurs during this process, an HTTPException with status code 500 is thrown, indicating an
-    status code 500, indicating a server error.
+    Args:
+        directory (str): Root directory of the store.
+        content_hash (str): SHA-256 hex digest of the content.
+        extension (str): File extension.
+
+    Returns:
+        str: Path of the file.
+    """
+    extension = EXTENSION_ALIASES.get(extension, extension)
+    return os.path.join(directory, content_hash[:2], content_hash[2:4], f"{content_hash}.{extension}")
+
+
+async def save_image(image, directory) -> StoredFile:
+    """
+    Stream an uploaded image file into the content-addressed store in `directory`.
+
+    The upload is copied in chunks of `settings.UPLOAD_CHUNK_SIZE` bytes, so memory usage stays bounded
+    whatever the size of the file. Each chunk is validated as it arrives (format from the magic bytes of the first
+    chunk, size limit on the running total), added to a SHA-256 digest and written in the thread pool, so the disk
+    I/O never blocks the event loop. The file is first written to a temporary name and then atomically moved to
+    its content path; when the same content is already stored it is simply replaced by identical bytes, so it only
+    takes disk space once. If a validation fails or an input/output error occurs, the temporary file is removed.
 
     Parameters:
     image (UploadFile): a FastAPI UploadFile object representing the uploaded image.
-    file_path (str): The path to the file where the image will be saved.
+    directory (str): Root directory of the image store.
 
     Raises:
-    HTTPException: An HTTP exception with status code 500 is thrown if an I/O error occurs.
+    HTTPException: 400/413 if the content is not a valid image or is too large, 500 if an I/O error occurs.
 
     Returns:
-    None: The function does not return any value. The image is saved in the specified path.
+    StoredFile: Path, content hash and size of the stored image.
 
     """
+    extension = get_image_extension(image)
+    tmp_path = os.path.join(directory, TMP_DIRECTORY, uuid4().hex)
+    digest = hashlib.sha256()
+    received = 0
+
+    def write(buffer, chunk):
+        buffer.write(chunk)
+        digest.update(chunk)
+
     try:
-        with open(file_path, "wb") as buffer:
-            copyfileobj(image.file, buffer)
+        buffer = await run_in_threadpool(open_for_write, tmp_path)
+        try:
+            while True:
+                chunk = await image.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                validate_image_chunk(chunk, extension, received)
+                received += len(chunk)
+                await run_in_threadpool(write, buffer, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
+        if received == 0:
+            raise HTTPException(status_code=400, detail="The image is empty.")
+        content_hash = digest.hexdigest()
+        file_path = content_path(directory, content_hash, extension)
+        await run_in_threadpool(move_file, tmp_path, file_path)
+    except HTTPException:
+        remove_file(tmp_path)
+        raise
     except IOError as e:
+        remove_file(tmp_path)
         raise HTTPException(status_code=500, detail=f"Error saving image: {e}")
+    return StoredFile(file_path, content_hash, received)
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a file, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(settings.UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def open_for_write(file_path: str):
+    """
+    Opens a file for binary writing, creating its parent directories.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return open(file_path, "wb")
+
+
+def move_file(source: str, destination: str):
+    """
+    Atomically moves a file, creating the parent directories of the destination.
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(source, destination)
+
+
+def remove_file(file_path):
+    """
+    Removes a file if it exists.
+    """
+    with suppress(FileNotFoundError):
+        os.remove(file_path)
@@ -0,0 +1,55 @@
+import base64
+import json
+from typing import Iterable
+
+from bson import ObjectId
+
+
+def encode_cursor(sort: str, values: dict) -> str:
+    """
+    Encodes the keyset position of the last element of a page into an opaque cursor.
+
+    The cursor carries the sort specification it was generated for, so it can not be replayed
+    against a listing sorted by a different key.
+
+    Args:
+        sort (str): Sort specification of the listing (e.g. 'price', '-year').
+        values (dict): Sort key values of the last element of the page, always including '_id'.
+
+    Returns:
+        str: URL-safe opaque cursor.
+    """
+    payload = json.dumps({"s": sort, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, fields: Iterable[str] = ()) -> dict:
+    """
+    Decodes a cursor generated by `encode_cursor`.
+
+    Args:
+        cursor (str): Opaque cursor received from the client.
+        sort (str): Sort specification of the current request.
+        fields (Iterable[str]): Sort key fields besides '_id' the cursor must carry, each with a scalar value.
+
+    Returns:
+        dict: Sort key values stored in the cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed, was generated for another sort specification or lacks a sort key.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["v"]
+        cursor_sort = payload["s"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+    if cursor_sort != sort or not isinstance(values, dict) or not ObjectId.is_valid(values.get("_id")):
+        raise ValueError("Pagination cursor does not match the requested sort")
+    for field in fields:
+        value = values.get(field)
+        # Booleans are ints in Python, but a cursor never stores one as a sort key
+        if not isinstance(value, (int, float, str)) or isinstance(value, bool):
+            raise ValueError("Invalid pagination cursor")
+    return values
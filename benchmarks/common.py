@@ -0,0 +1,172 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import contextlib
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+
+from bson import ObjectId
+
+
+def percentile(samples, pct):
+    """
+    Returns the `pct` percentile (0-100) of `samples` using the nearest-rank method.
+    """
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """
+    Summarizes a list of latencies (in seconds) as milliseconds.
+    """
+    return {
+        "samples": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def timed(func, *args, **kwargs):
+    """
+    Runs `func` and returns the elapsed wall time in seconds.
+    """
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+async def timed_async(func, *args, **kwargs):
+    """
+    Awaits `func` and returns the elapsed wall time in seconds.
+    """
+    start = time.perf_counter()
+    await func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def synthetic_properties(count, owners=1000, seed=17):
+    """
+    Generates `count` synthetic property documents.
+
+    The internal code is unique (it has a unique index) across calls: it is taken from the generated `_id`, so
+    documents of different calls never collide, whatever their seed.
+    """
+    rng = random.Random(seed)
+    for number in range(count):
+        document_id = ObjectId()
+        yield {
+            "_id": document_id,
+            "name": f"Property {number}",
+            "address": f"Carrera {rng.randint(1, 200)} #{rng.randint(1, 99)}-{rng.randint(1, 99)}",
+            "price": float(rng.randint(50, 5000) * 1000),
+            "code_internal": f"C{document_id}",
+            "year": rng.randint(1900, 2024),
+            "id_owner": f"OWNER{rng.randint(1, owners)}",
+        }
+
+
+async def seed_collection(collection, count, batch_size=10_000):
+    """
+    Fills the Motor `collection` with `count` synthetic properties unless it already holds that many.
+    """
+    existing = await collection.estimated_document_count()
+    if existing >= count:
+        return
+    batch = []
+    for document in synthetic_properties(count - existing, seed=existing):
+        batch.append(document)
+        if len(batch) == batch_size:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+
+def print_table(title, rows):
+    """
+    Prints a list of result dictionaries as an aligned table.
+    """
+    print(f"\n{title}")
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(_format(row[column])) for row in rows)) for column in columns}
+    print("  ".join(column.rjust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(_format(row[column]).rjust(widths[column]) for column in columns))
+
+
+def _format(value):
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def free_port():
+    """
+    Returns a TCP port that is free on the loopback interface.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def throwaway_mongod(timeout=30):
+    """
+    Starts a `mongod` on a free port with a temporary data directory and yields its URI. The process and its data
+    are removed on exit, so every run starts from an empty server.
+
+    Raises:
+        FileNotFoundError: If `mongod` is not installed.
+    """
+    executable = shutil.which("mongod")
+    if executable is None:
+        raise FileNotFoundError("mongod is not installed")
+    dbpath = tempfile.mkdtemp(prefix="benchmark-mongod-")
+    port = free_port()
+    process = subprocess.Popen(
+        [executable, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=1):
+                break
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("mongod did not start")
+            time.sleep(0.2)
+        yield f"mongodb://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+
+def write_results(path, results, meta):
+    """
+    Writes benchmark results to a JSON file, with the run metadata (commit, time, parameters).
+    """
+    with open(path, "w") as output:
+        json.dump({"meta": meta, "results": results}, output, indent=2, sort_keys=True)
+
+
+def git_commit():
+    """
+    Returns the commit the benchmarks run on, or None outside a git checkout.
+    """
+    with contextlib.suppress(OSError, subprocess.CalledProcessError):
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    return None
@@ -0,0 +1,68 @@
+"""
+Compares two result files of `benchmarks.suite` and flags regressions.
+
+A benchmark regresses when a latency percentile grows, or the throughput drops, by more than `--threshold`
+percent. The exit status is 1 when there is at least one regression, so it can gate a release:
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.common import print_table
+
+# Compared metrics, and whether a higher value is worse.
+METRICS = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "throughput_rps": False}
+
+
+def compare(baseline, candidate, threshold=10.0):
+    """
+    Compares the benchmarks present in both runs.
+
+    Args:
+        baseline (dict): Results of the reference run.
+        candidate (dict): Results of the new run.
+        threshold (float): Percentage of change tolerated before a difference is flagged.
+
+    Returns:
+        list: One row per benchmark and metric with both values, the change and its status
+        ('regression', 'improvement' or 'ok').
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(candidate)):
+        for metric, higher_is_worse in METRICS.items():
+            if metric not in baseline[key] or metric not in candidate[key]:
+                continue
+            before, after = baseline[key][metric], candidate[key][metric]
+            change = (after - before) / before * 100 if before else 0.0
+            worse = change if higher_is_worse else -change
+            status = "regression" if worse > threshold else "improvement" if worse < -threshold else "ok"
+            rows.append({
+                "benchmark": key, "metric": metric, "baseline": before, "candidate": after,
+                "change_pct": change, "status": status,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline, candidate = json.load(baseline_file), json.load(candidate_file)
+    if baseline["meta"].get("backend") != candidate["meta"].get("backend"):
+        print("Warning: the runs used different backends, the numbers are not comparable", file=sys.stderr)
+
+    rows = compare(baseline["results"], candidate["results"], args.threshold)
+    print_table(f"{baseline['meta'].get('commit')} -> {candidate['meta'].get('commit')}", rows)
+    regressions = [row for row in rows if row["status"] == "regression"]
+    print(f"\n{len(regressions)} regression(s) above {args.threshold}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark of API throughput as the number of concurrent clients grows.
+
+Starts the application with uvicorn (a single worker) and hammers the listing endpoint with an increasing
+number of concurrent clients. With a non-blocking data layer the throughput grows with the concurrency level
+until MongoDB or the CPU saturates; with a blocking driver it flatlines at the throughput of a single client.
+
+Requires a throwaway MongoDB (the application database `realStateCompany` is seeded on it):
+
+    python -m benchmarks.concurrency --uri mongodb://localhost:27017 --clients 1 2 4 8 16 32
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.repositories.property import PropertyRepository
+from benchmarks.common import print_table, seed_collection, summarize
+
+
+def start_server(uri, port):
+    """
+    Starts the application in a uvicorn subprocess and waits until it answers.
+    """
+    env = {**os.environ, "MONGODB_URI": uri}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The application did not start")
+
+
+def client_loop(url, stop_at):
+    """
+    Sends requests sequentially until `stop_at` and returns their latencies.
+    """
+    latencies = []
+    with requests.Session() as session:
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            session.get(url).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_level(url, clients, duration):
+    stop_at = time.monotonic() + duration
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(lambda _: client_loop(url, stop_at), range(clients)))
+    latencies = [latency for result in results for latency in result]
+    stats = summarize(latencies)
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / duration,
+        "p50_ms": stats["p50_ms"],
+        "p99_ms": stats["p99_ms"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    repository = PropertyRepository(AsyncIOMotorClient(args.uri).realStateCompany)
+    asyncio.run(seed_collection(repository.collection, args.documents))
+
+    url = f"http://127.0.0.1:{args.port}/api/v1/property/?min_price=100000&max_price=900000&sort=-price&limit=20"
+    process = start_server(args.uri, args.port)
+    try:
+        rows = [run_level(url, clients, args.duration) for clients in args.clients]
+    finally:
+        process.terminate()
+        process.wait()
+    print_table("Listing throughput by concurrent clients (1 uvicorn worker)", rows)
+
+
+if __name__ == "__main__":
+    main()
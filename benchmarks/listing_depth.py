@@ -0,0 +1,85 @@
+"""
+Benchmark of the property listing at increasing page depths.
+
+Seeds a collection with a few million synthetic properties and measures the latency of fetching a page
+at several depths with keyset pagination (`PropertyRepository.list`) and, as a baseline, with `skip`.
+Keyset latency should stay flat with depth while the `skip` baseline grows linearly.
+
+Requires a running MongoDB:
+
+    python -m benchmarks.listing_depth --uri mongodb://localhost:27017 --documents 3000000
+"""
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.repositories.property import PropertyRepository
+from app.schemas import PropertyFilter
+from benchmarks.common import print_table, seed_collection, summarize, timed_async
+
+
+def sort_spec_for(field):
+    return [("_id", 1)] if field == "_id" else [(field, 1), ("_id", 1)]
+
+
+async def cursor_at_depth(collection, field, page, page_size):
+    """
+    Returns the keyset position of the last element before `page`, found with a (slow) skip query.
+    """
+    if page == 0:
+        return None
+    cursor = collection.find({}, {field: 1}).sort(sort_spec_for(field)).skip(page * page_size - 1).limit(1)
+    last = (await cursor.to_list(length=1))[0]
+    values = {"_id": str(last["_id"])}
+    if field != "_id":
+        values[field] = last[field]
+    return values
+
+
+async def run(args):
+    database = AsyncIOMotorClient(args.uri)[args.database]
+    repository = PropertyRepository(database)
+    await seed_collection(repository.collection, args.documents)
+    await repository.ensure_indexes()
+
+    field, _ = repository.parse_sort(args.sort)
+    filters = PropertyFilter()
+
+    async def skip_page(page):
+        cursor = repository.collection.find({}).sort(sort_spec_for(field)).skip(page * args.page_size)
+        await cursor.limit(args.page_size).to_list(length=args.page_size)
+
+    rows = []
+    for page in args.pages:
+        after = await cursor_at_depth(repository.collection, field, page, args.page_size)
+        keyset = [
+            await timed_async(repository.list, filters, args.sort, args.page_size, after)
+            for _ in range(args.samples)
+        ]
+        skip = [await timed_async(skip_page, page) for _ in range(max(1, args.samples // 10))]
+        keyset_stats, skip_stats = summarize(keyset), summarize(skip)
+        rows.append({
+            "page": page,
+            "keyset_p50_ms": keyset_stats["p50_ms"],
+            "keyset_p99_ms": keyset_stats["p99_ms"],
+            "skip_p50_ms": skip_stats["p50_ms"],
+            "skip_p99_ms": skip_stats["p99_ms"],
+        })
+    print_table(f"Listing latency by depth ({args.documents} documents, sort={args.sort})", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="realStateCompanyBenchmark")
+    parser.add_argument("--documents", type=int, default=3_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", type=int, nargs="+", default=[0, 10, 100, 1_000, 10_000])
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--sort", default="price", choices=["id", "price", "year"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
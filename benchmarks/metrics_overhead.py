@@ -0,0 +1,59 @@
+"""
+Microbenchmark of the per-request overhead of the metrics middleware.
+
+Drives the same trivial ASGI app with and without `MetricsMiddleware` and reports the difference per request.
+It should stay in the order of a few microseconds. Needs no server nor database:
+
+    python -m benchmarks.metrics_overhead --requests 20000 --rounds 5
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.metrics import MetricsMiddleware
+from benchmarks.common import print_table
+
+ENDPOINT = object()
+
+
+async def bare_app(scope, receive, send):
+    scope["endpoint"] = ENDPOINT
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def discard(message):
+    pass
+
+
+def per_request_us(asgi_app, requests):
+    """
+    Returns the mean time per request of `asgi_app`, in microseconds.
+    """
+    async def run():
+        for _ in range(requests):
+            await asgi_app({"type": "http", "method": "GET", "path": "/overhead"}, None, discard)
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    instrumented_app = MetricsMiddleware(bare_app)
+    instrumented_app._routes[ENDPOINT] = "/overhead"
+    # The best round is the least disturbed by the rest of the machine
+    bare = min(per_request_us(bare_app, args.requests) for _ in range(args.rounds))
+    instrumented = min(per_request_us(instrumented_app, args.requests) for _ in range(args.rounds))
+    print_table(f"Metrics middleware ({args.requests} requests, best of {args.rounds})", [
+        {"bare_us": bare, "instrumented_us": instrumented, "overhead_us": instrumented - bare},
+    ])
+
+
+if __name__ == "__main__":
+    main()
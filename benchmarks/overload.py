@@ -0,0 +1,163 @@
+"""
+Load test of the admission control: latency under overload with and without load shedding.
+
+Starts the application (one uvicorn worker, with a small MongoDB pool so that the pool is the bottleneck) twice,
+with the admission control disabled (`ADMISSION_LIMITS={}`) and enabled, and drives each one with more concurrent
+clients than it can serve, reading single properties and listing pages (heavier, unindexed filters included).
+
+- Without admission control every request is accepted: they queue for a pool connection and the latency of all of
+  them grows with the load until they hit the pool wait timeout and fail with a 500.
+- With it, the requests over the limit wait at most `ADMISSION_QUEUE_TIMEOUT` and the rest are shed with a 503 and
+  `Retry-After`, so the admitted requests keep a bounded p99.
+
+The table reports, per configuration, the successful throughput, the share of 503 and other errors, and the
+latency of the successful responses and of every response.
+
+    python -m benchmarks.overload --uri mongodb://localhost:27017 --clients 256 --pool-size 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.repositories.property import PropertyRepository
+from benchmarks.common import free_port, print_table, seed_collection, summarize, throwaway_mongod
+from benchmarks.suite import sample_ids
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(uri, port, env):
+    """
+    Starts the application in a uvicorn subprocess with the extra `env` and waits until it answers.
+    """
+    env = {**os.environ, "MONGODB_URI": uri, "LOG_LEVEL": "warning", **env}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The application exited on startup")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The application did not start")
+
+
+def client_loop(base_url, ids, stop_at, timeout):
+    """
+    Sends reads and listings until `stop_at` and returns the status code and latency of each one. A client that
+    is told to retry later waits `Retry-After`, as a well-behaved client would.
+    """
+    results = []
+    with requests.Session() as session:
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                if random.random() < 0.7:
+                    response = session.get(f"{base_url}/{random.choice(ids)}", timeout=timeout)
+                else:
+                    params = {"min_price": random.randint(1, 900_000), "sort": "-year", "limit": 50}
+                    response = session.get(f"{base_url}/", params=params, timeout=timeout)
+                status = response.status_code
+            except requests.RequestException:
+                status, response = 0, None
+            results.append((status, time.perf_counter() - start))
+            if status == 503:
+                time.sleep(float(response.headers.get("Retry-After", 1)) * random.random())
+    return results
+
+
+def process_loop(base_url, ids, stop_at, threads, timeout):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        runs = list(executor.map(lambda _: client_loop(base_url, ids, stop_at, timeout), range(threads)))
+    return [result for run in runs for result in run]
+
+
+def run_load(base_url, ids, clients, processes, duration, timeout):
+    processes = max(1, min(processes, clients))
+    threads = [clients // processes + (index < clients % processes) for index in range(processes)]
+    stop_at = time.monotonic() + duration
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        runs = list(executor.map(
+            process_loop, *zip(*((base_url, ids, stop_at, count, timeout) for count in threads))
+        ))
+    return [result for run in runs for result in run]
+
+
+def run(uri, args):
+    repository = PropertyRepository(AsyncIOMotorClient(uri).realStateCompany)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(seed_collection(repository.collection, args.documents))
+        ids = loop.run_until_complete(sample_ids(repository, 1000))
+    finally:
+        loop.close()
+
+    limits = {"read": {"limit": args.pool_size, "queue": args.pool_size * 4}}
+    configurations = [("off", {"ADMISSION_LIMITS": "{}"}), ("on", {"ADMISSION_LIMITS": json.dumps(limits)})]
+    rows = []
+    for label, env in configurations:
+        port = free_port()
+        env = {**env, "MONGO_MAX_POOL_SIZE": str(args.pool_size), "MONGO_MIN_POOL_SIZE": "0",
+               "ADMISSION_QUEUE_TIMEOUT": str(args.queue_timeout)}
+        process = start_server(uri, port, env)
+        base_url = f"http://127.0.0.1:{port}/api/v1/property"
+        try:
+            run_load(base_url, ids, args.clients, args.load_processes, min(args.duration, 2.0), args.timeout)
+            results = run_load(base_url, ids, args.clients, args.load_processes, args.duration, args.timeout)
+        finally:
+            process.terminate()
+            process.wait()
+        ok = [latency for status, latency in results if status == 200]
+        shed = sum(1 for status, _ in results if status == 503)
+        every = summarize([latency for _, latency in results])
+        ok_stats = summarize(ok) if ok else {"p50_ms": 0.0, "p99_ms": 0.0}
+        rows.append({
+            "admission": label,
+            "ok_rps": len(ok) / args.duration,
+            "shed_pct": 100 * shed / len(results),
+            "error_pct": 100 * (len(results) - len(ok) - shed) / len(results),
+            "ok_p50_ms": ok_stats["p50_ms"],
+            "ok_p99_ms": ok_stats["p99_ms"],
+            "all_p99_ms": every["p99_ms"],
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", help="MongoDB server to use (a throwaway mongod is started when omitted)")
+    parser.add_argument("--documents", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=256)
+    parser.add_argument("--pool-size", type=int, default=16, help="MongoDB pool size (and read limit) of the worker")
+    parser.add_argument("--queue-timeout", type=float, default=0.5, help="ADMISSION_QUEUE_TIMEOUT of the run")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client side request timeout")
+    parser.add_argument("--load-processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    random.seed(17)
+    if args.uri:
+        rows = run(args.uri, args)
+    else:
+        with throwaway_mongod() as uri:
+            rows = run(uri, args)
+    print_table(f"Overload of one worker ({args.clients} clients, pool of {args.pool_size})", rows)
+
+
+if __name__ == "__main__":
+    main()
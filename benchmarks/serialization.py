@@ -0,0 +1,74 @@
+"""
+Microbenchmark of the per-request serialization cost of a property.
+
+Compares the path every property route used to take (the model validated, validated again against
+`response_model`, converted with `jsonable_encoder` and dumped with `json.dumps`) with the current one (the model
+built from the trusted stored document and rendered once with orjson by `FastJSONResponse`). Needs no database:
+
+    python -m benchmarks.serialization --documents 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import time
+
+from bson import ObjectId
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.responses import JSONResponse
+
+from app.core.responses import FastJSONResponse
+from app.models.py_object_id import PyObjectId
+from app.schemas import PropertyInDB
+from benchmarks.common import print_table
+
+
+def stored_documents(count):
+    return [
+        {
+            "_id": ObjectId(), "name": f"property_name_{index}", "address": "carrera 1", "price": 1000.0 + index,
+            "code_internal": f"C{index}", "year": 2001, "id_owner": "JOED1",
+        }
+        for index in range(count)
+    ]
+
+
+async def validated(documents, response_field):
+    for document in documents:
+        data = {**document, "id": PyObjectId(document["_id"])}
+        del data["_id"]
+        content = await serialize_response(field=response_field, response_content=PropertyInDB(**data))
+        JSONResponse(content).body
+
+
+async def trusted(documents, response_field):
+    for document in documents:
+        FastJSONResponse(PropertyInDB.from_document(document)).body
+
+
+def per_request_us(run, documents, response_field):
+    """
+    Returns the mean time per document of `run`, in microseconds.
+    """
+    started = time.perf_counter()
+    asyncio.run(run(documents, response_field))
+    return (time.perf_counter() - started) / len(documents) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = stored_documents(args.documents)
+    response_field = create_response_field(name="Response_get_property", type_=PropertyInDB)
+    rows = []
+    for path, run in (("validated", validated), ("trusted", trusted)):
+        # The best round is the least disturbed by the rest of the machine
+        best = min(per_request_us(run, documents, response_field) for _ in range(args.rounds))
+        rows.append({"path": path, "per_request_us": best})
+    print_table(f"Serialization of a property ({args.documents} documents, best of {args.rounds})", rows)
+
+
+if __name__ == "__main__":
+    main()
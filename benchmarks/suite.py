@@ -0,0 +1,265 @@
+"""
+Reproducible benchmark suite of the repositories and the HTTP API.
+
+- Repository micro-benchmarks: latency of `PropertyRepository.create`, `get` and `update` at several collection
+  sizes.
+- HTTP load: throughput and p50/p95/p99 latency of the property endpoints (create, get, list, change price and
+  upload image) with an increasing number of concurrent clients.
+
+Every run starts from an empty throwaway `mongod` (temporary data directory, free port), so two runs on the same
+machine are comparable. When `mongod` is not installed, it falls back to mongomock (`pip install mongomock-motor`)
+with the application served in-process; mongomock numbers only compare with other mongomock runs.
+
+Results are written to JSON; compare two runs with `benchmarks.compare`:
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --output candidate.json
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import platform
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from PIL import Image
+
+from app.repositories.property import PropertyRepository
+from app.schemas import PropertyCreate, PropertyUpdate
+from benchmarks.common import (
+    free_port, git_commit, print_table, seed_collection, summarize, synthetic_properties, throwaway_mongod,
+    timed_async, write_results
+)
+from benchmarks.concurrency import start_server
+
+HTTP_SCENARIOS = ("create_property", "get_property", "list_properties", "change_price", "upload_image")
+
+
+def sample_image():
+    """
+    Returns the bytes of a small PNG used by the upload scenario.
+    """
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (180, 40, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def sample_ids(repository, count):
+    """
+    Returns the IDs of `count` existing properties.
+    """
+    cursor = repository.collection.find({}, {"_id": 1}).limit(count)
+    return [str(document["_id"]) async for document in cursor]
+
+
+async def repository_benchmarks(database, sizes, samples):
+    """
+    Measures create, get and update at each collection size.
+
+    Returns:
+        dict: Latency summary per `repository.<operation>.<size>`.
+    """
+    repository = PropertyRepository(database)
+    await repository.ensure_indexes()
+    results = {}
+    for size in sorted(sizes):
+        await seed_collection(repository.collection, size)
+        ids = await sample_ids(repository, samples)
+        new_properties = [
+            PropertyCreate(**{key: value for key, value in document.items() if key != "_id"})
+            for document in synthetic_properties(samples, seed=size)
+        ]
+
+        create = [await timed_async(repository.create, data) for data in new_properties]
+        get = [await timed_async(repository.get, property_id) for property_id in ids]
+        update = [
+            await timed_async(repository.update, property_id, PropertyUpdate(price=1000 + index))
+            for index, property_id in enumerate(ids)
+        ]
+        for operation, latencies in (("create", create), ("get", get), ("update", update)):
+            results[f"repository.{operation}.{size}"] = {"documents": size, **summarize(latencies)}
+    return results
+
+
+def scenario_request(scenario, session, base_url, ids, image):
+    """
+    Sends one request of a scenario.
+    """
+    property_id = random.choice(ids)
+    if scenario == "create_property":
+        document = next(synthetic_properties(1, seed=random.randrange(1 << 30)))
+        del document["_id"]
+        response = session.post(f"{base_url}/create-property/", json=document)
+    elif scenario == "get_property":
+        response = session.get(f"{base_url}/{property_id}")
+    elif scenario == "list_properties":
+        response = session.get(f"{base_url}/", params={"min_price": 100000, "sort": "-price", "limit": 20})
+    elif scenario == "change_price":
+        price = random.randint(1, 10 ** 6)
+        response = session.put(f"{base_url}/change-price/{property_id}", params={"price_in": price})
+    else:
+        response = session.post(
+            f"{base_url}/properties/{property_id}/upload-image/", files={"image": ("bench.png", image, "image/png")}
+        )
+    response.raise_for_status()
+
+
+def client_loop(scenario, base_url, ids, image, stop_at):
+    """
+    Sends requests of a scenario sequentially until `stop_at` and returns their latencies.
+    """
+    latencies = []
+    with requests.Session() as session:
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            scenario_request(scenario, session, base_url, ids, image)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def http_benchmarks(base_url, ids, scenarios, clients_levels, duration):
+    """
+    Runs each scenario at each concurrency level for `duration` seconds.
+
+    Returns:
+        dict: Throughput and latency summary per `http.<scenario>.c<clients>`.
+    """
+    image = sample_image()
+    results = {}
+    for scenario in scenarios:
+        for clients in clients_levels:
+            stop_at = time.monotonic() + duration
+            with ThreadPoolExecutor(max_workers=clients) as executor:
+                runs = list(executor.map(
+                    lambda _: client_loop(scenario, base_url, ids, image, stop_at), range(clients)
+                ))
+            latencies = [latency for run in runs for latency in run]
+            results[f"http.{scenario}.c{clients}"] = {
+                "clients": clients,
+                "throughput_rps": len(latencies) / duration,
+                **summarize(latencies),
+            }
+    return results
+
+
+@contextlib.contextmanager
+def in_process_server(database, port):
+    """
+    Serves the application with uvicorn in a background thread, using `database` instead of the configured one.
+    Used with mongomock, whose data only lives in this process.
+    """
+    import uvicorn
+    from app.api.api_v1.deps import get_db
+    from app.main import create_app
+
+    app = create_app()
+    app.dependency_overrides[get_db] = lambda: database
+    app.router.on_startup.clear()   # There is no MongoDB server to verify or warm up
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("The application did not start")
+        time.sleep(0.1)
+    try:
+        yield
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+@contextlib.contextmanager
+def backend_database(backend, uri):
+    """
+    Yields the backend actually used, the database for the repositories and the server URI (None for mongomock).
+    """
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if backend == "uri":
+        yield "uri", AsyncIOMotorClient(uri).realStateCompany, uri
+    elif backend == "mongod" or (backend == "auto" and shutil.which("mongod")):
+        with throwaway_mongod() as mongod_uri:
+            yield "mongod", AsyncIOMotorClient(mongod_uri).realStateCompany, mongod_uri
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("Neither mongod nor mongomock-motor is installed")
+        yield "mongomock", AsyncMongoMockClient().realStateCompany, None
+
+
+def run(args):
+    results = {}
+    with backend_database(args.backend, args.uri) as (backend, database, uri), \
+            tempfile.TemporaryDirectory(prefix="benchmark-images-") as images_directory:
+        # The same event loop is used for every repository call, since Motor clients are bound to it
+        loop = asyncio.new_event_loop()
+        try:
+            results.update(loop.run_until_complete(repository_benchmarks(database, args.sizes, args.samples)))
+            ids = loop.run_until_complete(sample_ids(PropertyRepository(database), 1000))
+        finally:
+            loop.close()
+
+        if args.clients:
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}/api/v1/property"
+            os.environ["IMAGES_DIRECTORY"] = images_directory + os.sep
+            if uri is None:
+                from app.core.config import settings
+                settings.IMAGES_DIRECTORY = images_directory + os.sep
+                with in_process_server(database, port):
+                    results.update(http_benchmarks(base_url, ids, args.scenarios, args.clients, args.duration))
+            else:
+                process = start_server(uri, port)
+                try:
+                    results.update(http_benchmarks(base_url, ids, args.scenarios, args.clients, args.duration))
+                finally:
+                    process.terminate()
+                    process.wait()
+
+    meta = {
+        "backend": backend,
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+    }
+    return results, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["auto", "mongod", "mongomock", "uri"], default="auto")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="Server used with --backend uri")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--scenarios", nargs="+", choices=HTTP_SCENARIOS, default=list(HTTP_SCENARIOS))
+    parser.add_argument("--clients", type=int, nargs="*", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+
+    random.seed(17)
+    results, meta = run(args)
+    write_results(args.output, results, meta)
+    for prefix, title in (("repository.", "Repository latency"), ("http.", "HTTP load")):
+        print_table(f"{title} ({meta['backend']}, commit {meta['commit']})", [
+            {"benchmark": key, **result} for key, result in sorted(results.items()) if key.startswith(prefix)
+        ])
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
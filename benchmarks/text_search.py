@@ -0,0 +1,123 @@
+"""
+Benchmark of the property search by name and address: text index versus a regex scan.
+
+Seeds a collection with a large synthetic catalog whose names and addresses are built from a small vocabulary of
+property types and neighborhoods, then measures, for a set of searches with and without filters:
+
+- `text`: `PropertyRepository.search`, backed by the `name_address_text` text index and ranked by relevance.
+- `regex`: the previous approach, a case-insensitive `$regex` on name and address, which reads every document.
+
+The text search returns properties matching any word (ranked by how many match) while the regex baseline requires
+all of them, so hit counts differ; both are cut at one page.
+
+Requires a running MongoDB:
+
+    python -m benchmarks.text_search --uri mongodb://localhost:27017 --documents 1000000
+"""
+import argparse
+import asyncio
+import random
+import re
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.repositories.property import PropertyRepository
+from app.schemas import PropertyFilter
+from benchmarks.common import print_table, summarize, synthetic_properties, timed_async
+
+PROPERTY_TYPES = ["Apartamento", "Casa", "Local", "Oficina", "Bodega", "Finca", "Lote", "Penthouse", "Estudio"]
+NEIGHBORHOODS = [
+    "Chapinero", "Usaquén", "Cedritos", "Salitre", "Teusaquillo", "Laureles", "Poblado", "Envigado", "Bocagrande",
+    "Granada", "Ciudad Jardín", "Rosales", "Nicolás de Federmán", "Modelia", "Suba", "Kennedy",
+]
+ADJECTIVES = ["Alto", "Bajo", "Campestre", "Moderno", "Colonial", "Amoblado", "Duplex", "Esquinero", "Remodelado"]
+STREETS = ["Calle", "Carrera", "Avenida", "Diagonal", "Transversal"]
+
+SEARCHES = [
+    ("single word", "chapinero", PropertyFilter()),
+    ("two words", "apartamento laureles", PropertyFilter()),
+    ("accents", "usaquen", PropertyFilter()),
+    ("with filters", "casa campestre", PropertyFilter(min_price=500_000, max_year=2010)),
+]
+
+
+def named_properties(count, seed=17):
+    """
+    Generates synthetic properties with searchable names and addresses.
+    """
+    rng = random.Random(seed)
+    for document in synthetic_properties(count, seed=seed):
+        neighborhood = rng.choice(NEIGHBORHOODS)
+        document["name"] = f"{rng.choice(PROPERTY_TYPES)} {rng.choice(ADJECTIVES)} {neighborhood}"
+        document["address"] = (
+            f"{rng.choice(STREETS)} {rng.randint(1, 200)} #{rng.randint(1, 99)}-{rng.randint(1, 99)} {neighborhood}"
+        )
+        yield document
+
+
+async def seed(collection, count, batch_size=10_000):
+    if await collection.estimated_document_count() >= count:
+        return
+    await collection.drop()
+    batch = []
+    for document in named_properties(count):
+        batch.append(document)
+        if len(batch) == batch_size:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+
+def regex_query(text, filters):
+    """
+    Baseline: every word must appear (case-insensitive) in the name or the address.
+    """
+    words = [{"$or": [
+        {"name": {"$regex": re.escape(word), "$options": "i"}},
+        {"address": {"$regex": re.escape(word), "$options": "i"}},
+    ]} for word in text.split()]
+    return {"$and": words + [filters.to_query()]}
+
+
+async def run(args):
+    database = AsyncIOMotorClient(args.uri)[args.database]
+    repository = PropertyRepository(database)
+    await seed(repository.collection, args.documents)
+    await repository.ensure_indexes()
+
+    async def regex_search(text, filters):
+        cursor = repository.collection.find(regex_query(text, filters)).sort("_id", 1).limit(args.page_size)
+        return await cursor.to_list(length=args.page_size)
+
+    rows = []
+    for label, text, filters in SEARCHES:
+        text_hits = len(await repository.search(text, filters, args.page_size))
+        regex_hits = len(await regex_search(text, filters))
+        indexed = [await timed_async(repository.search, text, filters, args.page_size) for _ in range(args.samples)]
+        scan = [await timed_async(regex_search, text, filters) for _ in range(max(1, args.samples // 10))]
+        indexed_stats, scan_stats = summarize(indexed), summarize(scan)
+        rows.append({
+            "search": label,
+            "text_hits": text_hits,
+            "text_p50_ms": indexed_stats["p50_ms"],
+            "text_p99_ms": indexed_stats["p99_ms"],
+            "regex_hits": regex_hits,
+            "regex_p50_ms": scan_stats["p50_ms"],
+            "regex_p99_ms": scan_stats["p99_ms"],
+        })
+    print_table(f"Search latency, first page of {args.page_size} ({args.documents} documents)", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="realStateCompanyTextBenchmark")
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=100)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
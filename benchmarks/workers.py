@@ -0,0 +1,149 @@
+"""
+Load test of the multi-process server: throughput as the number of gunicorn workers grows.
+
+Starts the production server (`gunicorn -c gunicorn.conf.py app.main:app`) with 1, 2, 4... uvicorn
+workers and drives the same load against each configuration: a fixed number of concurrent clients reading single
+properties and listing pages. A single worker is bound to one core (the event loop, JSON encoding and validation
+all run on it), so throughput should grow close to linearly with the workers until the cores, or MongoDB, saturate.
+
+The load generator runs in its own processes on the same machine; leave it some cores (e.g. `--workers 1 2 4` on
+an 8 core box) or run it from another host against `--bind`.
+
+    python -m benchmarks.workers --uri mongodb://localhost:27017 --workers 1 2 4 --clients 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.repositories.property import PropertyRepository
+from benchmarks.common import free_port, print_table, seed_collection, summarize, throwaway_mongod
+from benchmarks.suite import sample_ids
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_gunicorn(uri, port, workers):
+    """
+    Starts the production server with `workers` processes and waits until it answers.
+    """
+    env = {**os.environ, "MONGODB_URI": uri, "WEB_CONCURRENCY": str(workers), "BIND": f"127.0.0.1:{port}"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null",
+         "app.main:app"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The server exited on startup")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The server did not start")
+
+
+def client_loop(base_url, ids, stop_at):
+    """
+    Alternates single property reads and listing pages until `stop_at` and returns their latencies.
+    """
+    latencies = []
+    with requests.Session() as session:
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            if random.random() < 0.8:
+                response = session.get(f"{base_url}/{random.choice(ids)}")
+            else:
+                response = session.get(f"{base_url}/", params={"min_price": 100000, "sort": "-price", "limit": 20})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def process_loop(base_url, ids, stop_at, threads):
+    """
+    Runs `threads` clients in one load generator process. Clients are spread over several processes so that
+    the generator itself is not limited to one core by the GIL.
+    """
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        runs = list(executor.map(lambda _: client_loop(base_url, ids, stop_at), range(threads)))
+    return [latency for run in runs for latency in run]
+
+
+def run_load(base_url, ids, clients, processes, duration):
+    processes = max(1, min(processes, clients))
+    threads = [clients // processes + (index < clients % processes) for index in range(processes)]
+    stop_at = time.monotonic() + duration
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        runs = list(executor.map(process_loop, *zip(*((base_url, ids, stop_at, count) for count in threads))))
+    return [latency for run in runs for latency in run]
+
+
+def run(uri, args):
+    database = AsyncIOMotorClient(uri).realStateCompany
+    repository = PropertyRepository(database)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(seed_collection(repository.collection, args.documents))
+        ids = loop.run_until_complete(sample_ids(repository, 1000))
+    finally:
+        loop.close()
+
+    rows = []
+    for workers in args.workers:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}/api/v1/property"
+        process = start_gunicorn(uri, port, workers)
+        try:
+            run_load(base_url, ids, args.clients, args.load_processes, min(args.duration, 2.0))  # Warm up
+            latencies = run_load(base_url, ids, args.clients, args.load_processes, args.duration)
+        finally:
+            process.terminate()
+            process.wait()
+        stats = summarize(latencies)
+        throughput = len(latencies) / args.duration
+        # Speedup over the smallest configuration, and how close each worker gets to that per worker throughput
+        first = rows[0] if rows else {"workers": workers, "throughput_rps": throughput}
+        rows.append({
+            "workers": workers,
+            "throughput_rps": throughput,
+            "speedup": throughput / first["throughput_rps"],
+            "efficiency": throughput / (first["throughput_rps"] / first["workers"] * workers),
+            "p50_ms": stats["p50_ms"],
+            "p99_ms": stats["p99_ms"],
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", help="MongoDB server to use (a throwaway mongod is started when omitted)")
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--load-processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+    args.workers.sort()
+
+    random.seed(17)
+    if args.uri:
+        rows = run(args.uri, args)
+    else:
+        with throwaway_mongod() as uri:
+            rows = run(uri, args)
+    print_table(f"Throughput by gunicorn workers ({args.clients} clients, {os.cpu_count()} cores)", rows)
+
+
+if __name__ == "__main__":
+    main()
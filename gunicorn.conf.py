@@ -0,0 +1,26 @@
+"""
+Gunicorn configuration of the production server.
+
+Gunicorn forks `WORKERS` processes, each running the application on a uvicorn event loop. Every worker creates
+its own MongoDB client on startup, after the fork (see `app.db.mongodb.get_client`).
+
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+from app.core.config import settings
+
+bind = settings.BIND
+workers = settings.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# The application is imported once in the master and shared with the workers copy-on-write. Importing it opens no
+# connection (MongoDB clients are created on startup in each worker); it does start the logging listener thread,
+# which does not survive the fork and is started again in each worker (see `app.core.logger`).
+preload_app = True
+
+# Seconds a worker may stay silent before being restarted, and to finish in-flight requests on shutdown.
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+loglevel = settings.LOG_LEVEL
@@ -1,21 +1,46 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 from fastapi.testclient import TestClient
 
+from app.core.cache import LRUCache
+from app.core.config import settings
 from app.main import app
 from app.models.py_object_id import PyObjectId
+from app.repositories.cached_property import property_cache
+from app.repositories.property import PropertyRepository
+from app.repositories.property_image import PropertyImageRepository
+from app.repositories.property_trace import PropertyTraceRepository
+from app.services.image_storage import S3ImageStorage
 
 
 @pytest.fixture
-def test_client():
+def test_client(mocker):
     """
     Creates and provides a test client for the FastAPI application.
     This client can be used to perform test requests to the application.
+    The startup connectivity check is skipped, since the repositories are mocked.
     :return:
     """
+    mocker.patch('app.main.connect_to_mongo')
+    # Tests that use asyncio.run leave no current event loop, which the test client needs
+    asyncio.set_event_loop(asyncio.new_event_loop())
     with TestClient(app) as client:
         yield client
 
 
+@pytest.fixture(autouse=True)
+def clear_property_cache(mocker):
+    """
+    Gives each test an empty in-process property cache, so cached reads never leak between tests.
+    :param mocker:
+    :return:
+    """
+    mocker.patch.object(property_cache, "local", LRUCache(settings.PROPERTY_CACHE_SIZE, settings.PROPERTY_CACHE_LOCAL_TTL))
+    yield
+
+
 @pytest.fixture
 def property_data():
     """
@@ -115,6 +140,16 @@ def mock_property_image_repository_add_property_image(mocker):
     return mocker.patch('app.repositories.property_image.PropertyImageRepository.add_property_image')
 
 
+@pytest.fixture
+def mock_property_image_repository_add_property_images(mocker):
+    """
+    Creates a mock for the 'add_property_images' method of the property image repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_image.PropertyImageRepository.add_property_images')
+
+
 @pytest.fixture
 def mock_property_service(mocker):
     """
@@ -124,3 +159,298 @@ def mock_property_service(mocker):
     :return:
     """
     return mocker.patch('app.repositories.property.PropertyService')
+
+
+@pytest.fixture
+def mock_property_repository_list(mocker):
+    """
+    Creates a mock for the 'list' method of the property repository.
+    It allows to simulate property listings without real access to the database.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property.PropertyRepository.list')
+
+
+@pytest.fixture
+def mock_property_image_repository_list_by_property(mocker):
+    """
+    Creates a mock for the 'list_by_property' method of the property image repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_image.PropertyImageRepository.list_by_property')
+
+
+@pytest.fixture
+def mock_generate_image_derivatives(mocker):
+    """
+    Creates a mock for the background generation of image derivatives.
+    It avoids starting the worker process pool when testing the upload endpoint.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.services.property_service.PropertyService.generate_image_derivatives')
+
+
+@pytest.fixture
+def mock_property_image_repository_find_by_content_hash(mocker):
+    """
+    Creates a mock for the 'find_by_content_hash' method of the property image repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_image.PropertyImageRepository.find_by_content_hash')
+
+
+@pytest.fixture
+def mock_property_image_repository_find_by_content_hashes(mocker):
+    """
+    Creates a mock for the 'find_by_content_hashes' method of the property image repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_image.PropertyImageRepository.find_by_content_hashes')
+
+
+@pytest.fixture
+def mock_property_image_repository_delete(mocker):
+    """
+    Creates a mock for the 'delete' method of the property image repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_image.PropertyImageRepository.delete')
+
+
+@pytest.fixture
+def mock_property_image_repository_count_references(mocker):
+    """
+    Creates a mock for the 'count_references' method of the property image repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_image.PropertyImageRepository.count_references')
+
+
+@pytest.fixture
+def mock_property_image_repository_get(mocker):
+    """
+    Creates a mock for the 'get' method of the property image repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_image.PropertyImageRepository.get')
+
+
+@pytest.fixture
+def mock_property_repository_bulk_update_prices(mocker):
+    """
+    Creates a mock for the 'bulk_update_prices' method of the property repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property.PropertyRepository.bulk_update_prices')
+
+
+@pytest.fixture
+def mock_property_repository_adjust_prices(mocker):
+    """
+    Creates a mock for the 'adjust_prices' method of the property repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property.PropertyRepository.adjust_prices')
+
+
+@pytest.fixture
+def mock_property_trace_repository_create(mocker):
+    """
+    Creates a mock for the 'create' method of the property trace repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_trace.PropertyTraceRepository.create')
+
+
+@pytest.fixture
+def mock_property_trace_repository_refresh_rollups(mocker):
+    """
+    Creates a mock for the 'refresh_rollups' method of the property trace repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_trace.PropertyTraceRepository.refresh_rollups')
+
+
+@pytest.fixture
+def mock_property_trace_repository_get_rollups(mocker):
+    """
+    Creates a mock for the 'get_rollups' method of the property trace repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property_trace.PropertyTraceRepository.get_rollups')
+
+
+@pytest.fixture
+def mock_property_repository_get_expanded(mocker):
+    """
+    Creates a mock for the 'get_expanded' method of the property repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property.PropertyRepository.get_expanded')
+
+
+@pytest.fixture
+def mock_property_repository_export_cursor(mocker):
+    """
+    Creates a mock for the 'export_cursor' method of the property repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property.PropertyRepository.export_cursor')
+
+
+@pytest.fixture
+def mock_property_repository_nearby(mocker):
+    """
+    Creates a mock for the 'nearby' method of the property repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property.PropertyRepository.nearby')
+
+
+@pytest.fixture
+def mock_property_repository_search(mocker):
+    """
+    Creates a mock for the 'search' method of the property repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property.PropertyRepository.search')
+
+
+@pytest.fixture
+def mock_property_repository_sync(mocker):
+    """
+    Creates a mock for the 'sync' method of the property repository.
+    :param mocker:
+    :return:
+    """
+    return mocker.patch('app.repositories.property.PropertyRepository.sync')
+
+
+class AsyncCursor:
+    """
+    Stand-in of a Motor cursor that yields the given documents to `async for`.
+    """
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class ClientError(Exception):
+    """
+    Stand-in of the botocore error raised by the S3 client, with the error code in its response.
+    """
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+@pytest.fixture
+def async_cursor():
+    """
+    Provides the Motor cursor stand-in, built from the list of documents it yields.
+    :return:
+    """
+    return AsyncCursor
+
+
+@pytest.fixture
+def mock_mongo_client():
+    """
+    Creates a mock of the Motor client used by the repositories and the scripts. The collections of the
+    `realStateCompany` database carry their names (used by `$lookup` and `$merge`), and their aggregations and
+    property listings return no documents unless the test sets a result.
+    :return:
+    """
+    client = MagicMock()
+    database = client.realStateCompany
+    for name in ("Properties", "Owners", "Property_images", "Property_traces", "Property_trace_rollups"):
+        collection = getattr(database, name)
+        collection.name = name
+        collection.aggregate.return_value.to_list = AsyncMock(return_value=[])
+    database.Properties.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[])
+    return client
+
+
+@pytest.fixture
+def property_repository(mock_mongo_client):
+    """
+    Provides a property repository on the mocked Motor client; its collection is `repository.collection`.
+    :param mock_mongo_client:
+    :return:
+    """
+    return PropertyRepository(mock_mongo_client)
+
+
+@pytest.fixture
+def property_image_repository(mock_mongo_client):
+    """
+    Provides a property image repository on the mocked Motor client; its collection is `repository.collection`.
+    :param mock_mongo_client:
+    :return:
+    """
+    return PropertyImageRepository(mock_mongo_client)
+
+
+@pytest.fixture
+def property_trace_repository(mock_mongo_client):
+    """
+    Provides a property trace repository on the mocked Motor client; its collections are `repository.collection`,
+    `repository.properties` and `repository.rollups`.
+    :param mock_mongo_client:
+    :return:
+    """
+    return PropertyTraceRepository(mock_mongo_client)
+
+
+@pytest.fixture
+def mock_s3_client():
+    """
+    Creates a mock of the S3 client. The bucket holds the objects of `client.objects` (key -> `head_object`
+    response), and presigned URLs point to a fixed address.
+    :return:
+    """
+    client = MagicMock()
+    client.objects = {}
+    client.exceptions.ClientError = ClientError
+
+    def head_object(Bucket, Key, **kwargs):
+        if Key not in client.objects:
+            raise ClientError("404")
+        return client.objects[Key]
+
+    client.head_object.side_effect = head_object
+    client.generate_presigned_url.return_value = "https://storage.test/signed"
+    return client
+
+
+@pytest.fixture
+def s3_image_storage(mock_s3_client):
+    """
+    Provides an S3 image storage of the 'images' bucket on the mocked S3 client.
+    :param mock_s3_client:
+    :return:
+    """
+    return S3ImageStorage("images", client=mock_s3_client, expires=60)
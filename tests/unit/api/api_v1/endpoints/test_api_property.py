@@ -1,10 +1,25 @@
+import gzip
+import hashlib
+from datetime import datetime
 from http import HTTPStatus
 from io import BytesIO
 from unittest import mock
 
+import pytest
+from pymongo.errors import DuplicateKeyError
+
 from starlette.datastructures import UploadFile
 
+from app.core.config import settings
+from app.core.exceptions import PreconditionFailed
 from app.models.py_object_id import PyObjectId
+from app.schemas import (
+    BulkPriceUpdateResult, ImageDerivative, PropertyDetail, PropertyImageInDB, PropertyImageUploadTicket, PropertyInDB,
+    PropertyNearby, PropertyEvent, PropertySearchHit, PropertySyncResult, PropertyTraceInDB, SalesRollup
+)
+from app.services.image_storage import LocalImageStorage
+from app.utils.file_utils import StoredFile
+from app.utils.pagination import encode_cursor
 
 
 class TestPropertyCreation:
@@ -17,7 +32,7 @@ class TestPropertyCreation:
          """
 
         # SetUp
-        mock_property_repository_create.return_value = property_data_with_id
+        mock_property_repository_create.return_value = PropertyInDB(**property_data_with_id)
 
         # Action
         response = test_client.post("/api/v1/property/create-property/", json=property_create_data)
@@ -56,8 +71,8 @@ class TestPropertyCreation:
 
         # SetUp
         price_in = 3500.0
-        mock_property_repository_get.return_value = property_data_with_id
-        mock_property_repository_update.return_value = {**property_data_with_id, "price": price_in}
+        mock_property_repository_get.return_value = PropertyInDB(**property_data_with_id)
+        mock_property_repository_update.return_value = PropertyInDB(**{**property_data_with_id, "price": price_in})
 
         # Action
         response = test_client.put(f"/api/v1/property/change-price/{property_data_with_id['id']}?price_in={price_in}")
@@ -85,46 +100,86 @@ class TestPropertyCreation:
         assert "Property not found" in response.json().get("detail", "")
 
     def test_upload_image_to_property_success(
-            self, test_client, property_data_with_id, image_data_with_id, mock_property_repository_get, mock_property_image_repository_add_property_image
+            self, test_client, tmp_path, mocker, property_data_with_id, image_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_add_property_image, mock_property_image_repository_find_by_content_hash,
+            mock_generate_image_derivatives
     ):
         """
             Tests successful upload of an image to an existing property.
             - An existing property is simulated, and an image is uploaded for it.
-            - Verifies that the file storage function is called correctly and that the endpoint response is successful (HTTP status code 200).
+            - Verifies that the image is stored under its content hash in the sharded layout and that the endpoint
+              response is successful (HTTP status code 200).
             - Checks that the response data matches the uploaded image data.
         """
 
         # SetUp
+        mocker.patch("app.services.property_service.settings.IMAGES_DIRECTORY", str(tmp_path))
         file_name = image_data_with_id['file'].split('/')[-1]
-        existing_image_data = image_data_with_id
+        content = b"\xff\xd8\xff\xe0fake image data"
+        content_hash = hashlib.sha256(content).hexdigest()
         # Simular una imagen como un archivo en memoria
-        image_content = BytesIO(b"fake image data")
+        image_content = BytesIO(content)
         image = UploadFile(filename=file_name, content_type="image/jpeg", file=image_content)
         mock_property_repository_get.return_value = property_data_with_id
+        mock_property_image_repository_find_by_content_hash.return_value = None
         mock_property_image_repository_add_property_image.return_value = image_data_with_id
 
         # Action
-        with mock.patch('builtins.open', mock.mock_open()) as mocked_file:
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/upload-image/",
+            files={"image": (image.filename, image_content, image.content_type)}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        stored_path = tmp_path / content_hash[:2] / content_hash[2:4] / f"{content_hash}.jpg"
+        assert stored_path.read_bytes() == content
+        mock_property_image_repository_add_property_image.assert_called_once_with(
+            str(property_data_with_id['id']), str(stored_path), True, content_hash
+        )
+
+        response_data = response.json()
+        assert response_data["_id"] == str(image_data_with_id["_id"])
+        assert response_data["id_property"] == str(image_data_with_id["id_property"])
+        assert response_data["file"] == image_data_with_id["file"]
+        assert response_data["enable"] == image_data_with_id["enable"]
+        assert response_data["derivatives_status"] == "pending"
+        mock_generate_image_derivatives.assert_called_once_with(image_data_with_id)
+
+        image_content.close()
+
+    def test_upload_duplicated_image_reuses_derivatives(
+            self, test_client, tmp_path, mocker, property_data_with_id, image_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_add_property_image, mock_property_image_repository_find_by_content_hash,
+            mock_generate_image_derivatives
+    ):
+        """
+            Tests uploading content that is already stored.
+            - The file is stored once and the derivatives of the identical image are reused as 'ready'.
+        """
+
+        # SetUp
+        mocker.patch("app.services.property_service.settings.IMAGES_DIRECTORY", str(tmp_path))
+        content = b"\xff\xd8\xff\xe0fake image data"
+        thumbnail = ImageDerivative(name="thumbnail", file="thumb.jpg", width=10, height=10, format="JPEG")
+        mock_property_repository_get.return_value = property_data_with_id
+        mock_property_image_repository_find_by_content_hash.return_value = PropertyImageInDB(
+            **{**image_data_with_id, "derivatives": [thumbnail], "derivatives_status": "ready"}
+        )
+        mock_property_image_repository_add_property_image.return_value = image_data_with_id
+
+        # Action
+        for _ in range(2):
             response = test_client.post(
                 f"/api/v1/property/properties/{property_data_with_id['id']}/upload-image/",
-                files={"image": (image.filename, image_content, image.content_type)}
+                files={"image": ("test_image.jpeg", BytesIO(content), "image/jpeg")}
             )
 
-            # Assertion
-            assert response.status_code == HTTPStatus.OK
-            # Asegurarse de que la función open fue llamada para guardar la imagen
-            file_path_call_arg = mocked_file.call_args[0][0]
-            assert file_path_call_arg.startswith("app/images/")
-            assert file_path_call_arg.endswith("-test_image.jpg")
-            assert "wb" == mocked_file.call_args[0][1]
-
-            response_data = response.json()
-            assert response_data["_id"] == str(image_data_with_id["_id"])
-            assert response_data["id_property"] == str(image_data_with_id["id_property"])
-            assert response_data["file"] == image_data_with_id["file"]
-            assert response_data["enable"] == image_data_with_id["enable"]
-
-        image_content.close()
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert len([path for path in tmp_path.rglob("*") if path.is_file()]) == 1
+        args = mock_property_image_repository_add_property_image.call_args[0]
+        assert args[4:] == ([thumbnail], "ready")
 
     def test_upload_image_to_property_unsuccess_property_not_found(self, test_client, mock_property_repository_get):
         """
@@ -153,3 +208,1140 @@ class TestPropertyCreation:
             mocked_file.assert_not_called()
 
         image_content.close()
+
+
+class TestPropertyListing:
+    def test_list_properties_returns_next_cursor(self, test_client, property_data_with_id, mock_property_repository_list):
+        """
+            Tests listing properties when there are more results than the page size.
+            - The repository returns one element more than the limit, which signals the next page.
+            - Verifies that the page is trimmed and that a cursor is returned and accepted for the next request.
+        """
+
+        # SetUp
+        second_property = {**property_data_with_id, "id": PyObjectId(), "price": 2000}
+        mock_property_repository_list.return_value = [
+            PropertyInDB(**property_data_with_id), PropertyInDB(**second_property)
+        ]
+
+        # Action
+        response = test_client.get("/api/v1/property/?min_price=500&sort=price&limit=1")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        body = response.json()
+        assert len(body["items"]) == 1
+        assert body["next_cursor"]
+        filters, sort, limit, after = mock_property_repository_list.call_args[0]
+        assert filters.min_price == 500
+        assert (sort, limit, after) == ("price", 2, None)
+
+        # Action
+        response = test_client.get(f"/api/v1/property/?min_price=500&sort=price&limit=1&cursor={body['next_cursor']}")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        after = mock_property_repository_list.call_args[0][3]
+        assert after == {"_id": str(property_data_with_id["id"]), "price": property_data_with_id["price"]}
+
+    def test_list_properties_last_page(self, test_client, property_data_with_id, mock_property_repository_list):
+        """
+            Tests listing properties when all the results fit in the page.
+        """
+
+        # SetUp
+        mock_property_repository_list.return_value = [PropertyInDB(**property_data_with_id)]
+
+        # Action
+        response = test_client.get("/api/v1/property/")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["next_cursor"] is None
+
+    def test_list_properties_invalid_cursor(self, test_client, mock_property_repository_list):
+        """
+            Tests that a tampered cursor is rejected with a client error (HTTP status code 400).
+        """
+
+        # Action
+        response = test_client.get("/api/v1/property/?cursor=not-a-cursor")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        mock_property_repository_list.assert_not_called()
+
+    @pytest.mark.parametrize("values", [{}, {"price": None}, {"price": {"$gt": 0}}])
+    def test_list_properties_cursor_without_sort_key(self, test_client, mock_property_repository_list, values):
+        """
+            Tests that a cursor lacking a scalar value for the sort field is rejected with 400 instead of failing
+            while the page query is built.
+        """
+
+        # SetUp
+        cursor = encode_cursor("price", {"_id": str(PyObjectId()), **values})
+
+        # Action
+        response = test_client.get(f"/api/v1/property/?sort=price&cursor={cursor}")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        mock_property_repository_list.assert_not_called()
+
+    def test_list_properties_invalid_sort(self, test_client, mock_property_repository_list):
+        """
+            Tests that sorting by a non indexed field is rejected (HTTP status code 422).
+        """
+
+        # Action
+        response = test_client.get("/api/v1/property/?sort=address")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        mock_property_repository_list.assert_not_called()
+
+
+class TestPropertyImageUploadValidation:
+    def test_upload_image_content_does_not_match_extension(
+            self, test_client, tmp_path, mocker, property_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_add_property_image
+    ):
+        """
+            Tests that a file whose magic bytes do not match its extension is rejected (HTTP status code 400)
+            and that nothing is left on disk nor registered in the database.
+        """
+
+        # SetUp
+        mocker.patch("app.services.property_service.settings.IMAGES_DIRECTORY", str(tmp_path))
+        mock_property_repository_get.return_value = property_data_with_id
+
+        # Action
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/upload-image/",
+            files={"image": ("test_image.png", BytesIO(b"GIF89a not a png"), "image/png")}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+        mock_property_image_repository_add_property_image.assert_not_called()
+
+    def test_upload_image_too_large(
+            self, test_client, tmp_path, mocker, property_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_add_property_image
+    ):
+        """
+            Tests that an image over the size limit is rejected (HTTP status code 413) and its partial file removed.
+        """
+
+        # SetUp
+        mocker.patch("app.services.property_service.settings.IMAGES_DIRECTORY", str(tmp_path))
+        mocker.patch("app.core.validation.settings.MAX_FILE_SIZE_MG", 1)
+        mock_property_repository_get.return_value = property_data_with_id
+        content = b"\xff\xd8\xff\xe0" + b"0" * (2 * 1024 * 1024)
+
+        # Action
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/upload-image/",
+            files={"image": ("test_image.jpg", BytesIO(content), "image/jpeg")}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+        mock_property_image_repository_add_property_image.assert_not_called()
+
+
+class TestPropertyImageBatchUpload:
+    def test_upload_images_reports_each_file(
+            self, test_client, tmp_path, mocker, property_data_with_id, image_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_add_property_images, mock_property_image_repository_find_by_content_hashes,
+            mock_generate_image_derivatives
+    ):
+        """
+            Tests a batch upload with valid and invalid files.
+            - The property is read once, the valid files are stored and inserted with a single call, reusing the
+              ready derivatives of stored contents.
+            - The invalid file is reported as rejected, in its position, without failing the others.
+        """
+
+        # SetUp
+        mocker.patch("app.services.property_service.settings.IMAGES_DIRECTORY", str(tmp_path))
+        first, second = b"\xff\xd8\xff\xe0first image", b"\x89PNG\r\n\x1a\nsecond image"
+        second_hash = hashlib.sha256(second).hexdigest()
+        thumbnail = ImageDerivative(name="thumbnail", file="thumb.jpg", width=10, height=10, format="JPEG")
+        mock_property_repository_get.return_value = property_data_with_id
+        mock_property_image_repository_find_by_content_hashes.return_value = {
+            second_hash: PropertyImageInDB(
+                **{**image_data_with_id, "derivatives": [thumbnail], "derivatives_status": "ready"}
+            )
+        }
+        mock_property_image_repository_add_property_images.side_effect = lambda images: [
+            PropertyImageInDB(**image.dict(), _id=PyObjectId()) for image in images
+        ]
+
+        # Action
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/upload-images/",
+            files=[
+                ("images", ("first.jpg", BytesIO(first), "image/jpeg")),
+                ("images", ("bad.png", BytesIO(b"GIF89a not a png"), "image/png")),
+                ("images", ("second.png", BytesIO(second), "image/png")),
+            ]
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        result = response.json()
+        assert (result["uploaded"], result["rejected"]) == (2, 1)
+        assert [item["filename"] for item in result["items"]] == ["first.jpg", "bad.png", "second.png"]
+        assert [item["status"] for item in result["items"]] == ["uploaded", "rejected", "uploaded"]
+        assert "not a valid 'png'" in result["items"][1]["error"]
+        assert len([path for path in tmp_path.rglob("*") if path.is_file()]) == 2
+        mock_property_repository_get.assert_called_once()
+        mock_property_image_repository_find_by_content_hashes.assert_called_once()
+        images = mock_property_image_repository_add_property_images.call_args[0][0]
+        assert [image.derivatives_status for image in images] == ["pending", "ready"]
+        assert images[1].derivatives == [thumbnail]
+        mock_generate_image_derivatives.assert_called_once()
+
+    def test_upload_images_property_not_found(
+            self, test_client, tmp_path, mocker, mock_property_repository_get,
+            mock_property_image_repository_add_property_images
+    ):
+        """
+            Tests that a batch for a non-existent property is answered with a 404 before any file is stored.
+        """
+
+        # SetUp
+        mocker.patch("app.services.property_service.settings.IMAGES_DIRECTORY", str(tmp_path))
+        mock_property_repository_get.return_value = None
+
+        # Action
+        response = test_client.post(
+            f"/api/v1/property/properties/{PyObjectId()}/upload-images/",
+            files=[("images", ("first.jpg", BytesIO(b"\xff\xd8\xff\xe0image"), "image/jpeg"))]
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert list(tmp_path.rglob("*")) == []
+        mock_property_image_repository_add_property_images.assert_not_called()
+
+    def test_upload_images_too_many_files(self, test_client, mocker, property_data_with_id, mock_property_repository_get):
+        """
+            Tests that a batch over `MAX_BATCH_IMAGES` files is rejected (HTTP status code 400).
+        """
+
+        # SetUp
+        mocker.patch("app.core.validation.settings.MAX_BATCH_IMAGES", 1)
+
+        # Action
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/upload-images/",
+            files=[("images", (f"{index}.jpg", BytesIO(b"\xff\xd8\xff"), "image/jpeg")) for index in range(2)]
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        mock_property_repository_get.assert_not_called()
+
+
+class TestDirectImageUpload:
+    CONTENT_HASH = "ab" * 32
+    STAGED_KEY = f"tmp/{'e' * 32}.jpg"
+
+    @pytest.fixture
+    def s3_storage(self, mocker):
+        storage = mocker.MagicMock()
+        mocker.patch("app.services.property_service.get_image_storage", return_value=storage)
+        return storage
+
+    def test_local_storage_does_not_support_direct_uploads(
+            self, test_client, mocker, property_data_with_id, mock_property_repository_get
+    ):
+        """
+            Tests that asking for a presigned upload with the local image storage is answered with a 400.
+        """
+
+        # SetUp
+        mocker.patch("app.services.property_service.get_image_storage", return_value=LocalImageStorage())
+        mock_property_repository_get.return_value = property_data_with_id
+
+        # Action
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/image-uploads/",
+            json={"filename": "front.jpg", "content_hash": self.CONTENT_HASH, "size": 1024}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_create_image_upload(self, test_client, property_data_with_id, mock_property_repository_get, s3_storage):
+        """
+            Tests that a presigned upload is handed out for a valid image of an existing property.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = property_data_with_id
+        s3_storage.create_upload = mock.AsyncMock(return_value=PropertyImageUploadTicket(
+            key=self.STAGED_KEY, url="https://storage.test/signed", expires_in=60
+        ))
+
+        # Action
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/image-uploads/",
+            json={"filename": "front.JPEG", "content_hash": self.CONTENT_HASH, "size": 1024}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["url"] == "https://storage.test/signed"
+        s3_storage.create_upload.assert_awaited_once_with(self.CONTENT_HASH, "jpeg")
+
+    @pytest.mark.parametrize("upload, status_code", [
+        ({"filename": "front.exe", "content_hash": "ab" * 32, "size": 1024}, HTTPStatus.BAD_REQUEST),
+        ({"filename": "front.jpg", "content_hash": "ab" * 32, "size": 64 * 1024 * 1024},
+         HTTPStatus.REQUEST_ENTITY_TOO_LARGE),
+        ({"filename": "front.jpg", "content_hash": "not-a-hash", "size": 1024}, HTTPStatus.UNPROCESSABLE_ENTITY),
+    ])
+    def test_create_image_upload_validation(
+            self, test_client, property_data_with_id, mock_property_repository_get, s3_storage, upload, status_code
+    ):
+        """
+            Tests that the extension, size and hash are validated before anything is signed.
+        """
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/image-uploads/", json=upload
+        )
+
+        assert response.status_code == status_code
+        s3_storage.create_upload.assert_not_called()
+
+    def test_register_image_upload(
+            self, test_client, property_data_with_id, image_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_add_property_image, mock_property_image_repository_find_by_content_hash,
+            mock_generate_image_derivatives, s3_storage
+    ):
+        """
+            Tests that a verified upload is registered as an image of the property and its derivatives scheduled.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = property_data_with_id
+        mock_property_image_repository_find_by_content_hash.return_value = None
+        mock_property_image_repository_add_property_image.return_value = image_data_with_id
+        s3_storage.verify_upload = mock.AsyncMock(return_value=StoredFile("ab/ab/file.jpg", self.CONTENT_HASH, 1024))
+
+        # Action
+        response = test_client.post(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/image-uploads/complete/",
+            json={"key": self.STAGED_KEY, "filename": "front.jpg", "content_hash": self.CONTENT_HASH}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        s3_storage.verify_upload.assert_awaited_once_with(self.STAGED_KEY, self.CONTENT_HASH, "jpg")
+        mock_property_image_repository_add_property_image.assert_called_once_with(
+            str(property_data_with_id['id']), "ab/ab/file.jpg", True, self.CONTENT_HASH
+        )
+        mock_generate_image_derivatives.assert_called_once_with(image_data_with_id)
+
+    def test_register_image_upload_property_not_found(self, test_client, mock_property_repository_get, s3_storage):
+        """
+            Tests that registering an upload for a non-existent property returns a 404 without touching the storage.
+        """
+        mock_property_repository_get.return_value = None
+
+        response = test_client.post(
+            f"/api/v1/property/properties/{PyObjectId()}/image-uploads/complete/",
+            json={"key": self.STAGED_KEY, "filename": "front.jpg", "content_hash": self.CONTENT_HASH}
+        )
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        s3_storage.verify_upload.assert_not_called()
+
+    def test_serves_image_with_redirect(
+            self, test_client, image_data_with_id, mock_property_image_repository_get, s3_storage
+    ):
+        """
+            Tests that images in the bucket are served with a redirect to a presigned URL.
+        """
+
+        # SetUp
+        mock_property_image_repository_get.return_value = PropertyImageInDB(
+            **{**image_data_with_id, "file": "ab/ab/file.jpg", "content_hash": self.CONTENT_HASH}
+        )
+        s3_storage.download_url.return_value = "https://storage.test/signed-get"
+
+        # Action
+        response = test_client.get(
+            f"/api/v1/property/properties/{image_data_with_id['id_property']}/images/{image_data_with_id['_id']}",
+            allow_redirects=False
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.TEMPORARY_REDIRECT
+        assert response.headers["location"] == "https://storage.test/signed-get"
+        s3_storage.download_url.assert_called_once_with("ab/ab/file.jpg")
+
+
+class TestPropertyImageListing:
+    def test_list_property_images(
+            self, test_client, property_data_with_id, image_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_list_by_property
+    ):
+        """
+            Tests listing the images of a property with the status of their derivatives.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = property_data_with_id
+        thumbnail = {"name": "thumbnail", "file": "app/images/test_image_thumbnail.jpg", "width": 320,
+                     "height": 240, "format": "JPEG"}
+        mock_property_image_repository_list_by_property.return_value = [
+            {**image_data_with_id, "derivatives": [thumbnail], "derivatives_status": "ready"}
+        ]
+
+        # Action
+        response = test_client.get(f"/api/v1/property/properties/{property_data_with_id['id']}/images/")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()[0]["derivatives_status"] == "ready"
+        assert response.json()[0]["derivatives"] == [thumbnail]
+
+    def test_list_images_property_not_found(
+            self, test_client, mock_property_repository_get, mock_property_image_repository_list_by_property
+    ):
+        """
+            Tests that listing the images of an unknown property returns 404.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = None
+
+        # Action
+        response = test_client.get(f"/api/v1/property/properties/{PyObjectId()}/images/")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        mock_property_image_repository_list_by_property.assert_not_called()
+
+
+class TestPropertyImageDeletion:
+    def test_delete_keeps_files_for_the_sweep(
+            self, test_client, tmp_path, property_data_with_id, image_data_with_id,
+            mock_property_image_repository_delete, mock_property_image_repository_count_references
+    ):
+        """
+            Tests that deleting an image only deletes its record: its files are left to the deferred sweep, since an
+            upload of the same content may be registering them at the same time.
+        """
+
+        # SetUp
+        original = tmp_path / "abc.jpg"
+        original.write_bytes(b"image")
+        mock_property_image_repository_delete.return_value = PropertyImageInDB(
+            **{**image_data_with_id, "file": str(original), "content_hash": "abc"}
+        )
+
+        # Action
+        response = test_client.delete(
+            f"/api/v1/property/properties/{property_data_with_id['id']}/images/{image_data_with_id['_id']}"
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert original.exists()
+        mock_property_image_repository_count_references.assert_not_called()
+
+    def test_delete_unknown_image(self, test_client, property_data_with_id, mock_property_image_repository_delete):
+        """
+            Tests that deleting an image that does not exist returns 404.
+        """
+
+        # SetUp
+        mock_property_image_repository_delete.return_value = None
+
+        # Action
+        response = test_client.delete(f"/api/v1/property/properties/{property_data_with_id['id']}/images/{PyObjectId()}")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestPropertyImageServing:
+    CONTENT = bytes(range(256)) * 4
+
+    @pytest.fixture
+    def stored_image(self, tmp_path, image_data_with_id, mock_property_image_repository_get):
+        file_path = tmp_path / "ab" / "cd" / "abcd.jpg"
+        file_path.parent.mkdir(parents=True)
+        file_path.write_bytes(self.CONTENT)
+        thumbnail_path = file_path.parent / "abcd_thumbnail.jpg"
+        thumbnail_path.write_bytes(b"thumbnail")
+        mock_property_image_repository_get.return_value = PropertyImageInDB(**{
+            **image_data_with_id, "file": str(file_path), "content_hash": "abcd", "derivatives_status": "ready",
+            "derivatives": [{"name": "thumbnail", "file": str(thumbnail_path), "width": 1, "height": 1, "format": "JPEG"}]
+        })
+        return f"/api/v1/property/properties/{image_data_with_id['id_property']}/images/{image_data_with_id['_id']}"
+
+    def test_serves_full_file_with_cache_headers(self, test_client, stored_image):
+        """
+            Tests that the image is served with a strong content-based ETag, range support and immutable caching.
+        """
+        response = test_client.get(stored_image)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.content == self.CONTENT
+        assert response.headers["etag"] == '"abcd"'
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-length"] == str(len(self.CONTENT))
+        assert "immutable" in response.headers["cache-control"]
+
+    def test_serves_derivative(self, test_client, stored_image):
+        """
+            Tests that a derivative is served with its own ETag.
+        """
+        response = test_client.get(f"{stored_image}?variant=thumbnail")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.content == b"thumbnail"
+        assert response.headers["etag"] == '"abcd-thumbnail"'
+
+    def test_if_none_match_returns_not_modified(self, test_client, stored_image):
+        """
+            Tests that a matching If-None-Match is answered with 304 and no body.
+        """
+        response = test_client.get(stored_image, headers={"If-None-Match": 'W/"other", "abcd"'})
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == '"abcd"'
+
+    @pytest.mark.parametrize("range_header, start, end", [
+        ("bytes=0-99", 0, 99), ("bytes=1000-", 1000, 1023), ("bytes=-24", 1000, 1023), ("bytes=1000-5000", 1000, 1023)
+    ])
+    def test_range_request(self, test_client, stored_image, range_header, start, end):
+        """
+            Tests that single byte ranges are answered with 206 and the requested slice.
+        """
+        response = test_client.get(stored_image, headers={"Range": range_header})
+
+        assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+        assert response.content == self.CONTENT[start:end + 1]
+        assert response.headers["content-range"] == f"bytes {start}-{end}/{len(self.CONTENT)}"
+
+    def test_unsatisfiable_range(self, test_client, stored_image):
+        """
+            Tests that a range beyond the end of the file is answered with 416.
+        """
+        response = test_client.get(stored_image, headers={"Range": "bytes=5000-"})
+
+        assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        assert response.headers["content-range"] == f"bytes */{len(self.CONTENT)}"
+
+    def test_if_range_mismatch_serves_full_file(self, test_client, stored_image):
+        """
+            Tests that a Range with a stale If-Range validator is ignored.
+        """
+        response = test_client.get(stored_image, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.content == self.CONTENT
+
+    def test_unknown_image(self, test_client, image_data_with_id, mock_property_image_repository_get):
+        """
+            Tests that an unknown image is answered with 404.
+        """
+        mock_property_image_repository_get.return_value = None
+
+        response = test_client.get(
+            f"/api/v1/property/properties/{image_data_with_id['id_property']}/images/{image_data_with_id['_id']}"
+        )
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestPropertyCache:
+    def test_reads_are_served_from_cache_until_a_write(
+            self, test_client, property_data_with_id, mock_property_repository_get, mock_property_repository_update,
+            mock_property_image_repository_list_by_property
+    ):
+        """
+            Tests that repeated reads of a property hit the cache and that a price change invalidates it.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = property_data_with_id
+        mock_property_repository_update.return_value = {**property_data_with_id, "price": 10.0}
+        mock_property_image_repository_list_by_property.return_value = []
+        images_url = f"/api/v1/property/properties/{property_data_with_id['id']}/images/"
+
+        # Action
+        test_client.get(images_url)
+        test_client.get(images_url)
+        reads_before_write = mock_property_repository_get.call_count
+        test_client.put(f"/api/v1/property/change-price/{property_data_with_id['id']}?price_in=10")
+        test_client.get(images_url)
+
+        # Assertion
+        assert reads_before_write == 1
+        assert mock_property_repository_get.call_count == 2
+        stats = test_client.get("/api/v1/property/cache/stats").json()
+        assert stats["hits"] >= 2
+        assert stats["invalidations"] >= 1
+
+
+class TestBulkPriceChange:
+    def test_bulk_change_price_by_items(
+            self, test_client, property_data_with_id, mock_property_repository_bulk_update_prices
+    ):
+        """
+            Tests a bulk price update given as explicit items.
+        """
+
+        # SetUp
+        property_id = str(property_data_with_id["id"])
+        mock_property_repository_bulk_update_prices.return_value = BulkPriceUpdateResult(
+            matched=1, modified=1, items=[{"property_id": property_id, "status": "updated"}]
+        )
+
+        # Action
+        response = test_client.put(
+            "/api/v1/property/bulk-change-price/", json={"items": [{"property_id": property_id, "price": 3500}]}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["items"] == [{"property_id": property_id, "status": "updated"}]
+        changes, batch_size = mock_property_repository_bulk_update_prices.call_args[0]
+        assert changes[0].price == 3500
+
+    def test_bulk_change_price_by_filter(self, test_client, mock_property_repository_adjust_prices):
+        """
+            Tests a bulk price update given as a filter plus a percentage adjustment.
+        """
+
+        # SetUp
+        mock_property_repository_adjust_prices.return_value = BulkPriceUpdateResult(matched=10, modified=10)
+
+        # Action
+        response = test_client.put("/api/v1/property/bulk-change-price/", json={
+            "filter": {"min_year": 2000}, "adjustment": {"type": "percentage", "value": 5}
+        })
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["modified"] == 10
+        filters, adjustment = mock_property_repository_adjust_prices.call_args[0]
+        assert filters.min_year == 2000 and adjustment.value == 5
+
+    def test_bulk_change_price_requires_one_mode(self, test_client):
+        """
+            Tests that a body mixing items and an adjustment is rejected (HTTP status code 422).
+        """
+        response = test_client.put("/api/v1/property/bulk-change-price/", json={
+            "items": [], "adjustment": {"type": "absolute", "value": 5}
+        })
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    def test_bulk_change_price_invalidates_cache(
+            self, test_client, property_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_list_by_property, mock_property_repository_adjust_prices
+    ):
+        """
+            Tests that a filtered price adjustment empties the property cache.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = property_data_with_id
+        mock_property_image_repository_list_by_property.return_value = []
+        mock_property_repository_adjust_prices.return_value = BulkPriceUpdateResult()
+        images_url = f"/api/v1/property/properties/{property_data_with_id['id']}/images/"
+
+        # Action
+        test_client.get(images_url)
+        test_client.put("/api/v1/property/bulk-change-price/", json={
+            "filter": {}, "adjustment": {"type": "absolute", "value": 100}
+        })
+        test_client.get(images_url)
+
+        # Assertion
+        assert mock_property_repository_get.call_count == 2
+
+
+class TestSalesStatistics:
+    def test_create_trace_refreshes_statistics(
+            self, test_client, property_data_with_id, mock_property_repository_get,
+            mock_property_trace_repository_create, mock_property_trace_repository_refresh_rollups
+    ):
+        """
+            Tests that registering a sale stores the trace and refreshes the statistics of its groups afterwards.
+        """
+
+        # SetUp
+        property_id = str(property_data_with_id["id"])
+        mock_property_repository_get.return_value = PropertyInDB(**property_data_with_id)
+        trace = PropertyTraceInDB(
+            id=str(PyObjectId()), date_sale="2023-05-10", name="venta_1", value=250000, tax=5000, id_property=property_id
+        )
+        mock_property_trace_repository_create.return_value = trace
+
+        # Action
+        response = test_client.post("/api/v1/property/create-trace/", json={
+            "date_sale": "2023-05-10", "name": "venta_1", "value": 250000, "tax": 5000, "id_property": property_id
+        })
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["_id"] == trace.id
+        mock_property_trace_repository_refresh_rollups.assert_called_once_with(trace)
+
+    def test_create_trace_property_not_found(
+            self, test_client, mock_property_repository_get, mock_property_trace_repository_create
+    ):
+        """
+            Tests that a sale of an unknown property is rejected with 404 and not stored.
+        """
+
+        # SetUp
+        mock_property_repository_get.side_effect = ValueError("No property found")
+
+        # Action
+        response = test_client.post("/api/v1/property/create-trace/", json={
+            "date_sale": "2023-05-10", "name": "venta_1", "value": 250000, "tax": 5000, "id_property": str(PyObjectId())
+        })
+
+        # Assertion
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        mock_property_trace_repository_create.assert_not_called()
+
+    def test_get_sales_statistics(self, test_client, mock_property_trace_repository_get_rollups):
+        """
+            Tests that the statistics of the requested dimension are returned.
+        """
+
+        # SetUp
+        mock_property_trace_repository_get_rollups.return_value = [SalesRollup(
+            dimension="price_band", key=100000, count=3, total_value=600000, average_value=200000,
+            median_value=180000, total_tax=12000
+        )]
+
+        # Action
+        response = test_client.get("/api/v1/property/statistics/sales", params={"group_by": "price_band"})
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()[0]["median_value"] == 180000
+        mock_property_trace_repository_get_rollups.assert_called_once_with("price_band")
+
+    def test_get_sales_statistics_invalid_dimension(self, test_client):
+        """
+            Tests that unknown groupings are rejected.
+        """
+
+        # Action
+        response = test_client.get("/api/v1/property/statistics/sales", params={"group_by": "city"})
+
+        # Assertion
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+class TestPropertyDetail:
+    def test_get_property_without_expand(self, test_client, property_data_with_id, mock_property_repository_get):
+        """
+            Tests that a plain property is returned without the expandable relations.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = PropertyInDB(**property_data_with_id)
+
+        # Action
+        response = test_client.get(f"/api/v1/property/{property_data_with_id['id']}")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["_id"] == str(property_data_with_id["id"])
+        assert "owner" not in response.json()
+
+    def test_get_property_expanded(
+            self, test_client, property_data_with_id, image_data_with_id, mock_property_repository_get_expanded
+    ):
+        """
+            Tests that the requested relations are embedded, and a missing owner is returned as null.
+        """
+
+        # SetUp
+        mock_property_repository_get_expanded.return_value = PropertyDetail(
+            **property_data_with_id, owner=None, images=[PropertyImageInDB(**image_data_with_id)]
+        )
+
+        # Action
+        response = test_client.get(f"/api/v1/property/{property_data_with_id['id']}?expand=owner,images,owner")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        body = response.json()
+        assert body["owner"] is None
+        assert body["images"][0]["_id"] == str(image_data_with_id["_id"])
+        assert "traces" not in body
+        mock_property_repository_get_expanded.assert_called_once_with(
+            str(property_data_with_id["id"]), ["owner", "images"]
+        )
+
+    def test_get_property_not_found(self, test_client, mock_property_repository_get_expanded):
+        """
+            Tests that an unknown property returns 404.
+        """
+
+        # SetUp
+        mock_property_repository_get_expanded.side_effect = ValueError("No property found")
+
+        # Action
+        response = test_client.get(f"/api/v1/property/{PyObjectId()}?expand=traces")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_get_property_invalid_expand(self, test_client):
+        """
+            Tests that unknown relations are rejected.
+        """
+
+        # Action
+        response = test_client.get(f"/api/v1/property/{PyObjectId()}?expand=owner,city")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+class TestPropertyExport:
+    def test_export_csv_gzip(self, test_client, property_data_with_id, mock_property_repository_export_cursor):
+        """
+            Tests that the catalog is streamed as a gzip compressed CSV download.
+        """
+
+        # SetUp
+        async def cursor():
+            yield {**property_data_with_id, "_id": property_data_with_id["id"]}
+        mock_property_repository_export_cursor.return_value = cursor()
+
+        # Action
+        response = test_client.get("/api/v1/property/export", params={"format": "csv", "gzip": "true"})
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-type"] == "application/gzip"
+        assert 'filename="properties.csv.gz"' in response.headers["content-disposition"]
+        lines = gzip.decompress(response.content).decode().splitlines()
+        assert lines[0].startswith("_id,name")
+        assert lines[1].startswith(str(property_data_with_id["id"]))
+        mock_property_repository_export_cursor.assert_called_once_with(False, settings.EXPORT_BATCH_SIZE, raw=False)
+
+
+class TestNearbyProperties:
+    def test_nearby_by_radius_with_filters(self, test_client, property_data_with_id, mock_property_repository_nearby):
+        """
+            Tests that properties around a point are returned with their distance, using the filters and radius.
+        """
+
+        # SetUp
+        location = {"type": "Point", "coordinates": [-74.05, 4.67]}
+        mock_property_repository_nearby.return_value = [
+            PropertyNearby(**property_data_with_id, location=location, distance=120.5)
+        ]
+
+        # Action
+        response = test_client.get(
+            "/api/v1/property/nearby", params={"lng": -74.05, "lat": 4.67, "radius": 2000, "max_price": 5000}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()[0]["distance"] == 120.5
+        assert response.json()[0]["location"] == location
+        filters, point, radius, bbox, limit = mock_property_repository_nearby.call_args[0]
+        assert filters.max_price == 5000
+        assert point.coordinates == [-74.05, 4.67]
+        assert (radius, bbox, limit) == (2000, None, 50)
+
+    def test_nearby_by_bbox_orders_from_center(self, test_client, mock_property_repository_nearby):
+        """
+            Tests that a bounding box without a point is searched from its center.
+        """
+
+        # SetUp
+        mock_property_repository_nearby.return_value = []
+
+        # Action
+        response = test_client.get("/api/v1/property/nearby", params={"bbox": "-74.1,4.6,-74.0,4.7"})
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        _, point, _, bbox, _ = mock_property_repository_nearby.call_args[0]
+        assert point.coordinates == pytest.approx([-74.05, 4.65])
+        assert bbox == (-74.1, 4.6, -74.0, 4.7)
+
+    @pytest.mark.parametrize("params", [{}, {"lng": 1}, {"bbox": "1,1,0,0"}])
+    def test_nearby_requires_a_valid_area(self, test_client, params, mock_property_repository_nearby):
+        """
+            Tests that a point (both coordinates) or a valid bounding box is required.
+        """
+
+        # Action
+        response = test_client.get("/api/v1/property/nearby", params=params)
+
+        # Assertion
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        mock_property_repository_nearby.assert_not_called()
+
+    def test_create_property_rejects_invalid_location(self, test_client, property_create_data):
+        """
+            Tests that a location outside the valid coordinate ranges is rejected.
+        """
+
+        # Action
+        response = test_client.post("/api/v1/property/create-property/", json={
+            **property_create_data, "location": {"type": "Point", "coordinates": [200, 4.6]}
+        })
+
+        # Assertion
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+class TestPropertySearch:
+    def test_search_returns_ranked_page(self, test_client, property_data_with_id, mock_property_repository_search):
+        """
+            Tests that a search returns the hits with their relevance and a cursor for the next page.
+        """
+
+        # SetUp
+        hits = [
+            PropertySearchHit(**{**property_data_with_id, "id": str(PyObjectId())}, score=score)
+            for score in (2.5, 1.5, 1.0)
+        ]
+        mock_property_repository_search.return_value = hits
+
+        # Action
+        response = test_client.get("/api/v1/property/search", params={"q": "casa", "max_price": 5000, "limit": 2})
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        body = response.json()
+        assert [item["score"] for item in body["items"]] == [2.5, 1.5]
+        text, filters, limit, after = mock_property_repository_search.call_args[0]
+        assert (text, filters.max_price, limit, after) == ("casa", 5000, 3, None)
+
+        # Action (next page)
+        test_client.get("/api/v1/property/search", params={"q": "casa", "limit": 2, "cursor": body["next_cursor"]})
+
+        # Assertion
+        assert mock_property_repository_search.call_args[0][3] == {"_id": hits[1].id, "score": 1.5}
+
+    @pytest.mark.parametrize("params, status", [
+        ({"q": ""}, HTTPStatus.UNPROCESSABLE_ENTITY),
+        ({"q": "   "}, HTTPStatus.BAD_REQUEST),
+        ({"q": "casa", "cursor": "bad"}, HTTPStatus.BAD_REQUEST),
+    ])
+    def test_search_invalid_request(self, test_client, params, status, mock_property_repository_search):
+        """
+            Tests that empty searches and invalid cursors are rejected.
+        """
+
+        # Action
+        response = test_client.get("/api/v1/property/search", params=params)
+
+        # Assertion
+        assert response.status_code == status
+        mock_property_repository_search.assert_not_called()
+
+
+class TestPropertySync:
+    def test_sync_returns_summary_and_invalidates_cache(
+            self, test_client, property_create_data, property_data_with_id, mock_property_repository_get,
+            mock_property_image_repository_list_by_property, mock_property_repository_sync
+    ):
+        """
+            Tests that a synchronization returns the summary of the delta and empties the property cache when
+            properties were updated.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = property_data_with_id
+        mock_property_image_repository_list_by_property.return_value = []
+        mock_property_repository_sync.return_value = PropertySyncResult(inserted=1, updated=1, unchanged=3)
+        images_url = f"/api/v1/property/properties/{property_data_with_id['id']}/images/"
+
+        # Action
+        test_client.get(images_url)
+        response = test_client.post("/api/v1/property/sync/", json={"items": [property_create_data]})
+        test_client.get(images_url)
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {"inserted": 1, "updated": 1, "unchanged": 3, "duplicates": 0}
+        items, batch_size, dry_run = mock_property_repository_sync.call_args[0]
+        assert [item.code_internal for item in items] == [property_create_data["code_internal"]]
+        assert (batch_size, dry_run) == (settings.BULK_WRITE_BATCH_SIZE, False)
+        assert mock_property_repository_get.call_count == 2
+
+    def test_create_property_duplicated_code(self, test_client, property_create_data, mock_property_repository_create):
+        """
+            Tests that creating a property with an internal code that already exists is a conflict.
+        """
+
+        # SetUp
+        mock_property_repository_create.side_effect = DuplicateKeyError("E11000 duplicate key")
+
+        # Action
+        response = test_client.post("/api/v1/property/create-property/", json=property_create_data)
+
+        # Assertion
+        assert response.status_code == HTTPStatus.CONFLICT
+
+
+class TestPropertyEvents:
+    def test_streams_events_resuming_from_last_event_id(self, test_client, mocker):
+        """
+            Tests that the feed is served as server-sent events, resumed from the `Last-Event-ID` header and limited
+            to the requested types (resets are always sent).
+        """
+
+        # SetUp
+        events = [
+            PropertyEvent(id="1", type="reset", time=datetime(2024, 1, 1)),
+            PropertyEvent(id="2", type="property_created", property_id="a", price=1.0, time=datetime(2024, 1, 1)),
+            None,
+            PropertyEvent(id="3", type="price_changed", property_id="a", price=2.0, time=datetime(2024, 1, 1)),
+        ]
+
+        async def feed(repository, last_event_id):
+            for event in events:
+                yield event
+        stream_events = mocker.patch("app.api.api_v1.endpoints.property.stream_events", side_effect=feed)
+
+        # Action
+        response = test_client.get(
+            "/api/v1/property/events", params={"types": "price_changed"}, headers={"Last-Event-ID": "0"}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert stream_events.call_args.args[1] == "0"
+        blocks = response.text.split("\n\n")
+        assert blocks[0].startswith("id: 1\nevent: reset\n")
+        assert blocks[1] == ": keep-alive"
+        assert blocks[2].startswith("id: 3\nevent: price_changed\ndata: ")
+
+
+class TestConditionalRequests:
+    def test_get_property_etag_and_not_modified(self, test_client, property_data_with_id, mock_property_repository_get):
+        """
+            Tests that a property is served with an ETag from its version, and that sending it back in
+            `If-None-Match` returns 304 without a body.
+        """
+
+        # SetUp
+        property_id = property_data_with_id["id"]
+        mock_property_repository_get.return_value = PropertyInDB(**property_data_with_id, version=3)
+
+        # Action
+        first = test_client.get(f"/api/v1/property/{property_id}")
+        second = test_client.get(f"/api/v1/property/{property_id}", headers={"If-None-Match": first.headers["etag"]})
+
+        # Assertion
+        assert first.status_code == HTTPStatus.OK
+        assert first.headers["etag"] == f'"{property_id}-3"'
+        assert second.status_code == HTTPStatus.NOT_MODIFIED
+        assert second.content == b""
+
+    def test_change_price_if_match(
+            self, test_client, property_data_with_id, mock_property_repository_get, mock_property_repository_update
+    ):
+        """
+            Tests that the version in `If-Match` is passed to the update and the new ETag is returned.
+        """
+
+        # SetUp
+        property_id = property_data_with_id["id"]
+        mock_property_repository_get.return_value = PropertyInDB(**property_data_with_id, version=3)
+        mock_property_repository_update.return_value = PropertyInDB(**{**property_data_with_id, "price": 10}, version=4)
+
+        # Action
+        response = test_client.put(
+            f"/api/v1/property/change-price/{property_id}?price_in=10", headers={"If-Match": f'"{property_id}-3"'}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["etag"] == f'"{property_id}-4"'
+        assert mock_property_repository_update.call_args[0][2] == 3
+
+    @pytest.mark.parametrize("if_match", ['"another-3"', "garbage", '"{id}-2"', 'W/"{id}-2"'])
+    def test_change_price_precondition_failed(
+            self, if_match, test_client, property_data_with_id, mock_property_repository_get,
+            mock_property_repository_update
+    ):
+        """
+            Tests that a foreign or stale ETag in `If-Match` is answered with 412.
+        """
+
+        # SetUp
+        property_id = property_data_with_id["id"]
+        mock_property_repository_get.return_value = PropertyInDB(**property_data_with_id, version=3)
+        mock_property_repository_update.side_effect = PreconditionFailed("stale")
+
+        # Action
+        response = test_client.put(
+            f"/api/v1/property/change-price/{property_id}?price_in=10",
+            headers={"If-Match": if_match.format(id=property_id)}
+        )
+
+        # Assertion
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+
+    def test_change_price_with_etag_of_compressed_read(
+            self, test_client, property_data_with_id, mock_property_repository_get, mock_property_repository_update
+    ):
+        """
+            Tests that the weak ETag of a gzip compressed read is accepted by `If-Match` to change the price.
+        """
+
+        # SetUp
+        property_id = property_data_with_id["id"]
+        stored = PropertyInDB(**{**property_data_with_id, "address": "carrera 1 " * 200}, version=3)
+        mock_property_repository_get.return_value = stored
+        mock_property_repository_update.return_value = PropertyInDB(**{**stored.dict(), "price": 10, "version": 4})
+
+        # Action
+        read = test_client.get(f"/api/v1/property/{property_id}", headers={"Accept-Encoding": "gzip"})
+        response = test_client.put(
+            f"/api/v1/property/change-price/{property_id}?price_in=10", headers={"If-Match": read.headers["etag"]}
+        )
+
+        # Assertion
+        assert read.headers["content-encoding"] == "gzip"
+        assert read.headers["etag"] == f'W/"{property_id}-3"'
+        assert response.status_code == HTTPStatus.OK
+        assert mock_property_repository_update.call_args[0][2] == 3
+
+    def test_large_listing_is_compressed(self, test_client, property_data_with_id, mock_property_repository_list):
+        """
+            Tests that a listing larger than the threshold is gzip compressed for clients that accept it.
+        """
+
+        # SetUp
+        mock_property_repository_list.return_value = [PropertyInDB(**property_data_with_id)] * 20
+
+        # Action
+        response = test_client.get("/api/v1/property/", headers={"Accept-Encoding": "gzip"})
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["items"]) == 20
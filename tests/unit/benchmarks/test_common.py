@@ -0,0 +1,20 @@
+from benchmarks.common import synthetic_properties
+
+
+class TestSyntheticProperties:
+    def test_internal_codes_are_unique_across_calls(self):
+        """
+            Tests that calls with the same seed, like the seeded collection and the documents created by the
+            suite, never generate the same internal code (it has a unique index).
+        """
+
+        # SetUp
+        seeded = list(synthetic_properties(100, seed=1000))
+
+        # Action
+        created = list(synthetic_properties(100, seed=1000))
+
+        # Assertion
+        codes = [document["code_internal"] for document in seeded + created]
+        assert len(set(codes)) == len(codes)
+        assert [document["price"] for document in seeded] == [document["price"] for document in created]
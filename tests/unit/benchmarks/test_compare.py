@@ -0,0 +1,44 @@
+from benchmarks.compare import compare
+
+
+class TestCompare:
+    def test_flags_regressions_and_improvements(self):
+        """
+            Tests that slower percentiles and lower throughput beyond the threshold are flagged as regressions,
+            and the opposite as improvements.
+        """
+
+        # SetUp
+        baseline = {
+            "http.get_property.c8": {"p95_ms": 10.0, "throughput_rps": 1000.0},
+            "repository.get.1000": {"p95_ms": 1.0},
+            "repository.get.10000": {"p95_ms": 1.0},
+        }
+        candidate = {
+            "http.get_property.c8": {"p95_ms": 10.5, "throughput_rps": 800.0},
+            "repository.get.1000": {"p95_ms": 1.5},
+            "repository.update.1000": {"p95_ms": 1.0},
+        }
+
+        # Action
+        rows = compare(baseline, candidate, threshold=10)
+
+        # Assertion
+        statuses = {(row["benchmark"], row["metric"]): row["status"] for row in rows}
+        assert statuses == {
+            ("http.get_property.c8", "p95_ms"): "ok",
+            ("http.get_property.c8", "throughput_rps"): "regression",
+            ("repository.get.1000", "p95_ms"): "regression",
+        }
+
+    def test_improvement(self):
+        """
+            Tests that a latency drop beyond the threshold is reported as an improvement.
+        """
+
+        # Action
+        rows = compare({"repository.get.1000": {"p99_ms": 2.0}}, {"repository.get.1000": {"p99_ms": 1.0}})
+
+        # Assertion
+        assert rows[0]["status"] == "improvement"
+        assert rows[0]["change_pct"] == -50.0
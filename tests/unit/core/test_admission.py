@@ -0,0 +1,130 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from app.core.admission import AdmissionControlMiddleware, AdmissionLimiter, route_class
+from app.core.metrics import ADMISSION_REJECTED
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("GET", "/api/v1/property/", "read"),
+    ("HEAD", "/api/v1/property/123", "read"),
+    ("PUT", "/api/v1/property/change-price/123", "write"),
+    ("POST", "/api/v1/property/properties/123/upload-image/", "upload"),
+    ("GET", "/metrics", None),
+    ("GET", "/api/v1/property/events", None),
+])
+def test_route_class(method, path, expected):
+    """
+        Tests the classification of requests in reads, writes, uploads and exempt paths.
+    """
+    assert route_class(method, path) == expected
+
+
+class TestAdmissionLimiter:
+    def test_waiters_take_released_slots_in_order(self):
+        """
+            Tests that requests over the limit wait in FIFO order and get the slots as they are released.
+        """
+
+        # SetUp
+        limiter = AdmissionLimiter(limit=1, queue_size=2, timeout=1)
+        admitted = []
+
+        async def request(name):
+            assert await limiter.acquire() is None
+            admitted.append(name)
+
+        async def run():
+            await limiter.acquire()
+            waiters = [asyncio.create_task(request(name)) for name in ("first", "second")]
+            await asyncio.sleep(0)
+            rejected = await limiter.acquire()
+            limiter.release()
+            await asyncio.sleep(0)
+            limiter.release()
+            await asyncio.gather(*waiters)
+            return rejected
+
+        # Action
+        rejected = asyncio.run(run())
+
+        # Assertion
+        assert rejected == "queue_full"
+        assert admitted == ["first", "second"]
+        assert limiter.in_flight == 1 and limiter.waiting == 0
+
+    def test_wait_deadline(self):
+        """
+            Tests that a request that does not get a slot before the deadline is rejected and leaves the queue.
+        """
+
+        # SetUp
+        limiter = AdmissionLimiter(limit=1, queue_size=1, timeout=0.01)
+
+        async def run():
+            await limiter.acquire()
+            return await limiter.acquire()
+
+        # Action
+        rejected = asyncio.run(run())
+
+        # Assertion
+        assert rejected == "timeout"
+        assert limiter.waiting == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+
+class TestAdmissionControlMiddleware:
+    def test_sheds_excess_requests_with_retry_after(self):
+        """
+            Tests that, with the slot taken and no queue, a request is answered with a 503 and `Retry-After`
+            without reaching the application, while exempt paths still go through.
+        """
+
+        # SetUp
+        release = asyncio.Event()
+        reached = []
+
+        async def app(scope, receive, send):
+            reached.append(scope["path"])
+            if scope["path"] == "/slow":
+                await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        middleware = AdmissionControlMiddleware(app, {"read": {"limit": 1, "queue": 0}}, timeout=1, retry_after=7)
+        rejected_before = ADMISSION_REJECTED.value("read", "queue_full")
+
+        async def call(path):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            async def receive():
+                return {"type": "http.request"}
+
+            scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b""}
+            await middleware(scope, receive, send)
+            return messages[0]
+
+        async def run():
+            slow = asyncio.create_task(call("/slow"))
+            await asyncio.sleep(0)
+            shed = await call("/fast")
+            exempt = await call("/metrics")
+            release.set()
+            return shed, exempt, await slow
+
+        # Action
+        shed, exempt, slow = asyncio.run(run())
+
+        # Assertion
+        assert shed["status"] == HTTPStatus.SERVICE_UNAVAILABLE
+        assert (b"retry-after", b"7") in shed["headers"]
+        assert exempt["status"] == slow["status"] == HTTPStatus.OK
+        assert reached == ["/slow", "/metrics"]
+        assert ADMISSION_REJECTED.value("read", "queue_full") == rejected_before + 1
@@ -0,0 +1,188 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import LRUCache, ReadThroughCache, SharedCacheBackend
+from app.repositories import cached_property
+from app.models.py_object_id import PyObjectId
+from app.schemas import PropertyInDB
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """
+    Local stand-in of the shared backend client, with the subset of the redis.asyncio interface used by the cache.
+    """
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        """
+            Tests that the least recently used entry is evicted when the cache is full.
+        """
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.get("b") != 2
+        assert cache.evictions == 1
+
+    def test_entries_expire(self):
+        """
+            Tests that entries older than the TTL are not served.
+        """
+        clock = FakeClock()
+        cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+        cache.set("a", 1)
+        clock.now = 6
+
+        assert cache.get("a") != 1
+        assert cache.expirations == 1
+
+
+class TestReadThroughCache:
+    def test_concurrent_misses_are_coalesced(self):
+        """
+            Tests that concurrent misses for the same key run the loader only once.
+        """
+        cache = ReadThroughCache(LRUCache(maxsize=10, ttl=60))
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(10)))
+
+        assert asyncio.run(scenario()) == ["value"] * 10
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 9
+        assert cache.stats()["misses"] == 1
+
+    def test_loader_errors_reach_every_waiter_and_are_not_cached(self):
+        """
+            Tests that a failing load is propagated to the coalesced waiters and retried on the next read.
+        """
+        cache = ReadThroughCache(LRUCache(maxsize=10, ttl=60))
+
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise ValueError("not found")
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(cache.local) == 0
+
+    def test_invalidation_during_load_is_not_overwritten(self):
+        """
+            Tests that a value loaded before a write is served to its caller but not cached.
+        """
+        cache = ReadThroughCache(LRUCache(maxsize=10, ttl=60))
+
+        async def scenario():
+            async def loader():
+                await cache.invalidate("key")
+                return "stale"
+
+            value = await cache.get_or_load("key", loader)
+            return value, cache.local.get("key")
+
+        value, cached = asyncio.run(scenario())
+        assert value == "stale"
+        assert cached != "stale"
+
+    def test_shared_tier(self):
+        """
+            Tests that a value loaded by one worker is served from the shared tier to another one.
+        """
+        redis = FakeRedis()
+        property_in_db = PropertyInDB(_id=PyObjectId(), name="n", address="a", price=1, code_internal="c", year=1,
+                                      id_owner="o")
+
+        def worker_cache():
+            return ReadThroughCache(LRUCache(maxsize=10, ttl=60), SharedCacheBackend(redis, PropertyInDB, 60, "p:"))
+
+        async def loader():
+            return property_in_db
+
+        async def fail():
+            pytest.fail("The shared tier should have been used")
+
+        asyncio.run(worker_cache().get_or_load("1", loader))
+        other_worker = worker_cache()
+        assert asyncio.run(other_worker.get_or_load("1", fail)) == property_in_db
+        assert other_worker.stats()["shared_hits"] == 1
+
+        asyncio.run(other_worker.invalidate("1"))
+        assert redis.data == {}
+
+    def test_clear_empties_the_shared_tier(self):
+        """
+            Tests that a write that empties the cache of one worker also hides the shared entries from the others.
+        """
+        redis = FakeRedis()
+        property_in_db = PropertyInDB(_id=PyObjectId(), name="n", address="a", price=1, code_internal="c", year=1,
+                                      id_owner="o")
+        updated = property_in_db.copy(update={"price": 2})
+
+        def worker_cache():
+            return ReadThroughCache(LRUCache(maxsize=0, ttl=60), SharedCacheBackend(redis, PropertyInDB, 60, "p:"))
+
+        async def scenario():
+            async def load(value):
+                return value
+
+            await worker_cache().get_or_load("1", lambda: load(property_in_db))
+            await worker_cache().clear()
+            return await worker_cache().get_or_load("1", lambda: load(updated))
+
+        assert asyncio.run(scenario()).price == 2
+        assert redis.data["p:generation"] == 1
+
+
+class TestBuildPropertyCache:
+    def test_local_tier_enabled_by_default(self):
+        """
+            Tests that the cache built from the default settings keeps the in-process tier, with its short TTL.
+        """
+
+        # Action
+        cache = cached_property.build_property_cache()
+        cache.local.set("key", "value")
+
+        # Assertion
+        assert cache.local.maxsize == cached_property.settings.PROPERTY_CACHE_SIZE > 0
+        assert cache.local.ttl == cached_property.settings.PROPERTY_CACHE_LOCAL_TTL
+        assert cache.local.get("key") == "value"
+        assert cache.shared is None
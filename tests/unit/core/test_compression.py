@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+
+import pytest
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+
+
+def run_app(body_chunks, content_type=b"application/json", accept_encoding=b"gzip", extra_headers=()):
+    """
+    Runs the middleware around an app sending `body_chunks` and returns the messages it sends.
+    """
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type), *extra_headers]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for index, chunk in enumerate(body_chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(body_chunks) - 1})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding)]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope, receive, send))
+    return messages[0], b"".join(message.get("body", b"") for message in messages[1:])
+
+
+@pytest.mark.parametrize("header, brotli, expected", [
+    ("gzip, deflate, br", True, "br"),
+    ("gzip, deflate, br", False, "gzip"),
+    ("br;q=0, gzip;q=0.5", True, "gzip"),
+    ("identity", True, None),
+    ("*", False, "gzip"),
+    ("", False, None),
+])
+def test_negotiate_encoding(header, brotli, expected, mocker):
+    """
+        Tests that brotli is preferred when installed and accepted, then gzip, honouring q=0.
+    """
+    mocker.patch.object(compression, "get_brotli", return_value=object() if brotli else None)
+
+    assert negotiate_encoding(header) == expected
+
+
+class TestCompressionMiddleware:
+    def test_compresses_large_body_and_weakens_etag(self):
+        """
+            Tests that a body over the threshold is gzip compressed with its headers updated.
+        """
+
+        # SetUp
+        body = b'{"items": [' + b'"value",' * 100 + b'""]}'
+
+        # Action
+        start, sent = run_app([body], extra_headers=[(b"etag", b'"abc-1"'), (b"content-length", b"%d" % len(body))])
+
+        # Assertion
+        headers = dict(start["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert headers[b"etag"] == b'W/"abc-1"'
+        assert headers[b"vary"] == b"Accept-Encoding"
+        assert int(headers[b"content-length"]) == len(sent)
+        assert gzip.decompress(sent) == body
+
+    def test_streams_compressed_chunks(self):
+        """
+            Tests that a streamed body is compressed chunk by chunk, without a Content-Length.
+        """
+
+        # SetUp
+        chunks = [b"line %d\n" % number * 20 for number in range(5)]
+
+        # Action
+        start, sent = run_app(chunks, content_type=b"application/x-ndjson")
+
+        # Assertion
+        assert b"content-length" not in dict(start["headers"])
+        assert gzip.decompress(sent) == b"".join(chunks)
+
+    @pytest.mark.parametrize("chunks, content_type, accept_encoding", [
+        ([b"{}"], b"application/json", b"gzip"),
+        ([b"x" * 500], b"image/jpeg", b"gzip"),
+        ([b"data: x\n\n" * 100], b"text/event-stream", b"gzip"),
+        ([b"x" * 500], b"application/json", b"identity"),
+    ])
+    def test_leaves_response_untouched(self, chunks, content_type, accept_encoding):
+        """
+            Tests that small bodies, non text types, event streams and clients without gzip are not compressed.
+        """
+        start, sent = run_app(chunks, content_type=content_type, accept_encoding=accept_encoding)
+
+        assert b"content-encoding" not in dict(start["headers"])
+        assert sent == b"".join(chunks)
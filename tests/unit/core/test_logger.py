@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from app.core.logger import (
+    JSONFormatter, LazyQueueHandler, RequestContextFilter, RequestContextMiddleware, request_id_var,
+    request_sampled_var
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def queued_logger(name):
+    """
+    Builds a logger wired like the application: lazy queue handler with the request filter, and a listener that
+    formats the records as JSON into a list.
+    """
+    records = queue.SimpleQueue()
+    handler = LazyQueueHandler(records)
+    handler.addFilter(RequestContextFilter())
+    output = ListHandler()
+    output.setFormatter(JSONFormatter())
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    return logger, QueueListener(records, output), output
+
+
+class Expensive:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "expensive"
+
+
+class TestQueueLogging:
+    def test_records_are_json_with_request_id(self):
+        """
+            Tests that a record logged during a request is written as a JSON line with its request ID and extra
+            fields.
+        """
+
+        # SetUp
+        logger, listener, output = queued_logger("test.logger.json")
+        token = request_id_var.set("req-1")
+
+        # Action
+        listener.start()
+        logger.info("Property %s created", "abc", extra={"price": 1000})
+        request_id_var.reset(token)
+        listener.stop()
+
+        # Assertion
+        entry = json.loads(output.lines[0])
+        assert entry["message"] == "Property abc created"
+        assert entry["request_id"] == "req-1"
+        assert entry["price"] == 1000
+        assert entry["level"] == "INFO" and entry["logger"] == "test.logger.json"
+
+    def test_message_formatted_off_the_calling_thread(self):
+        """
+            Tests that the arguments are not formatted when logging, only by the listener, and never for records
+            below the configured level.
+        """
+
+        # SetUp
+        logger, listener, output = queued_logger("test.logger.lazy")
+        value = Expensive()
+
+        # Action
+        logger.debug("Debug %s", value)
+        logger.info("Info %s", value)
+        formatted_when_logged = value.formatted
+        listener.start()
+        listener.stop()
+
+        # Assertion
+        assert formatted_when_logged == 0
+        assert value.formatted == 1
+        assert len(output.lines) == 1
+
+    def test_unsampled_request_keeps_only_warnings(self):
+        """
+            Tests that the INFO lines of a request left out of the sample are dropped, and its warnings kept.
+        """
+
+        # SetUp
+        logger, listener, output = queued_logger("test.logger.sampling")
+        token = request_sampled_var.set(False)
+
+        # Action
+        listener.start()
+        logger.info("Dropped")
+        logger.warning("Kept")
+        request_sampled_var.reset(token)
+        logger.info("Outside a request")
+        listener.stop()
+
+        # Assertion
+        assert [json.loads(line)["message"] for line in output.lines] == ["Kept", "Outside a request"]
+
+
+class TestRequestContextMiddleware:
+    @staticmethod
+    def call(middleware, headers=()):
+        messages, seen = [], {}
+
+        async def app(scope, receive, send):
+            seen["request_id"] = request_id_var.get()
+            seen["sampled"] = request_sampled_var.get()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": list(headers)}
+        asyncio.run(middleware(app)(scope, None, send))
+        return seen, dict(messages[0]["headers"])
+
+    def test_propagates_incoming_request_id(self):
+        """
+            Tests that the incoming request ID is used by the log records and returned in the response.
+        """
+
+        # Action
+        seen, headers = self.call(
+            lambda app: RequestContextMiddleware(app, sample_rate=1.0), [(b"x-request-id", b"abc-123")]
+        )
+
+        # Assertion
+        assert seen == {"request_id": "abc-123", "sampled": True}
+        assert headers[b"x-request-id"] == b"abc-123"
+        assert request_id_var.get() is None
+
+    def test_generates_request_id_and_samples(self):
+        """
+            Tests that a request without ID gets a new one and that a zero sample rate leaves it out of the sample.
+        """
+
+        # Action
+        seen, headers = self.call(lambda app: RequestContextMiddleware(app, sample_rate=0.0))
+
+        # Assertion
+        assert len(seen["request_id"]) == 32
+        assert headers[b"x-request-id"] == seen["request_id"].encode()
+        assert seen["sampled"] is False
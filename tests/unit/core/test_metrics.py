@@ -0,0 +1,111 @@
+from http import HTTPStatus
+from types import SimpleNamespace
+
+from app.core.metrics import (
+    HTTP_REQUESTS, MONGO_COMMAND_DURATION, MONGO_COMMAND_ERRORS, MONGO_POOL_CHECKED_OUT, MONGO_POOL_WAIT, Counter,
+    Histogram, MongoCommandListener, MongoPoolListener
+)
+from app.schemas import PropertyInDB
+
+
+class TestMetricTypes:
+    def test_histogram_renders_cumulative_buckets(self):
+        """
+            Tests the Prometheus text rendering of a histogram: cumulative buckets, +Inf, sum and count.
+        """
+
+        # SetUp
+        histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+
+        # Action
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "/a")
+
+        # Assertion
+        assert histogram.render() == [
+            "# HELP latency_seconds Latency.",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{route="/a",le="0.1"} 2',
+            'latency_seconds_bucket{route="/a",le="1.0"} 3',
+            'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+            'latency_seconds_sum{route="/a"} 3.65',
+            'latency_seconds_count{route="/a"} 4',
+        ]
+
+    def test_counter_escapes_label_values(self):
+        """
+            Tests that label values are escaped.
+        """
+
+        # SetUp
+        counter = Counter("errors_total", "Errors.", ("reason",))
+
+        # Action
+        counter.inc('bad "value"')
+
+        # Assertion
+        assert counter.render()[-1] == 'errors_total{reason="bad \\"value\\""} 1'
+
+
+class TestMongoListeners:
+    def test_command_timings_and_errors(self):
+        """
+            Tests that command durations are observed per command and failures are counted.
+        """
+
+        # SetUp
+        listener = MongoCommandListener()
+        before_count = MONGO_COMMAND_DURATION.count("distinct")
+        before_errors = MONGO_COMMAND_ERRORS.value("distinct")
+
+        # Action
+        listener.succeeded(SimpleNamespace(command_name="distinct", duration_micros=1500))
+        listener.failed(SimpleNamespace(command_name="distinct", duration_micros=300))
+
+        # Assertion
+        assert MONGO_COMMAND_DURATION.count("distinct") == before_count + 2
+        assert MONGO_COMMAND_ERRORS.value("distinct") == before_errors + 1
+
+    def test_pool_checkout_wait_and_gauge(self):
+        """
+            Tests that checkouts record their wait time and move the checked out gauge.
+        """
+
+        # SetUp
+        listener = MongoPoolListener()
+        event = SimpleNamespace(address=("pool-test", 27017))
+
+        # Action
+        listener.connection_check_out_started(event)
+        listener.connection_checked_out(event)
+        checked_out = MONGO_POOL_CHECKED_OUT.value("pool-test:27017")
+        listener.connection_checked_in(event)
+
+        # Assertion
+        assert checked_out == 1
+        assert MONGO_POOL_CHECKED_OUT.value("pool-test:27017") == 0
+        assert MONGO_POOL_WAIT.count("pool-test:27017") == 1
+
+
+class TestMetricsMiddleware:
+    def test_requests_are_labelled_with_the_route_template(
+            self, test_client, property_data_with_id, mock_property_repository_get
+    ):
+        """
+            Tests that requests are counted by route template and status, and exposed at /metrics.
+        """
+
+        # SetUp
+        mock_property_repository_get.return_value = PropertyInDB(**property_data_with_id)
+        route = "/api/v1/property/{property_id}"
+        before = HTTP_REQUESTS.value("GET", route, "200")
+
+        # Action
+        test_client.get(f"/api/v1/property/{property_data_with_id['id']}")
+        response = test_client.get("/metrics")
+
+        # Assertion
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert HTTP_REQUESTS.value("GET", route, "200") == before + 1
+        assert f'http_request_duration_seconds_count{{method="GET",route="{route}"}}' in response.text
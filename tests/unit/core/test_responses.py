@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from bson import ObjectId
+from starlette.datastructures import Headers
+
+from app.core.responses import FastJSONResponse, ImageFileResponse
+from app.schemas import PropertyInDB, PropertyPage
+
+
+class TestImageFileResponse:
+    def test_uses_zerocopy_when_the_server_supports_it(self, tmp_path):
+        """
+            Tests that the body is handed to the server as a file with offset and count (sendfile) when the
+            ASGI server advertises the zero-copy extension.
+        """
+
+        # SetUp
+        file_path = tmp_path / "image.png"
+        file_path.write_bytes(b"0123456789")
+        response = ImageFileResponse(str(file_path), '"hash"', Headers({"range": "bytes=2-5"}))
+        scope = {"type": "http", "extensions": {"http.response.zerocopy": {}}}
+        messages = []
+
+        async def send(message):
+            if message["type"] == "http.response.zerocopy":
+                message = {**message, "file": message["file"].read()}
+            messages.append(message)
+
+        # Action
+        asyncio.run(response(scope, None, send))
+
+        # Assertion
+        assert messages[0]["status"] == 206
+        assert messages[1] == {
+            "type": "http.response.zerocopy", "file": b"0123456789", "offset": 2, "count": 4, "more_body": False
+        }
+
+
+class TestFastJSONResponse:
+    def test_renders_trusted_documents(self):
+        """
+            Tests that a property built from a stored document is rendered with its ObjectId as string under `_id`,
+            the same body the validated path produces.
+        """
+
+        # SetUp
+        document = {
+            "_id": ObjectId(), "name": "property_name_1", "address": "carrera 1", "price": 1000.0,
+            "code_internal": "001", "year": 2001, "id_owner": "JOED1",
+        }
+        page = PropertyPage.construct(items=[PropertyInDB.from_document(document)], next_cursor=None)
+
+        # Action
+        body = json.loads(FastJSONResponse(page).body)
+
+        # Assertion
+        assert body == {"items": [{**document, "_id": str(document["_id"])}], "next_cursor": None}
@@ -0,0 +1,134 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.core.metrics import MongoPoolListener
+from app.db import mongodb
+
+
+class TestClientOptions:
+    def test_options_from_settings(self, mocker):
+        """
+            Tests that the pool, timeout, read preference and compression settings reach the client, and unset
+            ones are left to the driver defaults.
+        """
+
+        # SetUp
+        mocker.patch.multiple(
+            mongodb.settings, MONGO_MAX_POOL_SIZE=50, MONGO_MIN_POOL_SIZE=5, MONGO_MAX_IDLE_TIME_MS=None,
+            MONGO_SOCKET_TIMEOUT_MS=10000, MONGO_READ_PREFERENCE="secondaryPreferred", MONGO_COMPRESSORS="zlib"
+        )
+
+        # Action
+        options = mongodb.client_options()
+        client = mongodb.create_client()
+
+        # Assertion
+        assert options["maxPoolSize"] == 50 and options["minPoolSize"] == 5
+        assert "maxIdleTimeMS" not in options
+        assert client.options.pool_options.max_pool_size == 50
+        assert client.options.pool_options.min_pool_size == 5
+        assert client.read_preference.mongos_mode == "secondaryPreferred"
+        client.close()
+
+
+class TestGetClient:
+    def test_one_client_per_process(self, mocker):
+        """
+            Tests that the client is created once per process and re-created in a forked worker, instead of
+            sharing the connections of the parent process.
+        """
+
+        # SetUp
+        mocker.patch.object(mongodb, "_client", None)
+        create_client = mocker.patch.object(mongodb, "create_client", side_effect=lambda: MagicMock())
+        getpid = mocker.patch.object(mongodb.os, "getpid", return_value=100)
+
+        # Action
+        parent = mongodb.get_client()
+        parent_again = mongodb.get_client()
+        getpid.return_value = 101
+        worker = mongodb.get_client()
+
+        # Assertion
+        assert parent is parent_again
+        assert worker is not parent
+        assert create_client.call_count == 2
+
+    def test_close_forgets_the_client(self, mocker):
+        """
+            Tests that closing the connection closes the client of the process and the next use creates a new one.
+        """
+
+        # SetUp
+        mocker.patch.object(mongodb, "_client", None)
+        mocker.patch.object(mongodb, "create_client", side_effect=lambda: MagicMock())
+        client = mongodb.get_client()
+
+        # Action
+        mongodb.close_mongo_connection()
+
+        # Assertion
+        client.close.assert_called_once()
+        assert mongodb.get_client() is not client
+
+
+class TestConnectToMongo:
+    def test_verifies_and_warms_up_the_pool(self, mocker):
+        """
+            Tests that startup pings the server and opens the minimum connections of the pool.
+        """
+
+        # SetUp
+        client = MagicMock()
+        client.admin.command = AsyncMock(return_value={"ok": 1})
+        mocker.patch.object(mongodb, "get_client", return_value=client)
+        mocker.patch.object(mongodb.settings, "MONGO_MIN_POOL_SIZE", 4)
+
+        # Action
+        asyncio.run(mongodb.connect_to_mongo())
+
+        # Assertion
+        assert client.admin.command.await_count == 4
+
+    def test_unreachable_server_fails_startup(self, mocker):
+        """
+            Tests that startup fails when no server can be selected.
+        """
+
+        # SetUp
+        client = MagicMock()
+        client.admin.command = AsyncMock(side_effect=ServerSelectionTimeoutError("no servers"))
+        mocker.patch.object(mongodb, "get_client", return_value=client)
+
+        # Action / Assertion
+        with pytest.raises(ServerSelectionTimeoutError):
+            asyncio.run(mongodb.connect_to_mongo())
+
+
+class TestPoolStats:
+    def test_reports_pool_state_per_server(self):
+        """
+            Tests that the pool statistics reflect the connections and checkouts seen by the pool listener.
+        """
+
+        # SetUp
+        listener = MongoPoolListener()
+        event = SimpleNamespace(address=("stats-test", 27017))
+        listener.connection_created(event)
+        listener.connection_created(event)
+        listener.connection_check_out_started(event)
+        listener.connection_checked_out(event)
+
+        # Action
+        stats = mongodb.pool_stats()
+
+        # Assertion
+        server = stats["servers"]["stats-test:27017"]
+        assert server["open"] == 2
+        assert server["checked_out"] == 1
+        assert server["checkouts"] == 1
+        assert stats["max_pool_size"] == mongodb.settings.MONGO_MAX_POOL_SIZE
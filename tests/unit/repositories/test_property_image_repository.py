@@ -0,0 +1,59 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from bson import ObjectId
+
+from app.models.py_object_id import PyObjectId
+from app.schemas import PropertyImageCreate
+
+
+class TestPropertyImageRepositoryBatch:
+    def test_add_property_images_single_insert(self, property_image_repository):
+        """
+            Tests that the images of a batch are inserted with one `insert_many` and returned with their IDs in order.
+        """
+
+        # SetUp
+        collection = property_image_repository.collection
+        property_id = str(PyObjectId())
+        inserted_ids = [ObjectId(), ObjectId()]
+        collection.insert_many = AsyncMock(return_value=MagicMock(inserted_ids=inserted_ids))
+        images = [
+            PropertyImageCreate(id_property=property_id, file=f"{name}.jpg", enable=True, content_hash=name)
+            for name in ("first", "second")
+        ]
+
+        # Action
+        created = asyncio.run(property_image_repository.add_property_images(images))
+
+        # Assertion
+        collection.insert_many.assert_called_once()
+        documents = collection.insert_many.call_args[0][0]
+        assert [document["id_property"] for document in documents] == [ObjectId(property_id)] * 2
+        assert [image.id for image in created] == [str(inserted_id) for inserted_id in inserted_ids]
+        assert [image.file for image in created] == ["first.jpg", "second.jpg"]
+
+    def test_find_by_content_hashes_prefers_ready(self, property_image_repository, async_cursor):
+        """
+            Tests that one query returns an image per content hash, the one with ready derivatives first.
+        """
+
+        # SetUp
+        collection = property_image_repository.collection
+        property_id = ObjectId()
+        collection.find.return_value = async_cursor([
+            {"_id": ObjectId(), "id_property": property_id, "file": "a.jpg", "enable": True, "content_hash": "a",
+             "derivatives_status": "ready"},
+            {"_id": ObjectId(), "id_property": property_id, "file": "a.jpg", "enable": True, "content_hash": "a",
+             "derivatives_status": "pending"},
+        ])
+
+        # Action
+        images = asyncio.run(property_image_repository.find_by_content_hashes(["a", "a", "b"]))
+
+        # Assertion
+        query = collection.find.call_args[0][0]
+        assert sorted(query["content_hash"]["$in"]) == ["a", "b"]
+        assert collection.find.call_args[1]["sort"] == [("derivatives_status", -1)]
+        assert list(images) == ["a"]
+        assert images["a"].derivatives_status == "ready"
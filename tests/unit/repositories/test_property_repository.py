@@ -0,0 +1,451 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+from app.core.exceptions import PreconditionFailed
+from app.models.geo_point import GeoPoint
+from app.models.py_object_id import PyObjectId
+from app.repositories.property import PropertyRepository
+from app.schemas import PriceAdjustment, PriceChange, PropertyCreate, PropertyFilter, PropertyUpdate
+
+
+class TestPropertyRepositoryList:
+    def test_first_page_query(self, property_repository):
+        """
+            Tests that the first page only applies the filters and sorts by the key with `_id` as tiebreaker.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+
+        # Action
+        asyncio.run(property_repository.list(
+            PropertyFilter(min_price=100, max_price=200, id_owner="JOED1"), "-price", 10
+        ))
+
+        # Assertion
+        collection.find.assert_called_once_with(
+            {"price": {"$gte": 100, "$lte": 200}, "id_owner": "JOED1"}
+        )
+        collection.find.return_value.sort.assert_called_once_with([("price", DESCENDING), ("_id", DESCENDING)])
+        collection.find.return_value.sort.return_value.limit.assert_called_once_with(10)
+
+    def test_keyset_page_query(self, property_repository):
+        """
+            Tests that following pages start right after the cursor position instead of skipping documents.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        last_id = str(PyObjectId())
+
+        # Action
+        asyncio.run(property_repository.list(PropertyFilter(min_year=2000), "year", 10, {"_id": last_id, "year": 2005}))
+
+        # Assertion
+        collection.find.assert_called_once_with({"$and": [
+            {"year": {"$gte": 2000}},
+            {"$or": [{"year": {"$gt": 2005}}, {"year": 2005, "_id": {"$gt": ObjectId(last_id)}}]},
+        ]})
+        collection.find.return_value.sort.assert_called_once_with([("year", ASCENDING), ("_id", ASCENDING)])
+        collection.find.return_value.skip.assert_not_called()
+
+    def test_keyset_page_by_id(self, property_repository):
+        """
+            Tests the keyset condition when sorting by identifier only.
+        """
+
+        # SetUp
+        last_id = str(PyObjectId())
+
+        # Action
+        asyncio.run(property_repository.list(PropertyFilter(), "id", 10, {"_id": last_id}))
+
+        # Assertion
+        property_repository.collection.find.assert_called_once_with({"_id": {"$gt": ObjectId(last_id)}})
+
+
+class TestPropertyRepositoryVersion:
+    def test_update_bumps_version(self, property_repository):
+        """
+            Tests that an update sets `updated_at` and increments the version in the same write.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        property_id = ObjectId()
+        collection.find_one_and_update = AsyncMock(return_value={
+            "_id": property_id, "name": "p", "address": "a", "price": 5, "code_internal": "1", "year": 1,
+            "id_owner": "JOED1", "version": 4,
+        })
+
+        # Action
+        updated = asyncio.run(property_repository.update(str(property_id), PropertyUpdate(price=5)))
+
+        # Assertion
+        query, update = collection.find_one_and_update.call_args[0]
+        assert query == {"_id": property_id}
+        assert update["$inc"] == {"version": 1}
+        assert update["$set"]["price"] == 5 and "updated_at" in update["$set"]
+        assert updated.version == 4
+
+    @pytest.mark.parametrize("expected_version, version_filter", [(3, 3), (0, {"$in": [0, None]})])
+    def test_conditional_update(self, property_repository, expected_version, version_filter):
+        """
+            Tests that the expected version is part of the update filter, and that a property found at another
+            version raises PreconditionFailed.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        property_id = ObjectId()
+        collection.find_one_and_update = AsyncMock(return_value=None)
+        collection.count_documents = AsyncMock(return_value=1)
+
+        # Action
+        with pytest.raises(PreconditionFailed):
+            asyncio.run(property_repository.update(str(property_id), PropertyUpdate(price=5), expected_version))
+
+        # Assertion
+        assert collection.find_one_and_update.call_args[0][0] == {"_id": property_id, "version": version_filter}
+
+
+class TestPropertyRepositoryBulkPrices:
+    def test_bulk_update_prices(self, property_repository, async_cursor):
+        """
+            Tests that explicit price changes are sent as one bulk write per batch with a status per item.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        existing, unchanged, missing = ObjectId(), ObjectId(), ObjectId()
+        collection.find.return_value = async_cursor([
+            {"_id": existing, "price": 10.0}, {"_id": unchanged, "price": 20.0}
+        ])
+        collection.bulk_write = AsyncMock(return_value=MagicMock(modified_count=1))
+        changes = [
+            PriceChange(property_id=str(existing), price=15), PriceChange(property_id=str(unchanged), price=20),
+            PriceChange(property_id=str(missing), price=30), PriceChange(property_id="bad-id", price=40),
+        ]
+
+        # Action
+        result = asyncio.run(property_repository.bulk_update_prices(changes, batch_size=1000))
+
+        # Assertion
+        assert [item.status for item in result.items] == ["updated", "unchanged", "not_found", "invalid_id"]
+        assert (result.matched, result.modified, result.not_found) == (2, 1, 2)
+        collection.find.assert_called_once_with({"_id": {"$in": [existing, unchanged, missing]}}, {"price": 1})
+        operations = collection.bulk_write.await_args[0][0]
+        assert [operation._filter for operation in operations] == [{"_id": existing}]
+        assert collection.bulk_write.await_args[1] == {"ordered": False}
+
+    def test_bulk_update_prices_in_batches(self, property_repository, async_cursor):
+        """
+            Tests that changes are split in batches of the requested size.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        ids = [ObjectId() for _ in range(5)]
+        collection.find.side_effect = lambda query, projection: async_cursor(
+            [{"_id": object_id, "price": 1.0} for object_id in query["_id"]["$in"]]
+        )
+        collection.bulk_write = AsyncMock(
+            side_effect=lambda operations, ordered: MagicMock(modified_count=len(operations))
+        )
+
+        # Action
+        result = asyncio.run(property_repository.bulk_update_prices(
+            [PriceChange(property_id=str(object_id), price=2) for object_id in ids], batch_size=2
+        ))
+
+        # Assertion
+        assert collection.bulk_write.await_count == 3
+        assert (result.matched, result.modified) == (5, 5)
+
+    @pytest.mark.parametrize("adjustment, query, new_price", [
+        (PriceAdjustment(type="percentage", value=10), {"year": {"$gte": 2000}},
+         {"$multiply": ["$price", 1.1]}),
+        (PriceAdjustment(type="absolute", value=-500), {"$and": [{"year": {"$gte": 2000}}, {"price": {"$gt": 500}}]},
+         {"$add": ["$price", -500]}),
+    ])
+    def test_adjust_prices_server_side(self, property_repository, adjustment, query, new_price):
+        """
+            Tests that filtered adjustments run as a single server-side update pipeline, which bumps the version of
+            the properties whose price changes.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        collection.update_many = AsyncMock(return_value=MagicMock(matched_count=7, modified_count=6))
+
+        # Action
+        result = asyncio.run(property_repository.adjust_prices(PropertyFilter(min_year=2000), adjustment))
+
+        # Assertion
+        collection.update_many.assert_awaited_once()
+        (filter_query, pipeline), _ = collection.update_many.await_args
+        rounded = {"$round": [new_price, 2]}
+        assert filter_query == query
+        assert pipeline[0]["$set"]["price"] == rounded
+        assert pipeline[0]["$set"]["version"] == {
+            "$cond": [{"$ne": ["$price", rounded]}, {"$add": [{"$ifNull": ["$version", 0]}, 1]}, "$version"]
+        }
+        assert (result.matched, result.modified) == (7, 6)
+
+
+class TestPropertyRepositoryExpand:
+    def test_get_expanded_single_aggregation(self, property_repository):
+        """
+            Tests that the property and its relations are fetched with one aggregation with bounded lookups.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        property_id = str(PyObjectId())
+        collection.aggregate.return_value.to_list.return_value = [{
+            "_id": ObjectId(property_id), "name": "p", "address": "a", "price": 1, "code_internal": "1", "year": 1,
+            "id_owner": "JOED1", "images": [], "traces": [],
+        }]
+
+        # Action
+        detail = asyncio.run(property_repository.get_expanded(property_id, ["owner", "images", "traces"]))
+
+        # Assertion
+        pipeline = collection.aggregate.call_args[0][0]
+        assert pipeline[0] == {"$match": {"_id": ObjectId(property_id)}}
+        lookups = [stage["$lookup"] for stage in pipeline if "$lookup" in stage]
+        assert [lookup["from"] for lookup in lookups] == ["Owners", "Property_images", "Property_traces"]
+        assert {"$limit": settings.EXPAND_IMAGES_LIMIT} in lookups[1]["pipeline"]
+        assert {"$limit": settings.EXPAND_TRACES_LIMIT} in lookups[2]["pipeline"]
+        assert detail.owner is None
+        assert detail.images == [] and detail.traces == []
+
+    def test_get_expanded_not_found(self, property_repository):
+        """
+            Tests that an unknown property raises ValueError.
+        """
+
+        # Action
+        with pytest.raises(ValueError):
+            asyncio.run(property_repository.get_expanded(str(PyObjectId()), ["owner"]))
+
+    def test_list_expanded_joins_after_limit(self, property_repository):
+        """
+            Tests that an expanded page is resolved in one aggregation that joins only the properties of the page.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+
+        # Action
+        asyncio.run(property_repository.list(PropertyFilter(min_price=100), "-price", 10, expand=["images"]))
+
+        # Assertion
+        pipeline = collection.aggregate.call_args[0][0]
+        assert pipeline[:3] == [
+            {"$match": {"price": {"$gte": 100}}}, {"$sort": {"price": DESCENDING, "_id": DESCENDING}}, {"$limit": 10}
+        ]
+        assert pipeline[3]["$lookup"]["from"] == "Property_images"
+        collection.find.assert_not_called()
+
+    def test_expand_rejects_unknown_relations(self, property_repository):
+        """
+            Tests that only the declared relations can be expanded.
+        """
+
+        # Action
+        with pytest.raises(ValueError):
+            property_repository.expand_pipeline(["city"])
+
+
+class TestPropertyRepositoryNearby:
+    def test_nearby_geo_near_with_filters_and_bbox(self, property_repository):
+        """
+            Tests that a nearby search is one `$geoNear` stage combining the filters, the radius and the bounding
+            box, ordered by distance and cut at the limit.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        collection.aggregate.return_value.to_list = AsyncMock(return_value=[{
+            "_id": ObjectId(), "name": "p", "address": "a", "price": 1, "code_internal": "1", "year": 1,
+            "id_owner": "JOED1", "location": {"type": "Point", "coordinates": [-74.05, 4.67]}, "distance": 12.5,
+        }])
+
+        # Action
+        properties = asyncio.run(property_repository.nearby(
+            PropertyFilter(max_price=500), GeoPoint.from_lon_lat(-74.05, 4.67), 1000, (-74.1, 4.6, -74.0, 4.7), 20
+        ))
+
+        # Assertion
+        (geo_near_stage, limit_stage), = collection.aggregate.call_args[0]
+        geo_near = geo_near_stage["$geoNear"]
+        assert geo_near["near"] == {"type": "Point", "coordinates": [-74.05, 4.67]}
+        assert geo_near["key"] == "location" and geo_near["maxDistance"] == 1000
+        assert geo_near["query"]["price"] == {"$lte": 500}
+        polygon = geo_near["query"]["location"]["$geoWithin"]["$geometry"]
+        assert polygon["coordinates"][0][0] == polygon["coordinates"][0][-1] == [-74.1, 4.6]
+        assert limit_stage == {"$limit": 20}
+        assert properties[0].distance == 12.5
+
+    def test_set_locations_bulk_write(self, property_repository):
+        """
+            Tests that locations are set with one unordered bulk write keyed by the requested field.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        collection.bulk_write = AsyncMock(return_value=MagicMock(matched_count=2, modified_count=1))
+
+        # Action
+        result = asyncio.run(property_repository.set_locations({
+            "C1": GeoPoint.from_lon_lat(1, 2), "C2": GeoPoint.from_lon_lat(3, 4)
+        }))
+
+        # Assertion
+        operations = collection.bulk_write.call_args[0][0]
+        assert [operation._filter for operation in operations] == [{"code_internal": "C1"}, {"code_internal": "C2"}]
+        assert operations[0]._doc["$set"]["location"] == {"type": "Point", "coordinates": [1, 2]}
+        assert operations[0]._doc["$inc"] == {"version": 1}
+        assert result == (2, 1)
+
+
+class TestPropertyRepositorySearch:
+    def test_search_ranked_by_relevance_with_filters(self, property_repository):
+        """
+            Tests that a search matches the text index together with the filters and sorts by relevance.
+        """
+
+        # Action
+        asyncio.run(property_repository.search("casa chapinero", PropertyFilter(min_year=2000), 21))
+
+        # Assertion
+        pipeline = property_repository.collection.aggregate.call_args[0][0]
+        assert pipeline == [
+            {"$match": {"$text": {"$search": "casa chapinero"}, "year": {"$gte": 2000}}},
+            {"$set": {"score": {"$meta": "textScore"}}},
+            {"$sort": {"score": DESCENDING, "_id": ASCENDING}},
+            {"$limit": 21},
+        ]
+
+    def test_search_keyset_page(self, property_repository):
+        """
+            Tests that following pages start after the relevance and ID of the last result.
+        """
+
+        # SetUp
+        last_id = str(PyObjectId())
+
+        # Action
+        asyncio.run(property_repository.search("casa", PropertyFilter(), 10, {"_id": last_id, "score": 1.5}))
+
+        # Assertion
+        pipeline = property_repository.collection.aggregate.call_args[0][0]
+        assert pipeline[2] == {"$match": {"$or": [
+            {"score": {"$lt": 1.5}}, {"score": 1.5, "_id": {"$gt": ObjectId(last_id)}}
+        ]}}
+        assert pipeline[3:] == [{"$sort": {"score": DESCENDING, "_id": ASCENDING}}, {"$limit": 10}]
+
+
+class TestPropertyRepositorySync:
+    @staticmethod
+    def property_create(code, price=1000.0):
+        return PropertyCreate(name="p", address="a", price=price, code_internal=code, year=2000, id_owner="JOED1")
+
+    def test_sync_writes_only_new_and_changed(self, property_repository, async_cursor):
+        """
+            Tests that a batch is compared with the stored hashes in one query and only new and changed properties
+            are upserted, keyed by internal code, with the last duplicate winning.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        unchanged = self.property_create("C2")
+        stored_hash = PropertyRepository.content_hash(unchanged.dict(exclude_unset=True))
+        collection.find.return_value = async_cursor([
+            {"code_internal": "C1", "content_hash": "old"}, {"code_internal": "C2", "content_hash": stored_hash},
+        ])
+        collection.bulk_write = AsyncMock()
+        properties = [
+            self.property_create("C1", 10), self.property_create("C1", 2000), unchanged, self.property_create("C3")
+        ]
+
+        # Action
+        result = asyncio.run(property_repository.sync(properties, batch_size=1000))
+
+        # Assertion
+        assert result.dict() == {"inserted": 1, "updated": 1, "unchanged": 1, "duplicates": 1}
+        collection.find.assert_called_once_with(
+            {"code_internal": {"$in": ["C1", "C2", "C3"]}}, {"code_internal": 1, "content_hash": 1}
+        )
+        operations = collection.bulk_write.await_args[0][0]
+        assert [operation._filter for operation in operations] == [{"code_internal": "C1"}, {"code_internal": "C3"}]
+        assert all(operation._upsert for operation in operations)
+        assert operations[0]._doc["$set"]["price"] == 2000
+        assert operations[0]._doc["$set"]["content_hash"] == PropertyRepository.content_hash(
+            properties[1].dict(exclude_unset=True)
+        )
+
+    def test_sync_dry_run_does_not_write(self, property_repository, async_cursor):
+        """
+            Tests that a dry run computes the summary without writing.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        collection.find.return_value = async_cursor([])
+        collection.bulk_write = AsyncMock()
+
+        # Action
+        result = asyncio.run(property_repository.sync([self.property_create("C1")], dry_run=True))
+
+        # Assertion
+        assert result.inserted == 1
+        collection.bulk_write.assert_not_called()
+
+    def test_ensure_indexes_drops_replaced_indexes(self, property_repository):
+        """
+            Tests that the non-unique internal code index is dropped before the unique one on the same key is built.
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        calls = []
+        collection.index_information = AsyncMock(return_value={"_id_": {}, "code_internal": {}})
+        collection.drop_index = AsyncMock(side_effect=lambda name: calls.append(("drop", name)))
+        collection.create_indexes = AsyncMock(side_effect=lambda indexes: calls.append(("create", len(indexes))))
+
+        # Action
+        asyncio.run(property_repository.ensure_indexes())
+
+        # Assertion
+        unique = [
+            index.document for index in property_repository.INDEXES if index.document["name"] == "code_internal_unique"
+        ]
+        assert unique[0]["unique"] is True
+        assert calls == [("drop", "code_internal"), ("create", len(property_repository.INDEXES))]
+
+    def test_ensure_indexes_restores_replaced_indexes_on_failure(self, property_repository):
+        """
+            Tests that the dropped index is created again when the unique index can not be built (duplicate codes).
+        """
+
+        # SetUp
+        collection = property_repository.collection
+        collection.index_information = AsyncMock(return_value={"_id_": {}, "code_internal": {}})
+        collection.drop_index = AsyncMock()
+        collection.create_indexes = AsyncMock(side_effect=[OperationFailure("E11000 duplicate key"), None])
+
+        # Action
+        with pytest.raises(OperationFailure):
+            asyncio.run(property_repository.ensure_indexes())
+
+        # Assertion
+        restored = collection.create_indexes.await_args_list[1][0][0]
+        assert [index.document["name"] for index in restored] == ["code_internal"]
@@ -0,0 +1,170 @@
+import asyncio
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from bson import ObjectId
+
+from app.models.py_object_id import PyObjectId
+from app.repositories.property_trace import PropertyTraceRepository
+from app.schemas import PropertyTraceCreate, PropertyTraceInDB
+
+
+class TestPropertyTraceRepository:
+    def test_create_stores_bson_types(self, property_trace_repository):
+        """
+            Tests that the sale date is stored as a datetime and the property reference as an ObjectId.
+        """
+
+        # SetUp
+        collection = property_trace_repository.collection
+        property_id = str(PyObjectId())
+        collection.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
+
+        # Action
+        trace = asyncio.run(property_trace_repository.create(PropertyTraceCreate(
+            date_sale=date(2023, 5, 10), name="venta_1", value=250000, tax=5000, id_property=property_id
+        )))
+
+        # Assertion
+        stored = collection.insert_one.call_args[0][0]
+        assert stored["date_sale"] == datetime(2023, 5, 10)
+        assert stored["id_property"] == ObjectId(property_id)
+        assert trace.id_property == property_id
+        assert trace.date_sale == date(2023, 5, 10)
+
+    def test_rollup_pipeline_merges_groups(self, property_trace_repository):
+        """
+            Tests that the statistics are grouped by the dimension key and merged into the rollup collection.
+        """
+
+        # Action
+        pipeline = property_trace_repository.rollup_pipeline("year", {"value": {"$gte": 0}})
+
+        # Assertion
+        assert pipeline[0] == {"$match": {"value": {"$gte": 0}}}
+        assert pipeline[1] == {"$addFields": {"rollup_key": {"$year": "$date_sale"}}}
+        assert "values" not in pipeline[2]["$group"]
+        assert pipeline[-1]["$merge"]["into"] == "Property_trace_rollups"
+        assert pipeline[-1]["$merge"]["whenMatched"] == "merge"
+
+    def test_owner_rollup_joins_properties(self, property_trace_repository):
+        """
+            Tests that the owner statistics resolve the owner through the property of each trace.
+        """
+
+        # Action
+        pipeline = property_trace_repository.rollup_pipeline("owner")
+
+        # Assertion
+        assert pipeline[0]["$lookup"]["from"] == "Properties"
+        assert pipeline[2] == {"$addFields": {"rollup_key": "$property.id_owner"}}
+
+    def test_price_band_range(self, mocker):
+        """
+            Tests the value range of the band of a sale value.
+        """
+
+        # SetUp
+        mocker.patch("app.core.config.settings.PRICE_BANDS", [0, 100000, 500000])
+
+        # Assertion
+        assert PropertyTraceRepository.price_band_range(50000) == {"$lt": 100000}
+        assert PropertyTraceRepository.price_band_range(100000) == {"$gte": 100000, "$lt": 500000}
+        assert PropertyTraceRepository.price_band_range(900000) == {"$gte": 500000}
+
+    def test_price_band_key(self, mocker):
+        """
+            Tests that a sale value is keyed by the lower bound of its band, the first one for values below it.
+        """
+
+        # SetUp
+        mocker.patch("app.core.config.settings.PRICE_BANDS", [100000, 0, 500000])
+
+        # Assertion
+        assert PropertyTraceRepository.price_band_key(-1) == 0
+        assert PropertyTraceRepository.price_band_key(100000) == 100000
+        assert PropertyTraceRepository.price_band_key(900000) == 500000
+
+    def test_refresh_increments_affected_groups(self, property_trace_repository):
+        """
+            Tests that a new sale increments the counters of its year, owner and price band groups and marks their
+            median as stale without reading the traces of the groups.
+        """
+
+        # SetUp
+        traces = property_trace_repository.collection
+        properties = property_trace_repository.properties
+        rollups = property_trace_repository.rollups
+        property_id = ObjectId()
+        properties.find_one = AsyncMock(return_value={"_id": property_id, "id_owner": "JOED1"})
+        rollups.update_one = AsyncMock()
+        trace = PropertyTraceInDB(
+            id=str(PyObjectId()), date_sale=date(2023, 5, 10), name="venta_1", value=250000, tax=5000,
+            id_property=str(property_id)
+        )
+
+        # Action
+        asyncio.run(property_trace_repository.refresh_rollups(trace))
+
+        # Assertion
+        updates = rollups.update_one.call_args_list
+        assert [call[0][0]["_id"] for call in updates] == [
+            {"dimension": "year", "key": 2023},
+            {"dimension": "price_band", "key": property_trace_repository.price_band_key(250000)},
+            {"dimension": "owner", "key": "JOED1"},
+        ]
+        assert updates[0][0][1]["$inc"] == {"count": 1, "total_value": 250000, "total_tax": 5000}
+        assert updates[0][0][1]["$set"] == {"median_stale": True}
+        traces.aggregate.assert_not_called()
+        traces.find.assert_not_called()
+
+    def test_rebuild_sets_medians_in_one_pass(self, property_trace_repository, async_cursor):
+        """
+            Tests that the rebuild reads the traces of a dimension once, sorted by group and value, and stores the
+            median of each group from its middle values.
+        """
+
+        # SetUp
+        traces = property_trace_repository.collection
+        rollups = property_trace_repository.rollups
+        traces.aggregate = MagicMock(side_effect=[
+            MagicMock(to_list=AsyncMock(return_value=[])),
+            async_cursor([
+                {"rollup_key": 2022, "value": 1}, {"rollup_key": 2022, "value": 2}, {"rollup_key": 2022, "value": 9},
+                {"rollup_key": 2023, "value": 2}, {"rollup_key": 2023, "value": 3},
+            ]),
+        ])
+        rollups.find = MagicMock(return_value=async_cursor([{"key": 2022, "count": 3}, {"key": 2023, "count": 2}]))
+        rollups.bulk_write = AsyncMock()
+        rollups.delete_many = AsyncMock()
+
+        # Action
+        asyncio.run(property_trace_repository.rebuild_rollups(["year"]))
+
+        # Assertion
+        pipeline = traces.aggregate.call_args_list[1][0][0]
+        assert {"$sort": {"rollup_key": 1, "value": 1}} in pipeline
+        operations = rollups.bulk_write.call_args[0][0]
+        assert [(operation._filter, operation._doc) for operation in operations] == [
+            ({"_id": {"dimension": "year", "key": 2022}}, {"$set": {"median_value": 2, "median_stale": False}}),
+            ({"_id": {"dimension": "year", "key": 2023}}, {"$set": {"median_value": 2.5, "median_stale": False}}),
+        ]
+
+    def test_ensure_indexes_drops_replaced_indexes(self, property_trace_repository):
+        """
+            Tests that the single-field property index is dropped before the compound one is built.
+        """
+
+        # SetUp
+        collection = property_trace_repository.collection
+        calls = []
+        collection.index_information = AsyncMock(return_value={"_id_": {}, "id_property": {}})
+        collection.drop_index = AsyncMock(side_effect=lambda name: calls.append(("drop", name)))
+        collection.create_indexes = AsyncMock(side_effect=lambda indexes: calls.append(("create", len(indexes))))
+        property_trace_repository.rollups.create_indexes = AsyncMock()
+
+        # Action
+        asyncio.run(property_trace_repository.ensure_indexes())
+
+        # Assertion
+        assert calls == [("drop", "id_property"), ("create", len(property_trace_repository.INDEXES))]
@@ -0,0 +1,51 @@
+import asyncio
+import csv
+import io
+from unittest.mock import AsyncMock, MagicMock
+
+from app.scripts.backfill_locations import backfill_locations
+
+
+def rows(text):
+    return csv.DictReader(io.StringIO(text))
+
+
+class TestBackfillLocations:
+    def test_sets_locations_in_batches(self, mock_mongo_client):
+        """
+            Tests that valid rows are written in bulk batches and invalid coordinates are skipped.
+        """
+
+        # SetUp
+        collection = mock_mongo_client.realStateCompany.Properties
+        collection.bulk_write = AsyncMock(side_effect=lambda operations, ordered: MagicMock(
+            matched_count=len(operations), modified_count=len(operations)
+        ))
+        data = "code_internal,latitude,longitude\nC1,4.6,-74.1\nC2,4.7,-74.0\nC3,95,-74.0\nC4,4.8,-73.9\n"
+
+        # Action
+        stats = asyncio.run(backfill_locations(mock_mongo_client, rows(data), batch_size=2))
+
+        # Assertion
+        assert stats == {"rows": 4, "invalid": 1, "matched": 3, "modified": 3}
+        assert collection.bulk_write.await_count == 2
+        first_batch = collection.bulk_write.call_args_list[0][0][0]
+        assert first_batch[0]._filter == {"code_internal": "C1"}
+        assert first_batch[0]._doc["$set"]["location"] == {"type": "Point", "coordinates": [-74.1, 4.6]}
+
+    def test_dry_run_by_id(self, mock_mongo_client):
+        """
+            Tests that a dry run only validates the rows, rejecting invalid IDs.
+        """
+
+        # SetUp
+        collection = mock_mongo_client.realStateCompany.Properties
+        collection.bulk_write = AsyncMock()
+        data = "id,latitude,longitude\n5f1d7f8e9b1e8a3d4c2b1a00,4.6,-74.1\nnot-an-id,4.6,-74.1\n"
+
+        # Action
+        stats = asyncio.run(backfill_locations(mock_mongo_client, rows(data), key="id", dry_run=True))
+
+        # Assertion
+        assert stats == {"rows": 2, "invalid": 1, "matched": 0, "modified": 0}
+        collection.bulk_write.assert_not_called()
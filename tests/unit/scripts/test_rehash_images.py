@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+from unittest.mock import AsyncMock
+
+from app.models.py_object_id import PyObjectId
+from app.scripts.rehash_images import rehash_images
+
+
+class TestRehashImages:
+    def test_moves_flat_files_to_content_store(self, tmp_path, mock_mongo_client, async_cursor):
+        """
+            Tests that flat files are moved to their sharded content path, duplicates collapse into one file,
+            records are updated and unreferenced flat files are reported as orphans.
+        """
+
+        # SetUp
+        content = b"\xff\xd8\xff\xe0 photo"
+        content_hash = hashlib.sha256(content).hexdigest()
+        first, second, orphan = tmp_path / "uuid1-photo.jpg", tmp_path / "uuid2-photo.jpg", tmp_path / "uuid3-old.jpg"
+        for path in (first, second, orphan):
+            path.write_bytes(content)
+        thumbnail = tmp_path / "uuid1-photo_thumbnail.jpg"
+        thumbnail.write_bytes(b"thumbnail")
+        documents = [
+            {"_id": PyObjectId(), "file": str(first), "derivatives": [
+                {"name": "thumbnail", "file": str(thumbnail), "width": 1, "height": 1, "format": "JPEG"}
+            ]},
+            {"_id": PyObjectId(), "file": str(second), "derivatives": []},
+            {"_id": PyObjectId(), "file": str(tmp_path / "missing.jpg"), "derivatives": []},
+        ]
+        collection = mock_mongo_client.realStateCompany.Property_images
+        collection.find.return_value = async_cursor(documents)
+        collection.update_one = AsyncMock()
+
+        # Action
+        stats = asyncio.run(rehash_images(mock_mongo_client, str(tmp_path), delete_orphans=True))
+
+        # Assertion
+        new_path = tmp_path / content_hash[:2] / content_hash[2:4] / f"{content_hash}.jpg"
+        assert stats == {"migrated": 2, "deduplicated": 1, "missing": 1, "orphans": 1}
+        assert new_path.read_bytes() == content
+        assert (new_path.parent / f"{content_hash}_thumbnail.jpg").read_bytes() == b"thumbnail"
+        assert [path for path in tmp_path.iterdir() if path.is_file()] == []
+        first_update = collection.update_one.await_args_list[0][0][1]["$set"]
+        assert first_update["file"] == str(new_path)
+        assert first_update["content_hash"] == content_hash
+        assert first_update["derivatives"][0]["file"] == str(new_path.parent / f"{content_hash}_thumbnail.jpg")
+
+    def test_dry_run_changes_nothing(self, tmp_path, mock_mongo_client, async_cursor):
+        """
+            Tests that a dry run only reports what would be migrated.
+        """
+
+        # SetUp
+        flat = tmp_path / "uuid1-photo.jpg"
+        flat.write_bytes(b"\xff\xd8\xff\xe0 photo")
+        collection = mock_mongo_client.realStateCompany.Property_images
+        collection.find.return_value = async_cursor([{"_id": PyObjectId(), "file": str(flat), "derivatives": []}])
+        collection.update_one = AsyncMock()
+
+        # Action
+        stats = asyncio.run(rehash_images(mock_mongo_client, str(tmp_path), dry_run=True, delete_orphans=True))
+
+        # Assertion
+        assert stats == {"migrated": 1, "deduplicated": 0, "missing": 0, "orphans": 0}
+        assert flat.exists()
+        collection.update_one.assert_not_called()
+
+    def test_keeps_derivatives_of_missing_originals_and_other_files(self, tmp_path, mock_mongo_client, async_cursor):
+        """
+            Tests that the orphan scan keeps the derivatives still referenced by a record whose original is missing,
+            and files that are not images.
+        """
+
+        # SetUp
+        thumbnail = tmp_path / "uuid1-photo_thumbnail.jpg"
+        thumbnail.write_bytes(b"thumbnail")
+        notes = tmp_path / "README.txt"
+        notes.write_bytes(b"notes")
+        collection = mock_mongo_client.realStateCompany.Property_images
+        collection.update_one = AsyncMock()
+        collection.find.return_value = async_cursor([{
+            "_id": PyObjectId(), "file": str(tmp_path / "uuid1-photo.jpg"),
+            "derivatives": [{"name": "thumbnail", "file": str(thumbnail), "width": 1, "height": 1, "format": "JPEG"}],
+        }])
+
+        # Action
+        stats = asyncio.run(rehash_images(mock_mongo_client, str(tmp_path), delete_orphans=True))
+
+        # Assertion
+        assert stats == {"migrated": 0, "deduplicated": 0, "missing": 1, "orphans": 0}
+        assert thumbnail.exists() and notes.exists()
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from app.scripts.sweep_images import sweep_images
+from app.services.image_storage import LocalImageStorage
+
+OLD = time.time() - 7200
+
+
+def store(directory, content_hash, *suffixes, modified=OLD):
+    """
+    Writes the files of a content (original and derivatives) in the sharded layout with the given modification time.
+    """
+    paths = []
+    for suffix in suffixes:
+        path = directory / content_hash[:2] / content_hash[2:4] / f"{content_hash}{suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"image")
+        os.utime(path, (modified, modified))
+        paths.append(path)
+    return paths
+
+
+class TestSweepImages:
+    def test_removes_only_old_unreferenced_contents(self, tmp_path, mock_property_image_repository_count_references):
+        """
+            Tests that the sweep removes the files of contents without references, and keeps the referenced ones,
+            the ones modified during the grace period (an upload in progress) and files outside the content layout.
+        """
+
+        # SetUp
+        orphan = store(tmp_path, "a" * 64, ".jpg", "_thumbnail.jpg", "_webp.webp")
+        referenced = store(tmp_path, "b" * 64, ".png")
+        recent = store(tmp_path, "c" * 64, ".jpg", modified=time.time())
+        foreign = tmp_path / "notes.txt"
+        foreign.write_bytes(b"keep")
+        os.utime(foreign, (OLD, OLD))
+        mock_property_image_repository_count_references.side_effect = lambda content_hash: int(content_hash[0] == "b")
+
+        # Action
+        stats = asyncio.run(sweep_images(MagicMock(), LocalImageStorage(str(tmp_path)), grace_period=3600))
+
+        # Assertion
+        assert stats == {"contents": 3, "referenced": 1, "recent": 1, "removed": 1, "abandoned_uploads": 0}
+        assert not any(path.exists() for path in orphan)
+        assert all(path.exists() for path in referenced + recent + [foreign])
+        assert mock_property_image_repository_count_references.call_count == 2
+
+    def test_dry_run_removes_nothing(self, tmp_path, mock_property_image_repository_count_references):
+        """
+            Tests that a dry run only reports the contents it would remove.
+        """
+
+        # SetUp
+        orphan = store(tmp_path, "a" * 64, ".jpg")
+        mock_property_image_repository_count_references.return_value = 0
+
+        # Action
+        stats = asyncio.run(sweep_images(MagicMock(), LocalImageStorage(str(tmp_path)), dry_run=True))
+
+        # Assertion
+        assert stats["removed"] == 1
+        assert orphan[0].exists()
+
+    def test_removes_old_staged_uploads(self, mock_property_image_repository_count_references):
+        """
+            Tests that the staged objects of direct uploads never registered are removed once older than the grace
+            period, without looking for references.
+        """
+
+        # SetUp
+        abandoned, in_progress = f"tmp/{'a' * 32}.jpg", f"tmp/{'b' * 32}.jpg"
+        storage = MagicMock()
+        storage.list_files.return_value = [(abandoned, OLD), (in_progress, time.time()), ("notes.txt", OLD)]
+        storage.delete = AsyncMock()
+
+        # Action
+        stats = asyncio.run(sweep_images(MagicMock(), storage, grace_period=3600))
+
+        # Assertion
+        assert stats["abandoned_uploads"] == 1
+        storage.delete.assert_awaited_once_with(abandoned)
+        mock_property_image_repository_count_references.assert_not_called()
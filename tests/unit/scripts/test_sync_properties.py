@@ -0,0 +1,42 @@
+import asyncio
+import io
+import json
+from unittest.mock import AsyncMock
+
+from app.scripts.sync_properties import read_records, sync_properties
+
+
+def record(code):
+    return {"name": "p", "address": "a", "price": 1000, "code_internal": code, "year": 2000, "id_owner": "JOED1"}
+
+
+class TestSyncProperties:
+    def test_syncs_records_in_batches(self, mock_mongo_client, async_cursor):
+        """
+            Tests that the records of a NDJSON file are validated and synchronized in batches, skipping invalid ones.
+        """
+
+        # SetUp
+        collection = mock_mongo_client.realStateCompany.Properties
+        collection.find.side_effect = lambda *args: async_cursor([])
+        collection.bulk_write = AsyncMock()
+        lines = [json.dumps(record("C1")), json.dumps({"code_internal": "C2"}), json.dumps(record("C3"))]
+        records = read_records(io.StringIO("\n".join(lines) + "\n"))
+
+        # Action
+        stats = asyncio.run(sync_properties(mock_mongo_client, records, batch_size=1))
+
+        # Assertion
+        assert stats == {"inserted": 2, "updated": 0, "unchanged": 0, "duplicates": 0, "invalid": 1}
+        assert collection.bulk_write.await_count == 2
+
+    def test_reads_json_array(self):
+        """
+            Tests that a JSON array file is read as well as NDJSON.
+        """
+
+        # Action
+        records = list(read_records(io.StringIO(json.dumps([record("C1"), record("C2")]))))
+
+        # Assertion
+        assert [item["code_internal"] for item in records] == ["C1", "C2"]
@@ -0,0 +1,68 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from PIL import Image
+
+from app.models.py_object_id import PyObjectId
+from app.schemas import ImageDerivative, PropertyImageInDB
+from app.services.image_derivatives import build_derivatives
+from app.services.property_service import PropertyService
+
+SPECS = [
+    {"name": "thumbnail", "width": 320, "height": 320, "format": "JPEG"},
+    {"name": "webp", "width": 1280, "height": 1280, "format": "WEBP"},
+]
+
+
+class TestBuildDerivatives:
+    def test_builds_every_spec_keeping_aspect_ratio(self, tmp_path):
+        """
+            Tests that each derivative spec produces a file fitting its bounding box with the original aspect ratio.
+        """
+
+        # SetUp
+        source = tmp_path / "photo.png"
+        Image.new("RGBA", (2000, 1000), (200, 10, 10, 255)).save(source)
+
+        # Action
+        derivatives = build_derivatives(str(source), SPECS)
+
+        # Assertion
+        assert [(d["name"], d["width"], d["height"], d["format"]) for d in derivatives] == [
+            ("thumbnail", 320, 160, "JPEG"), ("webp", 1280, 640, "WEBP")
+        ]
+        assert derivatives[0]["file"] == str(tmp_path / "photo_thumbnail.jpg")
+        with Image.open(derivatives[1]["file"]) as webp:
+            assert webp.format == "WEBP"
+
+
+class TestGenerateImageDerivatives:
+    def make_service(self):
+        image_repo = MagicMock()
+        image_repo.set_derivatives = AsyncMock()
+        image = PropertyImageInDB(_id=PyObjectId(), id_property=PyObjectId(), file="app/images/photo.jpg", enable=True)
+        return PropertyService(MagicMock(), image_repo), image_repo, image
+
+    def test_marks_image_ready(self, mocker):
+        """
+            Tests that the generated derivatives are stored on the image with status 'ready'.
+        """
+        service, image_repo, image = self.make_service()
+        derivative = ImageDerivative(name="thumbnail", file="app/images/photo_thumbnail.jpg", width=320, height=200,
+                                     format="JPEG")
+        mocker.patch("app.services.property_service.generate_derivatives", AsyncMock(return_value=[derivative]))
+
+        asyncio.run(service.generate_image_derivatives(image))
+
+        image_repo.set_derivatives.assert_awaited_once_with(image.id, [derivative], "ready")
+
+    def test_marks_image_failed(self, mocker):
+        """
+            Tests that a failure in the worker pool marks the image derivatives as 'failed'.
+        """
+        service, image_repo, image = self.make_service()
+        mocker.patch("app.services.property_service.generate_derivatives", AsyncMock(side_effect=OSError("broken")))
+
+        asyncio.run(service.generate_image_derivatives(image))
+
+        image_repo.set_derivatives.assert_awaited_once_with(image.id, [], "failed")
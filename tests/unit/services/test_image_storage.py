@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from app.schemas import ImageDerivative
+from app.services import image_storage
+from app.services.image_storage import (
+    LocalImageStorage, build_image_storage, sha256_checksum, stored_content_hash
+)
+
+CONTENT = b"\xff\xd8\xff\xe0fake image data"
+CONTENT_HASH = hashlib.sha256(CONTENT).hexdigest()
+CONTENT_KEY = f"{CONTENT_HASH[:2]}/{CONTENT_HASH[2:4]}/{CONTENT_HASH}.jpg"
+STAGED_KEY = f"tmp/{'e' * 32}.jpg"
+
+
+class TestS3ImageStorage:
+    def test_save_uploads_new_content_under_its_key(self, s3_image_storage, mock_s3_client):
+        """
+            Tests that an upload received by the API is validated, hashed and sent to the bucket under its content key.
+        """
+
+        # Action
+        stored = asyncio.run(s3_image_storage.save(UploadFile(filename="photo.jpeg", file=BytesIO(CONTENT))))
+
+        # Assertion
+        assert stored == (CONTENT_KEY, CONTENT_HASH, len(CONTENT))
+        args, kwargs = mock_s3_client.upload_file.call_args
+        assert args[1:] == ("images", CONTENT_KEY)
+        assert kwargs["ExtraArgs"] == {"ContentType": "image/jpeg"}
+
+    def test_save_skips_stored_content(self, s3_image_storage, mock_s3_client):
+        """
+            Tests that content already in the bucket is not uploaded again, only touched to refresh its modification
+            time (so the sweep does not remove it while its record is inserted).
+        """
+
+        # SetUp
+        mock_s3_client.objects[CONTENT_KEY] = {"ContentLength": len(CONTENT)}
+
+        # Action
+        asyncio.run(s3_image_storage.save(UploadFile(filename="photo.jpg", file=BytesIO(CONTENT))))
+
+        # Assertion
+        mock_s3_client.upload_file.assert_not_called()
+        assert mock_s3_client.copy_object.call_args[1]["CopySource"] == {"Bucket": "images", "Key": CONTENT_KEY}
+
+    def test_create_upload_signs_staging_key_with_checksum(self, s3_image_storage, mock_s3_client):
+        """
+            Tests that the presigned PUT targets a staging key of its own, never the content key, and requires the
+            SHA-256 checksum of the file. Whether the content is already stored is not revealed.
+        """
+
+        # SetUp
+        mock_s3_client.objects[CONTENT_KEY] = {"ContentLength": len(CONTENT)}
+
+        # Action
+        ticket = asyncio.run(s3_image_storage.create_upload(CONTENT_HASH, "jpeg"))
+        other_ticket = asyncio.run(s3_image_storage.create_upload(CONTENT_HASH, "jpeg"))
+
+        # Assertion
+        assert image_storage.is_staged_upload(ticket.key)
+        assert ticket.key != other_ticket.key
+        assert ticket.url == "https://storage.test/signed"
+        assert ticket.headers == {"Content-Type": "image/jpeg", "x-amz-checksum-sha256": sha256_checksum(CONTENT_HASH)}
+        assert "exists" not in ticket.dict()
+        mock_s3_client.head_object.assert_not_called()
+        assert mock_s3_client.generate_presigned_url.call_args_list[0] == (("put_object",), {"Params": {
+            "Bucket": "images", "Key": ticket.key, "ContentType": "image/jpeg",
+            "ChecksumSHA256": sha256_checksum(CONTENT_HASH),
+        }, "ExpiresIn": 60})
+
+    @pytest.mark.parametrize("stored", [False, True])
+    def test_verify_upload(self, s3_image_storage, mock_s3_client, stored):
+        """
+            Tests that an uploaded object with the expected checksum and format is copied to its content key (or the
+            stored content touched) and the staged object removed.
+        """
+
+        # SetUp
+        mock_s3_client.objects[STAGED_KEY] = {
+            "ContentLength": len(CONTENT), "ChecksumSHA256": sha256_checksum(CONTENT_HASH)
+        }
+        if stored:
+            mock_s3_client.objects[CONTENT_KEY] = {"ContentLength": len(CONTENT)}
+        mock_s3_client.get_object.return_value = {"Body": BytesIO(CONTENT[:16])}
+
+        # Action
+        result = asyncio.run(s3_image_storage.verify_upload(STAGED_KEY, CONTENT_HASH, "jpg"))
+
+        # Assertion
+        assert result == (CONTENT_KEY, CONTENT_HASH, len(CONTENT))
+        kwargs = mock_s3_client.copy_object.call_args[1]
+        assert kwargs["Key"] == CONTENT_KEY
+        assert kwargs["CopySource"] == {"Bucket": "images", "Key": CONTENT_KEY if stored else STAGED_KEY}
+        mock_s3_client.delete_object.assert_called_once_with(Bucket="images", Key=STAGED_KEY)
+
+    @pytest.mark.parametrize("head, signature, status_code", [
+        ({"ContentLength": len(CONTENT), "ChecksumSHA256": sha256_checksum("00" * 32)}, CONTENT, 400),
+        ({"ContentLength": len(CONTENT), "ChecksumSHA256": sha256_checksum(CONTENT_HASH)}, b"GIF89a", 400),
+        ({"ContentLength": 10 * 1024 * 1024}, CONTENT, 413),
+    ])
+    def test_verify_upload_removes_invalid_objects(
+            self, s3_image_storage, mock_s3_client, head, signature, status_code
+    ):
+        """
+            Tests that a staged object that does not match its hash, is not an image of its extension or is too large
+            is rejected and removed from the bucket, while the stored content of that hash is left alone.
+        """
+
+        # SetUp
+        mock_s3_client.objects[STAGED_KEY] = head
+        mock_s3_client.objects[CONTENT_KEY] = {"ContentLength": len(CONTENT)}
+        mock_s3_client.get_object.return_value = {"Body": BytesIO(signature)}
+
+        # Action
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(s3_image_storage.verify_upload(STAGED_KEY, CONTENT_HASH, "jpg"))
+
+        # Assertion
+        assert error.value.status_code == status_code
+        mock_s3_client.delete_object.assert_called_once_with(Bucket="images", Key=STAGED_KEY)
+        mock_s3_client.copy_object.assert_not_called()
+
+    @pytest.mark.parametrize("key", [CONTENT_KEY, "tmp/other.jpg", f"tmp/{'e' * 32}.exe"])
+    def test_verify_upload_only_accepts_staging_keys(self, s3_image_storage, mock_s3_client, key):
+        """
+            Tests that registering any other key than the staging key of a direct upload is rejected untouched.
+        """
+
+        # SetUp
+        mock_s3_client.objects[key] = {"ContentLength": 1}
+
+        # Action
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(s3_image_storage.verify_upload(key, CONTENT_HASH, "jpg"))
+
+        # Assertion
+        assert error.value.status_code == 400
+        mock_s3_client.delete_object.assert_not_called()
+
+    def test_verify_missing_upload(self, s3_image_storage, mock_s3_client):
+        """
+            Tests that registering a content that was never uploaded is rejected.
+        """
+
+        # Action
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(s3_image_storage.verify_upload(STAGED_KEY, CONTENT_HASH, "jpg"))
+
+        # Assertion
+        assert error.value.status_code == 400
+        mock_s3_client.delete_object.assert_not_called()
+
+    def test_store_derivatives_next_to_the_original(self, s3_image_storage, mock_s3_client, tmp_path):
+        """
+            Tests that the derivatives built from the local copy are uploaded next to the original object.
+        """
+
+        # SetUp
+        derivative = ImageDerivative(
+            name="thumbnail", file=str(tmp_path / "photo_thumbnail.jpg"), width=320, height=200, format="JPEG"
+        )
+
+        # Action
+        stored = asyncio.run(s3_image_storage.store_derivatives(CONTENT_KEY, [derivative]))
+
+        # Assertion
+        assert stored[0].file == CONTENT_KEY.replace(".jpg", "_thumbnail.jpg")
+        assert mock_s3_client.upload_file.call_args[0][1:] == ("images", stored[0].file)
+
+    def test_list_files(self, s3_image_storage, mock_s3_client):
+        """
+            Tests that the bucket is listed with the modification time of each object.
+        """
+
+        # SetUp
+        modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        mock_s3_client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": CONTENT_KEY, "LastModified": modified}]}, {}
+        ]
+
+        # Action
+        files = list(s3_image_storage.list_files())
+
+        # Assertion
+        assert files == [(CONTENT_KEY, modified.timestamp())]
+
+
+@pytest.mark.parametrize("key, expected", [
+    (CONTENT_KEY, CONTENT_HASH),
+    (CONTENT_KEY.replace(".jpg", "_thumbnail.webp"), CONTENT_HASH),
+    ("tmp/" + "0" * 32, None),
+    (CONTENT_KEY.replace(".jpg", ".txt"), None),
+    ("uuid-photo.jpg", None),
+])
+def test_stored_content_hash(key, expected):
+    """
+        Tests that only originals and derivatives with an image extension are attributed to a content.
+    """
+    assert stored_content_hash(key) == expected
+
+
+class TestBuildImageStorage:
+    def test_local_by_default(self, mocker):
+        """
+            Tests that the local directory store is used unless another backend is configured.
+        """
+        mocker.patch.object(image_storage.settings, "IMAGE_STORAGE", "local")
+
+        assert isinstance(build_image_storage(), LocalImageStorage)
+
+    def test_unknown_backend(self, mocker):
+        """
+            Tests that a misconfigured backend fails loudly instead of falling back to the local directory.
+        """
+        mocker.patch.object(image_storage.settings, "IMAGE_STORAGE", "ftp")
+
+        with pytest.raises(ValueError):
+            build_image_storage()
+
+    def test_backends_implement_the_whole_interface(self):
+        """
+            Tests that a backend missing a required operation can not be instantiated.
+        """
+        class IncompleteStorage(image_storage.ImageStorage):
+            async def save(self, image):
+                pass
+
+        with pytest.raises(TypeError):
+            IncompleteStorage()
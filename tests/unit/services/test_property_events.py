@@ -0,0 +1,259 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+from bson import ObjectId, Timestamp
+from pymongo.errors import OperationFailure
+
+from app.models.py_object_id import PyObjectId
+from app.schemas import BulkPriceUpdate, BulkPriceUpdateResult, PropertyInDB
+from app.services.property_events import (
+    CHANGE_STREAMS_UNSUPPORTED, PropertyEventBroker, format_event, stream_events, watch_events
+)
+from app.services.property_service import PropertyService
+
+
+async def collect(iterator, count):
+    events = []
+    async for event in iterator:
+        events.append(event)
+        if len(events) == count:
+            break
+    await iterator.aclose()
+    return events
+
+
+def make_broker(change_streams=False, buffer_size=10, queue_size=10):
+    broker = PropertyEventBroker(buffer_size, queue_size)
+    broker.change_streams = change_streams
+    return broker
+
+
+class FakeChangeStream:
+    def __init__(self, changes, resume_token=None):
+        self.changes = list(changes)
+        self.resume_token = resume_token
+        self.close = AsyncMock()
+
+    async def try_next(self):
+        change = self.changes.pop(0)
+        if isinstance(change, Exception):
+            raise change
+        return change
+
+
+def price_change(token, price):
+    return {
+        "_id": {"_data": token}, "operationType": "update", "clusterTime": Timestamp(1700000000, 1),
+        "documentKey": {"_id": ObjectId()}, "updateDescription": {"updatedFields": {"price": price}},
+    }
+
+
+class TestPropertyEventBroker:
+    def test_replays_missed_events_before_live_ones(self):
+        """
+            Tests that a subscriber resuming from an event gets the buffered events after it, then the live ones.
+        """
+
+        # SetUp
+        broker = make_broker()
+        broker.publish("price_changed", "a", 1.0)
+        last_seen = broker.last_event_id
+        broker.publish("price_changed", "b", 2.0)
+
+        async def run():
+            subscription = broker.subscribe(last_seen, heartbeat=1)
+            first = await subscription.__anext__()
+            broker.publish("price_changed", "c", 3.0)
+            return [first] + await collect(subscription, 1)
+
+        # Action
+        events = asyncio.run(run())
+
+        # Assertion
+        assert [(event.property_id, event.price) for event in events] == [("b", 2.0), ("c", 3.0)]
+
+    @pytest.mark.parametrize("last_event_id", ["other-process-1", "garbage", "first"])
+    def test_unknown_position_gets_reset(self, last_event_id):
+        """
+            Tests that a position from another process, an invalid one or one evicted from the buffer is answered
+            with a 'reset' event carrying the current position.
+        """
+
+        # SetUp
+        broker = make_broker(buffer_size=2)
+        broker.publish("price_changed", "a", 1.0)
+        if last_event_id == "first":
+            last_event_id = broker.last_event_id
+        for price in (2.0, 3.0, 4.0):
+            broker.publish("price_changed", "a", price)
+
+        # Action
+        events = asyncio.run(collect(broker.subscribe(last_event_id, heartbeat=1), 1))
+
+        # Assertion
+        assert events[0].type == "reset"
+        assert events[0].id == broker.last_event_id
+
+    def test_heartbeat_and_slow_subscriber(self):
+        """
+            Tests that an idle subscriber gets None as heartbeat and one that falls behind is disconnected.
+        """
+
+        # SetUp
+        broker = make_broker(queue_size=2)
+
+        async def run():
+            subscription = broker.subscribe(None, heartbeat=0.01)
+            heartbeat = await subscription.__anext__()
+            for price in (1.0, 2.0, 3.0):
+                broker.publish("price_changed", "a", price)
+            return heartbeat, [event async for event in subscription]
+
+        # Action
+        heartbeat, events = asyncio.run(run())
+
+        # Assertion
+        assert heartbeat is None
+        assert [event.price for event in events] == [1.0, 2.0]
+
+    def test_publish_is_skipped_with_change_streams(self):
+        """
+            Tests that the in-process hook does not buffer events when change streams already see the writes.
+        """
+        broker = make_broker(change_streams=True)
+
+        broker.publish("price_changed", "a", 1.0)
+
+        assert broker.sequence == 0
+
+
+class TestWatchEvents:
+    def test_maps_changes_and_heartbeats(self):
+        """
+            Tests that inserts and price updates become events identified by their resume token, and that an empty
+            await becomes a heartbeat.
+        """
+
+        # SetUp
+        property_id = ObjectId()
+        insert = {
+            "_id": {"_data": "T1"}, "operationType": "insert", "clusterTime": Timestamp(1700000000, 1),
+            "fullDocument": {"_id": property_id, "name": "Casa", "address": "Calle 1", "price": 10.0,
+                             "code_internal": "001", "year": 2000, "id_owner": "JOED1"},
+        }
+        repository = MagicMock()
+        repository.watch.return_value = FakeChangeStream([insert, None, price_change("T2", 12.5)])
+
+        # Action
+        events = asyncio.run(collect(watch_events(repository, "T0", heartbeat=2), 3))
+
+        # Assertion
+        repository.watch.assert_called_once_with("T0", 2000)
+        assert events[0].type == "property_created" and events[0].property.id == str(property_id)
+        assert events[0].id == "T1"
+        assert events[1] is None
+        assert (events[2].id, events[2].type, events[2].price) == ("T2", "price_changed", 12.5)
+
+    def test_lost_position_restarts_with_reset(self):
+        """
+            Tests that a resume token the oplog no longer holds is answered with a 'reset' event and a new stream.
+        """
+
+        # SetUp
+        repository = MagicMock()
+        expired = FakeChangeStream([OperationFailure("history lost", code=286)])
+        fresh = FakeChangeStream([None], resume_token={"_data": "NOW"})
+        repository.watch.side_effect = [expired, fresh]
+
+        # Action
+        events = asyncio.run(collect(watch_events(repository, "OLD", heartbeat=1), 2))
+
+        # Assertion
+        assert (events[0].type, events[0].id) == ("reset", "NOW")
+        assert events[1] is None
+        expired.close.assert_awaited_once()
+        assert repository.watch.call_args_list[1].args == (None, 1000)
+
+    def test_falls_back_to_broker_without_replica_set(self):
+        """
+            Tests that, in auto mode, a server without change streams switches the process to the in-process broker.
+        """
+
+        # SetUp
+        repository = MagicMock()
+        repository.watch.return_value = FakeChangeStream([OperationFailure("no", code=CHANGE_STREAMS_UNSUPPORTED)])
+        broker = make_broker(change_streams=None)
+        broker.publish("property_created", "a", 1.0)
+
+        # Action
+        events = asyncio.run(collect(stream_events(repository, "unknown", heartbeat=1, broker=broker), 1))
+
+        # Assertion
+        assert broker.change_streams is False
+        assert events[0].type == "reset"
+
+
+class TestPublishHook:
+    def make_service(self, broker):
+        property_repo = MagicMock()
+        return PropertyService(property_repo, MagicMock(), broker), property_repo
+
+    def test_price_change_is_published(self):
+        """
+            Tests that a changed price is published, and that setting the same price again is not.
+        """
+
+        # SetUp
+        broker = make_broker()
+        service, property_repo = self.make_service(broker)
+        current = PropertyInDB(_id=PyObjectId(), name="Casa", address="Calle 1", price=10.0, code_internal="001",
+                               year=2000, id_owner="JOED1")
+        property_repo.get = AsyncMock(return_value=current)
+        property_repo.update = AsyncMock(side_effect=[current.copy(update={"price": 12.0}), current])
+
+        # Action
+        asyncio.run(service.update_property_price(str(current.id), 12.0))
+        asyncio.run(service.update_property_price(str(current.id), 10.0))
+
+        # Assertion
+        events = broker.events_after(f"{broker.token}-0")
+        assert [(event.type, event.property_id, event.price) for event in events] == [
+            ("price_changed", str(current.id), 12.0)
+        ]
+
+    def test_bulk_update_publishes_updated_items(self):
+        """
+            Tests that only the items of a bulk update whose price changed are published.
+        """
+
+        # SetUp
+        broker = make_broker()
+        service, property_repo = self.make_service(broker)
+        property_repo.bulk_update_prices = AsyncMock(return_value=BulkPriceUpdateResult(items=[
+            {"property_id": "a", "status": "updated"}, {"property_id": "b", "status": "unchanged"}
+        ]))
+        update = BulkPriceUpdate(items=[{"property_id": "a", "price": 5.0}, {"property_id": "b", "price": 6.0}])
+
+        # Action
+        asyncio.run(service.bulk_update_prices(update))
+
+        # Assertion
+        assert [(event.property_id, event.price) for event in broker.events_after(f"{broker.token}-0")] == [("a", 5.0)]
+
+
+def test_format_event():
+    """
+        Tests the server-sent events encoding of an event and of a heartbeat.
+    """
+    broker = make_broker()
+    broker.publish("price_changed", "a", 1.5)
+    event = broker.events_after(f"{broker.token}-0")[0]
+
+    lines = format_event(event).decode().split("\n")
+
+    assert lines[0] == f"id: {event.id}"
+    assert lines[1] == "event: price_changed"
+    assert orjson.loads(lines[2][len("data: "):])["price"] == 1.5
+    assert format_event(None) == b": keep-alive\n\n"
@@ -0,0 +1,33 @@
+from app import main
+from app.db import mongodb
+
+
+class TestCreateApp:
+    def test_factory_does_not_connect(self, mocker):
+        """
+            Tests that building the application creates no MongoDB client, so it can be built before the server
+            forks its workers.
+        """
+
+        # SetUp
+        create_client = mocker.patch.object(mongodb, "create_client")
+
+        # Action
+        application = main.create_app()
+
+        # Assertion
+        create_client.assert_not_called()
+        paths = {route.path for route in application.routes}
+        assert {"/metrics", "/pool/stats", "/api/v1/property/{property_id}"} <= paths
+
+    def test_each_call_builds_a_new_application(self):
+        """
+            Tests that every call of the factory returns an independent application.
+        """
+
+        # Action
+        first, second = main.create_app(), main.create_app()
+
+        # Assertion
+        assert first is not second
+        assert first.router is not second.router
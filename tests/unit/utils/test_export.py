@@ -0,0 +1,117 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+from datetime import datetime
+
+from bson import ObjectId, encode
+from bson.raw_bson import RawBSONDocument
+
+from app.utils.export import FLUSH_SIZE, export_fields, stream_export
+
+
+async def generate_documents(count, include_traces=False):
+    for index in range(count):
+        document = {
+            "_id": ObjectId(), "name": f"property_{index}", "address": "carrera 1", "price": 1000.0 + index,
+            "code_internal": f"{index:08d}", "year": 2000, "id_owner": "JOED1",
+        }
+        if include_traces:
+            document["traces"] = [
+                {"date_sale": datetime(2023, 5, 10), "name": "venta_1", "value": 250000.0, "tax": 5000.0}
+            ]
+        yield document
+
+
+def collect(chunks) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in chunks])
+    return asyncio.run(run())
+
+
+class TestStreamExport:
+    def test_ndjson_rows(self):
+        """
+            Tests that every property is one JSON line with its ID as string and its sales in ISO dates.
+        """
+
+        # Action
+        body = collect(stream_export(generate_documents(3, include_traces=True), "ndjson", include_traces=True))
+
+        # Assertion
+        rows = [json.loads(line) for line in body.splitlines()]
+        assert len(rows) == 3
+        assert list(rows[0]) == export_fields(include_traces=True)
+        assert ObjectId.is_valid(rows[0]["_id"])
+        assert rows[0]["traces"][0]["date_sale"] == "2023-05-10T00:00:00"
+
+    def test_csv_with_header_and_gzip(self):
+        """
+            Tests a gzip compressed CSV export: header first, one row per property, sales as a JSON column.
+        """
+
+        # Action
+        body = collect(stream_export(generate_documents(3, include_traces=True), "csv", True, compress=True))
+
+        # Assertion
+        rows = list(csv.reader(io.StringIO(gzip.decompress(body).decode())))
+        assert rows[0] == export_fields(include_traces=True)
+        assert len(rows) == 4
+        assert rows[1][1] == "property_0"
+        assert json.loads(rows[1][-1])[0]["value"] == 250000.0
+
+    def test_bson_passes_raw_documents_through(self):
+        """
+            Tests that the BSON export writes the bytes of the raw documents unchanged.
+        """
+
+        # SetUp
+        documents = [RawBSONDocument(encode({"_id": ObjectId(), "name": f"property_{index}"})) for index in range(3)]
+
+        async def cursor():
+            for document in documents:
+                yield document
+
+        # Action
+        body = collect(stream_export(cursor(), "bson"))
+
+        # Assertion
+        assert body == b"".join(document.raw for document in documents)
+
+    def test_chunks_are_flushed_in_large_blocks(self):
+        """
+            Tests that rows are sent in blocks of about FLUSH_SIZE instead of one chunk per document.
+        """
+
+        # Action
+        async def run():
+            return [len(chunk) async for chunk in stream_export(generate_documents(5000), "ndjson")]
+        sizes = asyncio.run(run())
+
+        # Assertion
+        assert len(sizes) > 1
+        assert all(FLUSH_SIZE <= size < 2 * FLUSH_SIZE for size in sizes[:-1])
+
+    def test_memory_stays_flat_with_catalog_size(self):
+        """
+            Tests that the memory peak of a gzip export does not grow with the number of documents.
+        """
+
+        def peak(count):
+            async def run():
+                async for _ in stream_export(generate_documents(count, include_traces=True), "csv", True, True):
+                    pass
+            tracemalloc.start()
+            asyncio.run(run())
+            _, value = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return value
+
+        # Action
+        small = peak(5000)
+        large = peak(25000)
+
+        # Assertion
+        assert large < small * 1.5
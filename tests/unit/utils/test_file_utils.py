@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import tracemalloc
+from io import BytesIO
+
+from starlette.datastructures import UploadFile
+
+from app.core.config import settings
+from app.utils.file_utils import content_path, save_image
+
+
+class TestSaveImage:
+    def test_memory_stays_bounded_with_large_uploads(self, tmp_path, mocker):
+        """
+            Tests that streaming a large upload to disk only keeps a few chunks in memory.
+            - A 32MB image backed by a file on disk (like the multipart parser spools it) is saved with a 64MB limit.
+            - The peak of memory allocated while saving must stay in the order of the chunk size, not of the file size.
+        """
+
+        # SetUp
+        mocker.patch("app.core.validation.settings.MAX_FILE_SIZE_MG", 64)
+        size = 32 * 1024 * 1024
+        spooled = tempfile.TemporaryFile()
+        spooled.write(b"\xff\xd8\xff\xe0")
+        block = b"0" * (1024 * 1024)
+        for _ in range(size // len(block)):
+            spooled.write(block)
+        spooled.seek(0)
+        image = UploadFile(filename="large.jpg", file=spooled)
+
+        # Action
+        tracemalloc.start()
+        stored = asyncio.run(save_image(image, str(tmp_path)))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        spooled.close()
+
+        # Assertion
+        assert stored.size == size + 4
+        assert os.path.getsize(stored.path) == size + 4
+        assert peak < 8 * settings.UPLOAD_CHUNK_SIZE
+
+    def test_identical_content_is_stored_once(self, tmp_path):
+        """
+            Tests that uploads with identical bytes map to a single file in the sharded content-addressed layout.
+        """
+
+        # SetUp
+        content = b"\x89PNG\r\n\x1a\n same bytes"
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        # Action
+        first = asyncio.run(save_image(UploadFile(filename="a.png", file=BytesIO(content)), str(tmp_path)))
+        second = asyncio.run(save_image(UploadFile(filename="b.PNG", file=BytesIO(content)), str(tmp_path)))
+
+        # Assertion
+        assert first == second
+        assert first.content_hash == content_hash
+        assert first.path == content_path(str(tmp_path), content_hash, "png")
+        assert first.path == str(tmp_path / content_hash[:2] / content_hash[2:4] / f"{content_hash}.png")
+        assert [path for path in tmp_path.rglob("*") if path.is_file()] == [tmp_path / first.path]
@@ -0,0 +1,41 @@
+import pytest
+
+from app.models.py_object_id import PyObjectId
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+class TestPaginationCursor:
+    def test_round_trip(self):
+        """
+            Tests that a cursor decodes to the values it was encoded with.
+        """
+        values = {"_id": str(PyObjectId()), "price": 1500.5}
+
+        assert decode_cursor(encode_cursor("-price", values), "-price") == values
+
+    def test_cursor_bound_to_sort(self):
+        """
+            Tests that a cursor generated for one sort specification is rejected for another one.
+        """
+        cursor = encode_cursor("price", {"_id": str(PyObjectId()), "price": 10})
+
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, "year")
+
+    @pytest.mark.parametrize("cursor", ["garbage", encode_cursor("id", {"_id": "not-an-object-id"})])
+    def test_invalid_cursor(self, cursor):
+        """
+            Tests that malformed cursors raise ValueError.
+        """
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, "id")
+
+    @pytest.mark.parametrize("values", [{}, {"price": None}, {"price": True}, {"price": [1]}])
+    def test_cursor_without_sort_key(self, values):
+        """
+            Tests that a cursor must carry a scalar value for every required sort field.
+        """
+        cursor = encode_cursor("price", {"_id": str(PyObjectId()), **values})
+
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, "price", ["price"])